@@ -1,24 +1,54 @@
+import json
 import numpy as np
-from typing import Tuple
+from typing import Iterator, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时使用标准库 json
+    orjson = None
+
+def eddy_pixels(ssh: np.ndarray, threshold: float = 0.1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    涡旋像元的行、列索引
+    """
+    return np.nonzero(np.abs(ssh) > threshold)
 
 def detect_eddy(ssh: np.ndarray, lat: np.ndarray, lon: np.ndarray, threshold: float = 0.1) -> dict:
     """
     基于海表高度异常（SSH）检测涡旋区域
     返回：涡旋中心坐标及像元索引
     """
-    mask = np.abs(ssh) > threshold
-    eddy_indices = np.argwhere(mask)
-    if eddy_indices.size == 0:
+    rows, cols = eddy_pixels(ssh, threshold)
+    if rows.size == 0:
         return {"centers": [], "indices": []}
-    centers = []
-    for idx in eddy_indices:
-        centers.append({"lat": float(lat[idx[0]]), "lon": float(lon[idx[1]])})
-    return {"centers": centers, "indices": eddy_indices.tolist()}
+    # 一次性按索引批量取出经纬度，避免逐像元的Python循环
+    lats = lat[rows].astype(float).tolist()
+    lons = lon[cols].astype(float).tolist()
+    centers = [{"lat": la, "lon": lo} for la, lo in zip(lats, lons)]
+    indices = np.column_stack((rows, cols)).tolist()
+    return {"centers": centers, "indices": indices}
+
+def iter_eddy_ndjson(rows: np.ndarray, cols: np.ndarray, lat: np.ndarray, lon: np.ndarray, chunk: int = 4096) -> Iterator[bytes]:
+    """
+    以 NDJSON 逐行输出涡旋像元 {"lat", "lon", "row", "col"}
+    按 chunk 个像元分批转换与发送，不构造完整的结果列表
+    """
+    dumps = orjson.dumps if orjson is not None else (lambda obj: json.dumps(obj).encode())
+    for start in range(0, rows.size, chunk):
+        r = rows[start:start + chunk]
+        c = cols[start:start + chunk]
+        lines = [
+            dumps({"lat": la, "lon": lo, "row": ri, "col": ci})
+            for la, lo, ri, ci in zip(lat[r].tolist(), lon[c].tolist(), r.tolist(), c.tolist())
+        ]
+        lines.append(b"")
+        yield b"\n".join(lines)
 
 # FastAPI API 封装
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal
 
 router = APIRouter(
     prefix="/diagnostics/eddy",
@@ -30,18 +60,58 @@ class EddyRequest(BaseModel):
     lat: List[float]
     lon: List[float]
     threshold: float = 0.1
+    dtype: Literal["float32", "float64"] = "float64"  # SSH 网格的解析精度
 
 class EddyResponse(BaseModel):
     centers: List[dict]
     indices: List[List[int]]
 
-from app.core.json import custom_jsonable_encoder
+from app.core.json import NumpyORJSONResponse, ndarray_body
 
-@router.post("/detect", response_model=EddyResponse, summary="涡旋检测")
-def detect_eddy_api(req: EddyRequest):
-    ssh = np.array(req.ssh)
-    lat = np.array(req.lat)
-    lon = np.array(req.lon)
+@router.post(
+    "/detect",
+    response_model=EddyResponse,
+    summary="涡旋检测",
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": EddyRequest.model_json_schema()}}}}
+)
+def detect_eddy_api(req: EddyRequest = Depends(ndarray_body(EddyRequest, ("ssh", "lat", "lon"), dtype_fields=("ssh",)))):
+    ssh = np.asarray(req.ssh, dtype=req.dtype)
+    lat = np.asarray(req.lat, dtype=np.float64)
+    lon = np.asarray(req.lon, dtype=np.float64)
     result = detect_eddy(ssh, lat, lon, req.threshold)
-    # 确保结果中的NumPy类型被转换为Python原生类型
-    return EddyResponse(**custom_jsonable_encoder(result))
+    # 结果已是原生类型，直接序列化，跳过响应模型的逐元素校验
+    return NumpyORJSONResponse(result)
+
+@router.post(
+    "/detect_stream",
+    summary="涡旋检测（NDJSON流式输出）",
+    response_class=StreamingResponse,
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": EddyRequest.model_json_schema()}}}}
+)
+def detect_eddy_stream_api(req: EddyRequest = Depends(ndarray_body(EddyRequest, ("ssh", "lat", "lon"), dtype_fields=("ssh",)))):
+    """每行一个涡旋像元，适用于密集涡旋掩膜的大规模结果"""
+    ssh = np.asarray(req.ssh, dtype=req.dtype)
+    lat = np.asarray(req.lat, dtype=np.float64)
+    lon = np.asarray(req.lon, dtype=np.float64)
+    rows, cols = eddy_pixels(ssh, req.threshold)
+    return StreamingResponse(iter_eddy_ndjson(rows, cols, lat, lon), media_type="application/x-ndjson")
+
+@router.post(
+    "/detect_binary",
+    summary="涡旋检测（二进制索引输出）",
+    response_class=Response,
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": EddyRequest.model_json_schema()}}}}
+)
+def detect_eddy_binary_api(req: EddyRequest = Depends(ndarray_body(EddyRequest, ("ssh", "lat", "lon"), dtype_fields=("ssh",)))):
+    """
+    返回 (2, N) 的 int32 小端数组（第一行为行索引，第二行为列索引）
+    数组形状见响应头 X-Array-Shape，经纬度由调用方按索引自行查取
+    """
+    ssh = np.asarray(req.ssh, dtype=req.dtype)
+    rows, cols = eddy_pixels(ssh, req.threshold)
+    data = np.stack([rows, cols]).astype("<i4")
+    return Response(
+        content=data.tobytes(),
+        media_type="application/octet-stream",
+        headers={"X-Array-Shape": f"{data.shape[0]},{data.shape[1]}", "X-Array-Dtype": "<i4"}
+    )
@@ -1,24 +1,28 @@
 import numpy as np
 from typing import Tuple
 
-def detect_front(sst: np.ndarray, lat: np.ndarray, lon: np.ndarray, gradient_threshold: float = 0.5) -> dict:
+def detect_front(sst: np.ndarray, lat: np.ndarray, lon: np.ndarray, gradient_threshold: float = 0.5, compact: bool = False) -> dict:
     """
     基于海表温度（SST）梯度检测锋面
     返回：锋面像元索引及中心坐标
+    compact=True 时以并列数组（lats/lons/rows/cols）返回，避免逐像元构造字典
     """
     dTdy, dTdx = np.gradient(sst, lat, lon)
-    grad_mag = np.sqrt(dTdx**2 + dTdy**2)
+    # hypot 单次遍历计算梯度模，避免平方/求和产生的中间数组
+    grad_mag = np.hypot(dTdx, dTdy)
     mask = grad_mag > gradient_threshold
-    front_indices = np.argwhere(mask)
-    centers = []
-    for idx in front_indices:
-        centers.append({"lat": float(lat[idx[0]]), "lon": float(lon[idx[1]])})
-    return {"centers": centers, "indices": front_indices.tolist()}
+    rows, cols = np.nonzero(mask)
+    lats = lat[rows].astype(float).tolist()
+    lons = lon[cols].astype(float).tolist()
+    if compact:
+        return {"lats": lats, "lons": lons, "rows": rows.tolist(), "cols": cols.tolist()}
+    centers = [{"lat": la, "lon": lo} for la, lo in zip(lats, lons)]
+    return {"centers": centers, "indices": np.column_stack((rows, cols)).tolist()}
 
 # FastAPI API 封装
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal, Optional
 
 router = APIRouter(
     prefix="/diagnostics/front",
@@ -30,18 +34,30 @@ class FrontRequest(BaseModel):
     lat: List[float]
     lon: List[float]
     gradient_threshold: float = 0.5
+    compact: bool = False
+    dtype: Literal["float32", "float64"] = "float64"  # SST 网格的解析与梯度计算精度
 
 class FrontResponse(BaseModel):
-    centers: List[dict]
-    indices: List[List[int]]
+    centers: Optional[List[dict]] = None
+    indices: Optional[List[List[int]]] = None
+    lats: Optional[List[float]] = None
+    lons: Optional[List[float]] = None
+    rows: Optional[List[int]] = None
+    cols: Optional[List[int]] = None
 
-from app.core.json import custom_jsonable_encoder
+from app.core.json import NumpyORJSONResponse, ndarray_body
 
-@router.post("/detect", response_model=FrontResponse, summary="锋面检测")
-def detect_front_api(req: FrontRequest):
-    sst = np.array(req.sst)
-    lat = np.array(req.lat)
-    lon = np.array(req.lon)
-    result = detect_front(sst, lat, lon, req.gradient_threshold)
-    # 确保结果中的NumPy类型被转换为Python原生类型
-    return FrontResponse(**custom_jsonable_encoder(result))
+@router.post(
+    "/detect",
+    response_model=FrontResponse,
+    response_model_exclude_none=True,
+    summary="锋面检测",
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": FrontRequest.model_json_schema()}}}}
+)
+def detect_front_api(req: FrontRequest = Depends(ndarray_body(FrontRequest, ("sst", "lat", "lon"), dtype_fields=("sst",)))):
+    sst = np.asarray(req.sst, dtype=req.dtype)
+    lat = np.asarray(req.lat, dtype=np.float64)
+    lon = np.asarray(req.lon, dtype=np.float64)
+    result = detect_front(sst, lat, lon, req.gradient_threshold, compact=req.compact)
+    # 结果已是原生类型，直接序列化，跳过响应模型的逐元素校验
+    return NumpyORJSONResponse(result)
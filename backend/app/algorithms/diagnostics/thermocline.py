@@ -1,4 +1,5 @@
 import numpy as np
+import logging
 from typing import Tuple, List, Dict, Literal
 from enum import Enum
 from pydantic import BaseModel, Field
@@ -9,6 +10,93 @@ class ClineType(str, Enum):
     DENSITY = "density"          # 密度跃层
     SOUND_SPEED = "sound_speed"  # 声速跃层
 
+logger = logging.getLogger(__name__)
+
+# numba编译后的扫描函数，首次调用时延迟编译
+_scan_cline_compiled = None
+
+
+def _scan_cline(profile: np.ndarray, depth: np.ndarray, window: int, sign: float):
+    """
+    单次遍历完成滑动平均、梯度计算与极值定位，不分配平滑剖面与梯度数组（可被numba编译）
+    梯度与 np.gradient 一致：内部点为非均匀网格二阶中心差分，端点为一阶差分
+    sign: 1 寻找最大正梯度，-1 寻找最大负梯度
+    返回: (跃层深度, 最大梯度, 上层平均值, 下层平均值)
+    """
+    n = profile.shape[0] - window + 1
+    off = window - 1
+    if n < 2:
+        raise ValueError("平滑后的剖面点数不足，无法计算梯度")
+
+    # 滚动求和得到平滑值 s[0]、s[1]
+    total = 0.0
+    for j in range(window):
+        total += profile[j]
+    s_prev = total / window
+    total += profile[window] - profile[0]
+    s_cur = total / window
+
+    best_idx = 0
+    best_grad = (s_cur - s_prev) / (depth[off + 1] - depth[off])
+
+    for i in range(1, n - 1):
+        total += profile[i + window] - profile[i]
+        s_next = total / window
+        dx1 = depth[off + i] - depth[off + i - 1]
+        dx2 = depth[off + i + 1] - depth[off + i]
+        a = -dx2 / (dx1 * (dx1 + dx2))
+        b = (dx2 - dx1) / (dx1 * dx2)
+        c = dx1 / (dx2 * (dx1 + dx2))
+        g = a * s_prev + b * s_cur + c * s_next
+        if sign * g > sign * best_grad:
+            best_idx = i
+            best_grad = g
+        s_prev = s_cur
+        s_cur = s_next
+
+    g = (s_cur - s_prev) / (depth[off + n - 1] - depth[off + n - 2])
+    if sign * g > sign * best_grad:
+        best_idx = n - 1
+        best_grad = g
+
+    # 第二遍：仅对跃层附近的平滑值求上下层平均
+    upper_idx = max(0, best_idx - window)
+    lower_idx = min(n, best_idx + window)
+    total = 0.0
+    for j in range(upper_idx, upper_idx + window):
+        total += profile[j]
+    upper_sum = 0.0
+    lower_sum = 0.0
+    for k in range(upper_idx, lower_idx):
+        if k > upper_idx:
+            total += profile[k + window - 1] - profile[k - 1]
+        if k < best_idx:
+            upper_sum += total / window
+        else:
+            lower_sum += total / window
+    upper_count = best_idx - upper_idx
+    lower_count = lower_idx - best_idx
+    upper_value = upper_sum / upper_count if upper_count > 0 else np.nan
+    lower_value = lower_sum / lower_count if lower_count > 0 else np.nan
+
+    return depth[off + best_idx], best_grad, upper_value, lower_value
+
+
+def _get_scan_cline():
+    """
+    获取跃层扫描函数：优先使用numba编译版本，numba不可用时回退到Python实现
+    """
+    global _scan_cline_compiled
+    if _scan_cline_compiled is None:
+        try:
+            from numba import njit
+            _scan_cline_compiled = njit(cache=True)(_scan_cline)
+        except ImportError:
+            logger.warning("numba不可用，跃层检测将使用Python实现")
+            _scan_cline_compiled = _scan_cline
+    return _scan_cline_compiled
+
+
 def detect_cline(
     depth: np.ndarray,
     profile: np.ndarray,
@@ -31,33 +119,23 @@ def detect_cline(
         - upper_value: 跃层上层平均值
         - lower_value: 跃层下层平均值
     """
-    # 使用滑动平均平滑数据，减少噪声影响
-    kernel = np.ones(window_size) / window_size
-    profile_smooth = np.convolve(profile, kernel, mode='valid')
-    depth_smooth = depth[window_size-1:]
-    
-    # 计算梯度
-    gradient = np.gradient(profile_smooth, depth_smooth)
-    
-    if cline_type == ClineType.TEMPERATURE:
-        # 温度跃层：寻找最大负梯度
-        idx = np.argmin(gradient)
-    elif cline_type == ClineType.DENSITY:
+    if cline_type == ClineType.DENSITY:
         # 密度跃层：寻找最大正梯度
-        idx = np.argmax(gradient)
-    else:  # ClineType.SOUND_SPEED
-        # 声速跃层：寻找最大负梯度（类似温度跃层）
-        idx = np.argmin(gradient)
-    
-    # 计算跃层上下层的平均值
-    upper_idx = max(0, idx - window_size)
-    lower_idx = min(len(profile_smooth), idx + window_size)
-    upper_value = np.mean(profile_smooth[upper_idx:idx])
-    lower_value = np.mean(profile_smooth[idx:lower_idx])
-    
+        sign = 1.0
+    else:
+        # 温度跃层、声速跃层：寻找最大负梯度
+        sign = -1.0
+
+    cline_depth, max_gradient, upper_value, lower_value = _get_scan_cline()(
+        np.ascontiguousarray(profile, dtype=np.float64),
+        np.ascontiguousarray(depth, dtype=np.float64),
+        window_size,
+        sign
+    )
+
     return {
-        "cline_depth": float(depth_smooth[idx]),
-        "max_gradient": float(gradient[idx]),
+        "cline_depth": float(cline_depth),
+        "max_gradient": float(max_gradient),
         "upper_value": float(upper_value),
         "lower_value": float(lower_value)
     }
@@ -106,8 +184,8 @@ def detect_cline_api(req: ClineRequest):
     - lower_value: 跃层下层平均值
     """
     try:
-        depth = np.array(req.depth)
-        profile = np.array(req.profile)
+        depth = np.asarray(req.depth, dtype=np.float64)
+        profile = np.asarray(req.profile, dtype=np.float64)
         
         if len(depth) != len(profile):
             raise HTTPException(
@@ -0,0 +1,86 @@
+"""
+融合算法数组后端选择
+通过环境变量 OEV_BACKEND=numpy|cupy 选择计算后端，cupy 不可用时回退到 numpy
+"""
+
+import os
+import logging
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 问题规模低于该阈值时GPU核函数启动与数据传输开销占主导，直接使用numpy
+GPU_MIN_SIZE = 10_000
+
+_cupy = None
+_cupy_checked = False
+_threadpoolctl_warned = False
+
+
+def _load_cupy():
+    """延迟导入cupy，仅尝试一次"""
+    global _cupy, _cupy_checked
+    if not _cupy_checked:
+        _cupy_checked = True
+        try:
+            import cupy
+            _cupy = cupy
+        except ImportError:
+            logger.warning("OEV_BACKEND=cupy 但cupy不可用，融合算法将使用numpy后端")
+    return _cupy
+
+
+def get_array_module(size: int = 0):
+    """
+    根据环境变量与问题规模返回数组模块（numpy 或 cupy）
+    size: 问题规模（元素个数），用于判断是否值得使用GPU
+    """
+    if os.getenv("OEV_BACKEND", "numpy").lower() != "cupy" or size < GPU_MIN_SIZE:
+        return np
+    cp = _load_cupy()
+    return cp if cp is not None else np
+
+
+def to_numpy(a) -> np.ndarray:
+    """将计算结果转换回主机内存中的numpy数组"""
+    if isinstance(a, np.ndarray):
+        return a
+    return a.get()
+
+
+def blas_single_thread():
+    """
+    将BLAS线程数限制为1的上下文管理器
+    在线程池中并行处理多个分块时使用，避免线程池与多线程BLAS相互争用CPU
+    threadpoolctl 不可用时不做限制
+    """
+    global _threadpoolctl_warned
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        if not _threadpoolctl_warned:
+            _threadpoolctl_warned = True
+            logger.warning("threadpoolctl不可用，并行分块计算时无法限制BLAS线程数")
+        return contextlib.nullcontext()
+    return threadpool_limits(limits=1, user_api="blas")
+
+
+def map_blocks(func, starts, workers=None) -> None:
+    """
+    对各分块起始位置执行 func，分块相互独立且结果直接写入预分配的输出数组
+    scipy/numpy 的数值计算在C层释放GIL，线程池即可获得多核并行
+    workers: 线程数，None 表示 CPU 核数；为1或仅有一个分块时顺序执行
+    """
+    starts = list(starts)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(starts))
+    if workers <= 1:
+        for start in starts:
+            func(start)
+        return
+    with blas_single_thread(), ThreadPoolExecutor(max_workers=workers) as executor:
+        # 消费迭代器以便抛出工作线程中的异常
+        list(executor.map(func, starts))
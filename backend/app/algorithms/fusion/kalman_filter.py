@@ -1,7 +1,38 @@
+import os
 import numpy as np
-from typing import Tuple
+import logging
+from typing import Optional, Tuple
 
-def kalman_filter(
+from app.algorithms.fusion._backend import get_array_module, map_blocks, to_numpy
+
+logger = logging.getLogger(__name__)
+
+# numba编译后的核心循环，首次调用时延迟编译
+_kf_core_compiled = None
+_kf_scan_core_compiled = None
+
+try:
+    from numba import prange
+except ImportError:  # numba 为可选依赖，缺失时并行扫描按层顺序执行
+    prange = range
+
+# 并行扫描的单线程工作量约为顺序滤波的 3 倍（n<=8 实测 2.6~3.5 倍），
+# 仅在序列足够长、状态维数较小且 numba 线程数足以抵消该开销时自动切换
+KF_PARALLEL_MIN_T = 16384
+KF_PARALLEL_MAX_N = 8
+KF_PARALLEL_MIN_THREADS = 8
+
+
+def _numba_num_threads() -> int:
+    """numba 并行线程数，numba 不可用时为 0"""
+    try:
+        from numba import get_num_threads
+    except ImportError:
+        return 0
+    return get_num_threads()
+
+
+def _kf_core(
     observations: np.ndarray,
     initial_state: np.ndarray,
     initial_cov: np.ndarray,
@@ -9,6 +40,80 @@ def kalman_filter(
     observation_matrix: np.ndarray,
     process_noise: np.ndarray,
     observation_noise: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    卡尔曼滤波核心循环（纯数值实现，可被numba编译）
+    S 对称正定，增益通过 Cholesky 分解求解 S K^T = H P_pred 得到，不显式求逆
+    """
+    T = observations.shape[0]
+    n = initial_state.shape[0]
+    m = observations.shape[1]
+
+    F = transition_matrix
+    H = observation_matrix
+    Ft = np.ascontiguousarray(F.T)
+    Ht = np.ascontiguousarray(H.T)
+
+    # 预分配输出，每步结果直接写入并以视图作为下一步的状态，避免追加与拷贝
+    xs = np.empty((T, n), dtype=initial_state.dtype)
+    Ps = np.empty((T, n, n), dtype=initial_cov.dtype)
+    x = initial_state
+    P = initial_cov
+
+    for t in range(T):
+        # 预测
+        x_pred = F @ x
+        P_pred = F @ P @ Ft + process_noise
+
+        # 更新
+        HP = H @ P_pred
+        y = observations[t] - H @ x_pred
+        S = HP @ Ht + observation_noise
+
+        # S = L L^T，前代求 Z = L^-1 HP，回代求 K^T = L^-T Z
+        L = np.linalg.cholesky(S)
+        Lt = np.ascontiguousarray(L.T)
+        Z = np.empty_like(HP)
+        for i in range(m):
+            Z[i] = (HP[i] - L[i, :i] @ Z[:i]) / L[i, i]
+        Kt = np.empty_like(HP)
+        for i in range(m - 1, -1, -1):
+            Kt[i] = (Z[i] - Lt[i, i + 1:] @ Kt[i + 1:]) / L[i, i]
+        K = np.ascontiguousarray(Kt.T)
+
+        x = xs[t]
+        np.add(x_pred, K @ y, x)
+        # K S K^T = K H P_pred，省去 (I - K H) 的构造与一次矩阵乘
+        P = Ps[t]
+        np.subtract(P_pred, K @ HP, P)
+
+    return xs, Ps
+
+
+def _get_kf_core():
+    """
+    获取卡尔曼滤波核心函数：优先使用numba编译版本，numba不可用时回退到NumPy实现
+    """
+    global _kf_core_compiled
+    if _kf_core_compiled is None:
+        try:
+            from numba import njit
+            _kf_core_compiled = njit(cache=True)(_kf_core)
+        except ImportError:
+            logger.warning("numba不可用，卡尔曼滤波将使用NumPy实现")
+            _kf_core_compiled = _kf_core
+    return _kf_core_compiled
+
+
+def kalman_filter(
+    observations: np.ndarray,
+    initial_state: np.ndarray,
+    initial_cov: np.ndarray,
+    transition_matrix: np.ndarray,
+    observation_matrix: np.ndarray,
+    process_noise: np.ndarray,
+    observation_noise: np.ndarray,
+    dtype=np.float64
 ) -> Tuple[np.ndarray, np.ndarray]:
     """
     标准卡尔曼滤波主函数
@@ -19,38 +124,259 @@ def kalman_filter(
     observation_matrix: 观测矩阵 (m, n)
     process_noise: 系统噪声协方差 (n, n)
     observation_noise: 观测噪声协方差 (m, m)
+    dtype: 计算精度，状态维数较大时 float32 可将矩阵运算的内存带宽减半
     返回: 状态估计序列 (T, n), 协方差序列 (T, n, n)
+    长序列在多核上自动改用并行扫描实现 kalman_filter_parallel
     """
-    T = observations.shape[0]
-    n = initial_state.shape[0]
-    m = observations.shape[1]
+    if (
+        np.shape(observations)[0] >= KF_PARALLEL_MIN_T
+        and np.shape(initial_state)[0] <= KF_PARALLEL_MAX_N
+        and _numba_num_threads() >= KF_PARALLEL_MIN_THREADS
+    ):
+        return kalman_filter_parallel(
+            observations, initial_state, initial_cov, transition_matrix,
+            observation_matrix, process_noise, observation_noise, dtype
+        )
+    args = [
+        np.ascontiguousarray(a, dtype=dtype)
+        for a in (
+            observations, initial_state, initial_cov, transition_matrix,
+            observation_matrix, process_noise, observation_noise
+        )
+    ]
+    return _get_kf_core()(*args)
 
-    x = initial_state
-    P = initial_cov
-    xs = []
-    Ps = []
 
-    for t in range(T):
-        # 预测
-        x_pred = transition_matrix @ x
-        P_pred = transition_matrix @ P @ transition_matrix.T + process_noise
+def kalman_filter_batch(
+    observations: np.ndarray,
+    initial_state: np.ndarray,
+    initial_cov: np.ndarray,
+    transition_matrix: np.ndarray,
+    observation_matrix: np.ndarray,
+    process_noise: np.ndarray,
+    observation_noise: np.ndarray,
+    dtype=np.float64,
+    workers: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    批量卡尔曼滤波：多个站点/格点共享同一组 F/H/Q/R，沿批次维度向量化计算
+    observations: 观测序列 (B, T, m)
+    initial_state: 初始状态 (B, n)
+    initial_cov: 初始协方差 (B, n, n)
+    transition_matrix: 状态转移矩阵 (n, n)
+    observation_matrix: 观测矩阵 (m, n)
+    process_noise: 系统噪声协方差 (n, n)
+    observation_noise: 观测噪声协方差 (m, m)
+    dtype: 计算精度，GPU上 float32 的吞吐量通常远高于 float64
+    workers: numpy 后端下并行滤波的线程数，None 表示 CPU 核数
+    返回: 状态估计序列 (B, T, n), 协方差序列 (B, T, n, n)
+    设置 OEV_BACKEND=cupy 时，规模足够大的问题在GPU上计算
+    """
+    B, T = np.shape(observations)[:2]
+    n = np.shape(transition_matrix)[0]
+    xp = get_array_module(B * T * n * n)
 
-        # 更新
-        y = observations[t] - (observation_matrix @ x_pred)
-        S = observation_matrix @ P_pred @ observation_matrix.T + observation_noise
-        K = P_pred @ observation_matrix.T @ np.linalg.inv(S)
-        x = x_pred + K @ y
-        P = (np.eye(n) - K @ observation_matrix) @ P_pred
+    observations = xp.asarray(observations, dtype=dtype)
+    F = xp.asarray(transition_matrix, dtype=dtype)
+    H = xp.asarray(observation_matrix, dtype=dtype)
+    Q = xp.asarray(process_noise, dtype=dtype)
+    R = xp.asarray(observation_noise, dtype=dtype)
+
+    x0 = xp.asarray(initial_state, dtype=dtype)
+    P0 = xp.asarray(initial_cov, dtype=dtype)
+    xs = xp.empty((B, T, n), dtype=dtype)
+    Ps = xp.empty((B, T, n, n), dtype=dtype)
+
+    def _filter_chunk(b0: int) -> None:
+        b1 = min(b0 + chunk, B)
+        # 状态以列向量 (b, n, 1) 存储，矩阵乘法沿批次维度广播
+        x = x0[b0:b1, :, None]
+        P = P0[b0:b1]
+        for t in range(T):
+            # 预测
+            x_pred = F @ x
+            P_pred = F @ P @ F.T + Q
+
+            # 更新（linalg.solve 对每个批次的 S 分别求解）
+            HP = H @ P_pred
+            y = observations[b0:b1, t, :, None] - H @ x_pred
+            S = HP @ H.T + R
+            K = xp.linalg.solve(S, HP).transpose(0, 2, 1)
+            x = x_pred + K @ y
+            P = P_pred - K @ HP
+
+            xs[b0:b1, t] = x[:, :, 0]
+            Ps[b0:b1, t] = P
+
+    if xp is np:
+        # CPU上将站点/格点按批次切分，由线程池并行滤波
+        n_workers = workers if workers is not None else (os.cpu_count() or 1)
+        chunk = max(1, -(-B // max(1, n_workers)))
+        map_blocks(_filter_chunk, range(0, B, chunk), workers)
+    else:
+        chunk = B
+        _filter_chunk(0)
+
+    return to_numpy(xs), to_numpy(Ps)
+
+def _kf_scan_combine(Ai, bi, Ci, etai, Ji, Aj, bj, Cj, etaj, Jj):
+    """
+    并行扫描卡尔曼滤波的结合算子 a_i ⊗ a_j（i 在前，j 在后），作用于单个元素
+    A/C/J: (n, n)，b/eta: (n,)；单位元为 (I, 0, 0, 0, 0)
+    """
+    I = np.eye(Ai.shape[0], dtype=Ai.dtype)
+    # M = A_j (I + C_i J_j)^-1，N = A_i^T (I + J_j C_i)^-1，通过转置求解避免显式求逆
+    M = np.linalg.solve((I + Ci @ Jj).T, Aj.T).T
+    N = np.linalg.solve((I + Jj @ Ci).T, Ai).T
+    A = M @ Ai
+    b = M @ (bi + Ci @ etaj) + bj
+    C = M @ Ci @ Aj.T + Cj
+    eta = N @ (etaj - Jj @ bi) + etai
+    J = N @ Jj @ Ai + Ji
+    return A, b, C, eta, J
+
+
+def _kf_scan_core(A, b, C, eta, J):
+    """
+    Blelloch 前缀扫描（上扫 + 下扫），原地计算不含自身的前缀，总工作量 O(T)
+    元素个数须为2的幂；同一层内的结合运算互不依赖，由 prange 并行执行
+    返回全部元素的结合结果（包含自身的最后一个前缀）
+    """
+    P = A.shape[0]
+
+    # 上扫：每层将左子树的累积结果结合到右子树根节点
+    d = 1
+    while d < P:
+        step = 2 * d
+        for k in prange(P // step):
+            left = k * step + d - 1
+            right = k * step + step - 1
+            A[right], b[right], C[right], eta[right], J[right] = _kf_scan_combine(
+                A[left], b[left], C[left], eta[left], J[left],
+                A[right], b[right], C[right], eta[right], J[right]
+            )
+        d = step
+
+    total = (A[P - 1].copy(), b[P - 1].copy(), C[P - 1].copy(), eta[P - 1].copy(), J[P - 1].copy())
+
+    # 下扫：根节点置为单位元，左子节点取父节点前缀，右子节点取 父节点前缀 ⊗ 左子树累积
+    A[P - 1] = np.eye(A.shape[1], dtype=A.dtype)
+    b[P - 1] = 0.0
+    C[P - 1] = 0.0
+    eta[P - 1] = 0.0
+    J[P - 1] = 0.0
+    d = P // 2
+    while d >= 1:
+        step = 2 * d
+        for k in prange(P // step):
+            left = k * step + d - 1
+            right = k * step + step - 1
+            nA, nb, nC, neta, nJ = _kf_scan_combine(
+                A[right], b[right], C[right], eta[right], J[right],
+                A[left], b[left], C[left], eta[left], J[left]
+            )
+            A[left], b[left], C[left], eta[left], J[left] = A[right], b[right], C[right], eta[right], J[right]
+            A[right], b[right], C[right], eta[right], J[right] = nA, nb, nC, neta, nJ
+        d //= 2
+
+    return total
+
+
+def _get_kf_scan_core():
+    """
+    获取并行扫描核心函数：numba可用时编译为多线程版本，否则回退到逐层的Python循环
+    """
+    global _kf_scan_core_compiled
+    if _kf_scan_core_compiled is None:
+        try:
+            from numba import njit
+            # 扫描核心按全局名调用结合算子，先将其替换为编译版本
+            global _kf_scan_combine
+            _kf_scan_combine = njit(cache=True)(_kf_scan_combine)
+            _kf_scan_core_compiled = njit(parallel=True, cache=True)(_kf_scan_core)
+        except ImportError:
+            logger.warning("numba不可用，并行扫描卡尔曼滤波将使用NumPy实现")
+            _kf_scan_core_compiled = _kf_scan_core
+    return _kf_scan_core_compiled
+
+
+def kalman_filter_parallel(
+    observations: np.ndarray,
+    initial_state: np.ndarray,
+    initial_cov: np.ndarray,
+    transition_matrix: np.ndarray,
+    observation_matrix: np.ndarray,
+    process_noise: np.ndarray,
+    observation_noise: np.ndarray,
+    dtype=np.float64
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    并行扫描（结合律）形式的卡尔曼滤波，结果与 kalman_filter 一致
+    每个时刻构造滤波元素 (A, b, C, eta, J)，以 Blelloch 扫描求前缀得到滤波均值与协方差，
+    扫描深度 O(log T)、总工作量 O(T)，适用于多核上的长时间序列
+    参数与返回值同 kalman_filter
+    """
+    obs = np.asarray(observations, dtype=dtype)
+    x0 = np.asarray(initial_state, dtype=dtype)
+    P0 = np.asarray(initial_cov, dtype=dtype)
+    F = np.asarray(transition_matrix, dtype=dtype)
+    H = np.asarray(observation_matrix, dtype=dtype)
+    Q = np.asarray(process_noise, dtype=dtype)
+    R = np.asarray(observation_noise, dtype=dtype)
+
+    T = obs.shape[0]
+    n = x0.shape[0]
+    I = np.eye(n, dtype=dtype)
+    # 元素个数补齐到2的幂，补齐部分为单位元
+    P = 1 << max(T - 1, 0).bit_length()
+
+    # 一般时刻的元素（与观测无关的部分对所有时刻相同）
+    S = H @ Q @ H.T + R
+    K = np.linalg.solve(S, H @ Q).T
+    IKH = I - K @ H
+    HF = H @ F
+    A = np.empty((P, n, n), dtype=dtype)
+    C = np.zeros((P, n, n), dtype=dtype)
+    J = np.zeros((P, n, n), dtype=dtype)
+    b = np.zeros((P, n), dtype=dtype)
+    eta = np.zeros((P, n), dtype=dtype)
+    A[:T] = IKH @ F
+    A[T:] = I
+    C[:T] = IKH @ Q
+    J[:T] = HF.T @ np.linalg.solve(S, HF)
+    b[:T] = obs @ K.T
+    eta[:T] = np.linalg.solve(S, obs.T).T @ HF
 
-        xs.append(x.copy())
-        Ps.append(P.copy())
+    # 首个时刻由先验 (x0, P0) 直接给出滤波结果
+    x_pred = F @ x0
+    P_pred = F @ P0 @ F.T + Q
+    S1 = H @ P_pred @ H.T + R
+    K1 = np.linalg.solve(S1, H @ P_pred).T
+    A[0] = 0.0
+    b[0] = x_pred + K1 @ (obs[0] - H @ x_pred)
+    C[0] = P_pred - K1 @ S1 @ K1.T
+    eta[0] = 0.0
+    J[0] = 0.0
 
-    return np.array(xs), np.array(Ps)
+    total = _get_kf_scan_core()(A, b, C, eta, J)
+
+    # 不含自身的前缀左移一位即为包含自身的前缀，最后一个时刻取扫描总结果
+    xs = np.empty((T, n), dtype=dtype)
+    Ps = np.empty((T, n, n), dtype=dtype)
+    xs[:T - 1] = b[1:T]
+    Ps[:T - 1] = C[1:T]
+    if T == P:
+        xs[T - 1] = total[1]
+        Ps[T - 1] = total[2]
+    else:
+        xs[T - 1] = b[T]
+        Ps[T - 1] = C[T]
+    return xs, Ps
 
 # FastAPI API 封装
 from fastapi import APIRouter
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal
 
 router = APIRouter(
     prefix="/fusion/kalman",
@@ -65,30 +391,61 @@ class KFRequest(BaseModel):
     observation_matrix: List[List[float]]
     process_noise: List[List[float]]
     observation_noise: List[List[float]]
+    dtype: Literal["float32", "float64"] = "float64"  # 计算精度
 
 class KFResponse(BaseModel):
     state_estimates: List[List[float]]
     covariances: List[List[List[float]]]
 
-from app.core.json import custom_jsonable_encoder
+class KFBatchRequest(BaseModel):
+    observations: List[List[List[float]]]
+    initial_state: List[List[float]]
+    initial_cov: List[List[List[float]]]
+    transition_matrix: List[List[float]]
+    observation_matrix: List[List[float]]
+    process_noise: List[List[float]]
+    observation_noise: List[List[float]]
+    dtype: Literal["float32", "float64"] = "float64"  # 计算精度
+
+class KFBatchResponse(BaseModel):
+    state_estimates: List[List[List[float]]]
+    covariances: List[List[List[List[float]]]]
+
+from app.core.json import NumpyORJSONResponse
 
 @router.post("/run", response_model=KFResponse, summary="卡尔曼滤波计算")
 def run_kf(req: KFRequest):
     xs, Ps = kalman_filter(
-        np.array(req.observations),
-        np.array(req.initial_state),
-        np.array(req.initial_cov),
-        np.array(req.transition_matrix),
-        np.array(req.observation_matrix),
-        np.array(req.process_noise),
-        np.array(req.observation_noise)
+        np.asarray(req.observations, dtype=np.float64),
+        np.asarray(req.initial_state, dtype=np.float64),
+        np.asarray(req.initial_cov, dtype=np.float64),
+        np.asarray(req.transition_matrix, dtype=np.float64),
+        np.asarray(req.observation_matrix, dtype=np.float64),
+        np.asarray(req.process_noise, dtype=np.float64),
+        np.asarray(req.observation_noise, dtype=np.float64),
+        dtype=req.dtype
     )
     
-    # 使用我们的自定义JSON编码器
-    result = {
+    # 直接序列化NumPy数组，不经过Python列表转换
+    return NumpyORJSONResponse({
         "state_estimates": xs,
         "covariances": Ps
-    }
-    result = custom_jsonable_encoder(result)
-    
-    return KFResponse(**result)
+    })
+
+@router.post("/run_batch", response_model=KFBatchResponse, summary="批量卡尔曼滤波计算（多站点共享模型）")
+def run_kf_batch(req: KFBatchRequest):
+    xs, Ps = kalman_filter_batch(
+        np.asarray(req.observations, dtype=np.float64),
+        np.asarray(req.initial_state, dtype=np.float64),
+        np.asarray(req.initial_cov, dtype=np.float64),
+        np.asarray(req.transition_matrix, dtype=np.float64),
+        np.asarray(req.observation_matrix, dtype=np.float64),
+        np.asarray(req.process_noise, dtype=np.float64),
+        np.asarray(req.observation_noise, dtype=np.float64),
+        dtype=req.dtype
+    )
+
+    return NumpyORJSONResponse({
+        "state_estimates": xs,
+        "covariances": Ps
+    })
@@ -1,7 +1,9 @@
+import threading
 import numpy as np
-from scipy.spatial.distance import cdist
-from scipy.linalg import solve
-from typing import Tuple
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.algorithms.fusion._backend import map_blocks
 
 def exponential_covariance(d, sigma2, L):
     """
@@ -12,13 +14,69 @@ def exponential_covariance(d, sigma2, L):
     """
     return sigma2 * np.exp(-d / L)
 
+def _coords_covariance(A: np.ndarray, B: np.ndarray, sigma2: float, L: float, dtype=np.float64) -> np.ndarray:
+    """
+    两组坐标之间的指数型协方差矩阵
+    在 cdist 返回的距离矩阵上原地计算 sigma2*exp(-d/L)，不产生额外的整矩阵临时数组
+    dtype: 协方差矩阵的精度（float32 可使后续分解与求解使用单精度BLAS）
+    """
+    # scipy 导入耗时较长，延迟到首次计算时导入以加快服务启动
+    from scipy.spatial.distance import cdist
+
+    C = cdist(A, B).astype(dtype, copy=False)
+    C *= -1.0 / L
+    np.exp(C, out=C)
+    C *= sigma2
+    return C
+
+# 观测协方差分解缓存的总字节上限；单个分解为 N*N 个元素，按字节而非条目数淘汰
+OI_FACTOR_CACHE_BYTES = 256 * 1024 * 1024
+_factor_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_factor_cache_bytes = 0
+_factor_cache_lock = threading.Lock()
+
+def _factor_obs_cov(obs_coords: np.ndarray, sigma2: float, L: float, noise: float, dtype: np.dtype):
+    """
+    观测点协方差矩阵的Cholesky分解
+    观测网络与超参数通常在多次调用间保持不变，按 (坐标, 形状, sigma2, L, noise, 精度) 缓存分解结果；
+    缓存按总字节数做LRU淘汰，超过上限的单个分解不缓存
+    """
+    global _factor_cache_bytes
+    from scipy.linalg import cho_factor
+
+    key = (obs_coords.tobytes(), obs_coords.shape, sigma2, L, noise, dtype.name)
+    with _factor_cache_lock:
+        factor = _factor_cache.get(key)
+        if factor is not None:
+            _factor_cache.move_to_end(key)
+            return factor
+
+    C_obs = _coords_covariance(obs_coords, obs_coords, sigma2, L, dtype)
+    C_obs.flat[::obs_coords.shape[0] + 1] += noise
+    factor = cho_factor(C_obs, lower=True, check_finite=False)
+
+    nbytes = factor[0].nbytes + len(key[0])
+    if nbytes > OI_FACTOR_CACHE_BYTES:
+        return factor
+    with _factor_cache_lock:
+        if key not in _factor_cache:
+            _factor_cache[key] = factor
+            _factor_cache_bytes += nbytes
+            while _factor_cache_bytes > OI_FACTOR_CACHE_BYTES:
+                old_key, old_factor = _factor_cache.popitem(last=False)
+                _factor_cache_bytes -= old_factor[0].nbytes + len(old_key[0])
+    return factor
+
 def optimal_interpolation(
     obs_coords: np.ndarray,
     obs_values: np.ndarray,
     interp_coords: np.ndarray,
     sigma2: float = 1.0,
     L: float = 1.0,
-    noise: float = 1e-6
+    noise: float = 1e-6,
+    block_size: int = 4096,
+    dtype=np.float64,
+    workers: Optional[int] = None
 ) -> Tuple[np.ndarray, np.ndarray]:
     """
     最优插值主函数
@@ -28,36 +86,138 @@ def optimal_interpolation(
     sigma2: 信号方差
     L: 相关长度
     noise: 观测噪声
+    block_size: 插值点分块大小，内存占用上限为 block_size×N
+    dtype: 计算精度，float32 可将协方差矩阵内存与BLAS计算量减半（坐标距离仍按双精度计算）
+    workers: 并行处理插值点分块的线程数，None 表示 CPU 核数
     返回: 插值值 (M,), 插值误差 (M,)
     """
-    obs_coords = np.asarray(obs_coords)
-    obs_values = np.asarray(obs_values)
+    from scipy.linalg import cho_solve
+
+    dtype = np.dtype(dtype)
+    obs_coords = np.ascontiguousarray(obs_coords, dtype=np.float64)
+    obs_values = np.asarray(obs_values, dtype=dtype)
     interp_coords = np.asarray(interp_coords)
 
-    # 观测点之间的协方差矩阵
-    D_obs = cdist(obs_coords, obs_coords)
-    C_obs = exponential_covariance(D_obs, sigma2, L) + np.eye(len(obs_coords)) * noise
+    # 观测点之间协方差矩阵的Cholesky分解（带缓存）
+    C_obs_factor = _factor_obs_cov(obs_coords, sigma2, L, noise, dtype)
 
-    # 插值点与观测点的协方差
-    D_interp = cdist(interp_coords, obs_coords)
-    C_interp = exponential_covariance(D_interp, sigma2, L)
+    M = interp_coords.shape[0]
+    interp_values = np.empty(M, dtype=dtype)
+    interp_error = np.empty(M, dtype=dtype)
+    C0 = sigma2  # 协方差函数在0处的值
 
-    # 求解权重
-    weights = solve(C_obs, C_interp.T, assume_a='pos').T  # (M, N)
+    # 按插值点分块计算，避免一次性构造 M×N 的距离、协方差与权重矩阵
+    # 各分块共享观测协方差分解、互不依赖，由线程池并行处理
+    def _process_block(start: int) -> None:
+        stop = min(start + block_size, M)
 
-    # 插值估计
-    interp_values = weights @ obs_values
+        # 插值点与观测点的协方差
+        C_interp = _coords_covariance(interp_coords[start:stop], obs_coords, sigma2, L, dtype)
 
-    # 插值误差估计
-    C0 = sigma2  # 协方差函数在0处的值
-    interp_error = np.sqrt(np.maximum(C0 - np.sum(weights * C_interp, axis=1), 0))
+        # 求解权重
+        weights = cho_solve(C_obs_factor, C_interp.T, check_finite=False).T  # (B, N)
+
+        # 插值估计
+        interp_values[start:stop] = weights @ obs_values
+
+        # 插值误差估计（einsum 逐行乘加，不生成中间乘积）
+        interp_error[start:stop] = np.sqrt(np.maximum(C0 - np.einsum('ij,ij->i', weights, C_interp), 0))
+
+    map_blocks(_process_block, range(0, M, block_size), workers)
+
+    return interp_values, interp_error
+
+# 局部最优插值每个分块的临时数组内存预算（字节），分块大小按 k 自适应
+LOCAL_OI_BLOCK_BYTES = 64 * 1024 * 1024
+# 每个插值点在分块中占用的 (k, k) 临时数组个数（Gram矩阵、距离、协方差、有效掩码、求解副本等）
+_LOCAL_OI_KK_ARRAYS = 6
+
+def optimal_interpolation_local(
+    obs_coords: np.ndarray,
+    obs_values: np.ndarray,
+    interp_coords: np.ndarray,
+    sigma2: float = 1.0,
+    L: float = 1.0,
+    noise: float = 1e-6,
+    k_neighbors: int = 32,
+    cutoff: float = 5.0,
+    block_size: Optional[int] = None,
+    dtype=np.float64
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    局部最优插值：每个插值点仅使用距离 cutoff*L 以内最近的 k_neighbors 个观测
+    指数型协方差在数个相关长度之外可忽略，求解规模由 N 降为 k，适用于大规模观测网络
+    k_neighbors: 每个插值点使用的最大近邻观测数（>=1）
+    cutoff: 截断半径（以相关长度 L 为单位）
+    block_size: 插值点分块大小，None 表示按 LOCAL_OI_BLOCK_BYTES 与 k 计算
+    dtype: 局部协方差矩阵与求解的精度（近邻距离仍按双精度计算）
+    其余参数与返回值同 optimal_interpolation；无近邻观测的插值点返回 0，误差为 sqrt(sigma2)
+    """
+    from scipy.spatial import cKDTree
+
+    if k_neighbors < 1:
+        raise ValueError("k_neighbors 必须大于等于1")
+    dtype = np.dtype(dtype)
+    obs_coords = np.ascontiguousarray(obs_coords, dtype=np.float64)
+    obs_values = np.asarray(obs_values, dtype=dtype)
+    interp_coords = np.asarray(interp_coords, dtype=np.float64)
+
+    k = min(k_neighbors, obs_coords.shape[0])
+    if block_size is None:
+        # 临时数组按双精度估算，保证单个分块的内存占用不随 k 平方增长而失控
+        block_size = max(1, LOCAL_OI_BLOCK_BYTES // (_LOCAL_OI_KK_ARRAYS * k * k * 8))
+    tree = cKDTree(obs_coords)
+    diag = np.arange(k)
+
+    M = interp_coords.shape[0]
+    interp_values = np.empty(M, dtype=dtype)
+    interp_error = np.empty(M, dtype=dtype)
+
+    for start in range(0, M, block_size):
+        stop = min(start + block_size, M)
+        points = interp_coords[start:stop]
+        dists, idx = tree.query(points, k=k, distance_upper_bound=cutoff * L)
+        if k == 1:
+            dists = dists[:, None]
+            idx = idx[:, None]
+
+        # 截断半径外的近邻位置以无效标记填充，权重强制为0
+        valid = np.isfinite(dists)
+        idx = np.where(valid, idx, 0)
+        # 以插值点为原点的近邻坐标 (B, k, d)，减小展开式中的舍入误差
+        neighbors = obs_coords[idx] - points[:, None, :]
+
+        # 每个插值点的局部观测距离矩阵 (B, k, k)：|a-b|^2 = |a|^2 + |b|^2 - 2a·b，
+        # 不构造 (B, k, k, d) 的坐标差数组
+        sq_norms = np.einsum('bkd,bkd->bk', neighbors, neighbors)
+        D_local = np.matmul(neighbors, neighbors.transpose(0, 2, 1))
+        D_local *= -2.0
+        D_local += sq_norms[:, :, None]
+        D_local += sq_norms[:, None, :]
+        np.maximum(D_local, 0.0, out=D_local)
+        np.sqrt(D_local, out=D_local)
+
+        # 局部观测协方差矩阵 (B, k, k)，原地计算 sigma2*exp(-d/L)
+        C_local = D_local.astype(dtype, copy=False)
+        C_local *= -1.0 / L
+        np.exp(C_local, out=C_local)
+        C_local *= sigma2
+        C_local[~(valid[:, :, None] & valid[:, None, :])] = 0.0
+        C_local[:, diag, diag] += np.where(valid, noise, 1.0).astype(dtype)
+
+        # 插值点与近邻观测的协方差 (B, k)
+        C_interp = np.where(valid, exponential_covariance(np.where(valid, dists, 0.0), sigma2, L), 0.0).astype(dtype)
+
+        weights = np.linalg.solve(C_local, C_interp[:, :, None])[:, :, 0]
+        interp_values[start:stop] = np.einsum('ij,ij->i', weights, obs_values[idx])
+        interp_error[start:stop] = np.sqrt(np.maximum(sigma2 - np.einsum('ij,ij->i', weights, C_interp), 0))
 
     return interp_values, interp_error
 
 # FastAPI API 封装
 from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 router = APIRouter(
     prefix="/fusion/oi",
@@ -71,29 +231,43 @@ class OIRequest(BaseModel):
     sigma2: Optional[float] = 1.0
     L: Optional[float] = 1.0
     noise: Optional[float] = 1e-6
+    k_neighbors: Optional[int] = Field(None, ge=1, le=256)  # 设置后使用局部最优插值（近邻观测数）
+    cutoff: float = Field(5.0, gt=0)   # 局部最优插值截断半径（相关长度倍数）
+    dtype: Literal["float32", "float64"] = "float64"  # 计算精度（全局与局部最优插值均适用）
 
 class OIResponse(BaseModel):
     interp_values: List[float]
     interp_error: List[float]
 
-from app.core.json import custom_jsonable_encoder
+from app.core.json import NumpyORJSONResponse
 
 @router.post("/run", response_model=OIResponse, summary="最优插值计算")
 def run_oi(req: OIRequest):
-    interp_values, interp_error = optimal_interpolation(
-        np.array(req.obs_coords),
-        np.array(req.obs_values),
-        np.array(req.interp_coords),
-        sigma2=req.sigma2,
-        L=req.L,
-        noise=req.noise
-    )
+    if req.k_neighbors:
+        interp_values, interp_error = optimal_interpolation_local(
+            np.asarray(req.obs_coords, dtype=np.float64),
+            np.asarray(req.obs_values, dtype=np.float64),
+            np.asarray(req.interp_coords, dtype=np.float64),
+            sigma2=req.sigma2,
+            L=req.L,
+            noise=req.noise,
+            k_neighbors=req.k_neighbors,
+            cutoff=req.cutoff,
+            dtype=req.dtype
+        )
+    else:
+        interp_values, interp_error = optimal_interpolation(
+            np.asarray(req.obs_coords, dtype=np.float64),
+            np.asarray(req.obs_values, dtype=np.float64),
+            np.asarray(req.interp_coords, dtype=np.float64),
+            sigma2=req.sigma2,
+            L=req.L,
+            noise=req.noise,
+            dtype=req.dtype
+        )
     
-    # 使用自定义JSON编码器处理NumPy类型
-    result = {
+    # 直接序列化NumPy数组，不经过Python列表转换
+    return NumpyORJSONResponse({
         "interp_values": interp_values,
         "interp_error": interp_error
-    }
-    result = custom_jsonable_encoder(result)
-    
-    return OIResponse(**result)
+    })
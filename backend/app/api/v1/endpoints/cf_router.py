@@ -3,39 +3,251 @@ CF规范检查与转换API端点
 提供NetCDF文件的CF-1.8规范验证和转换功能
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks, Query
-from fastapi.responses import JSONResponse, FileResponse
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Depends, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import List, Dict, Any, Optional, Tuple
 import os
+import json
 import tempfile
 import logging
 from pathlib import Path
 import asyncio
+import aiofiles
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from pydantic import BaseModel
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+from rq.exceptions import NoSuchJobError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy.orm import Session
 
-from app.services.cf_validator import validate_netcdf_file, ValidationResult, ValidationLevel
+from app.services.cf_validator import validate_netcdf_file, ValidationResult, ValidationLevel, close_cached_datasets
 from app.services.cf_converter import convert_netcdf_to_cf
 from app.services.cf_monitor import CFMonitorService
+from app.services import cf_task_manager
+from app.db.session import get_db
+from app.core.responses import LargeFileResponse
+from app.core.json import NumpyORJSONResponse, dumps_numpy
+from app.core.fileops import is_netcdf_file, link_or_copy
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/cf", tags=["CF Compliance"])
+router = APIRouter(prefix="/cf", tags=["CF Compliance"], default_response_class=NumpyORJSONResponse)
 
 # 全局CF监控服务实例
 cf_monitor_service: Optional[CFMonitorService] = None
 
+# 上传文件分块写入大小
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# 批量验证时同时打开的文件数上限
+VALIDATE_BATCH_CONCURRENCY = 8
+
+# 正在进行的转换任务：文件路径 -> Future
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+async def run_deduplicated(key: str, func, *args):
+    """
+    在线程中执行 func(*args)；key 相同的并发调用共享同一次执行及其结果
+    事件循环为单线程，查找与登记之间没有 await，因此无需额外加锁
+    """
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        _inflight[key] = fut
+        fut.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield：某个请求被取消时不影响其他等待同一结果的请求
+    return await asyncio.shield(fut)
+
+
+def require_file(file_path: str, detail: Optional[str] = None) -> os.stat_result:
+    """
+    获取文件状态，文件不存在时返回404
+    以一次 stat 代替 exists 检查加后续访问，返回的状态可供调用方复用
+    """
+    try:
+        return os.stat(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=detail or f"文件不存在: {file_path}")
+
+
+async def save_upload_file(file: UploadFile, file_path: str) -> Tuple[int, str]:
+    """
+    将上传文件分块写入磁盘，内存占用与文件大小无关
+    写入的同时计算内容的SHA-256（OpenSSL实现，支持时使用CPU的SHA指令）
+    返回写入的字节数和SHA-256十六进制摘要
+    
+    直接写入最终目录而不经 /dev/shm 等内存文件系统中转：跨文件系统无法 rename，
+    中转后还需再完整复制一次；而随后的CF验证只读取文件头与坐标变量，
+    这部分数据刚写入、仍在页缓存中，不会产生第二次完整的磁盘读取
+    """
+    await asyncio.to_thread(os.makedirs, os.path.dirname(file_path), exist_ok=True)
+    size = 0
+    digest = hashlib.sha256()
+    async with aiofiles.open(file_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            await f.write(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+class _MultipartFileCollector:
+    """
+    python-multipart 流式解析回调：只收集指定表单字段中文件部分的事件
+    回调是同步的，事件先暂存，由 save_request_upload 在每次 write 后异步落盘
+    """
+
+    def __init__(self, field: str):
+        self.field = field.encode()
+        self.events: List[Tuple[str, Any]] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._in_file = options.get(b"name") == self.field and b"filename" in options
+        if self._in_file:
+            self.events.append(("begin", options[b"filename"].decode("utf-8", "replace")))
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self.events.append(("data", data[start:end]))
+
+    def on_part_end(self) -> None:
+        if self._in_file:
+            self.events.append(("end", None))
+            self._in_file = False
+
+
+async def save_request_upload(
+    request: Request,
+    dest_dir: str,
+    field: str = "file",
+    allowed=None,
+) -> Tuple[str, str, int, str]:
+    """
+    直接读取请求体字节流并写入 dest_dir，不经过 UploadFile 的 SpooledTemporaryFile
+    大文件不再先溢出到临时文件、再从临时文件复制到目标路径，磁盘写入减半
+    
+    multipart/form-data 请求用流式解析器取出 field 字段的文件；
+    其他请求（如 application/octet-stream）将整个请求体作为文件，文件名取自 ?filename=
+    allowed: 文件名校验函数，不通过时在写入任何数据之前返回400
+    返回 (文件名, 文件路径, 字节数, SHA-256十六进制摘要)
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    multipart = content_type == b"multipart/form-data"
+    boundary = params.get(b"boundary")
+    if multipart and not boundary:
+        raise HTTPException(status_code=400, detail="缺少multipart boundary")
+
+    filename = None
+    file_path = None
+    f = None
+    size = 0
+    digest = hashlib.sha256()
+    buffer = bytearray()
+
+    async def open_file(name: str):
+        nonlocal filename, file_path, f
+        filename = os.path.basename(name)
+        if not filename or (allowed is not None and not allowed(filename)):
+            raise HTTPException(status_code=400, detail="只支持NetCDF格式文件")
+        file_path = os.path.join(dest_dir, filename)
+        await asyncio.to_thread(os.makedirs, dest_dir, exist_ok=True)
+        f = await aiofiles.open(file_path, "wb")
+
+    async def append(data: bytes, flush: bool = False):
+        # 请求体分片通常只有几十KB，攒够 UPLOAD_CHUNK_SIZE 再写，减少线程切换
+        nonlocal size
+        digest.update(data)
+        size += len(data)
+        buffer.extend(data)
+        if buffer and (flush or len(buffer) >= UPLOAD_CHUNK_SIZE):
+            await f.write(bytes(buffer))
+            buffer.clear()
+
+    try:
+        if multipart:
+            collector = _MultipartFileCollector(field)
+            parser = MultipartParser(boundary, collector.callbacks())
+            done = False
+            async for chunk in request.stream():
+                parser.write(chunk)
+                for kind, payload in collector.events:
+                    # 只保存第一个文件部分，其余字段与文件忽略
+                    if done:
+                        break
+                    if kind == "begin":
+                        await open_file(payload)
+                    elif kind == "data":
+                        await append(payload)
+                    else:
+                        await append(b"", flush=True)
+                        done = True
+                collector.events.clear()
+            parser.finalize()
+        else:
+            await open_file(request.query_params.get("filename", ""))
+            async for chunk in request.stream():
+                await append(chunk)
+            await append(b"", flush=True)
+    finally:
+        if f is not None:
+            await f.close()
+
+    if f is None:
+        raise HTTPException(status_code=400, detail=f"请求中未找到上传文件字段: {field}")
+    return filename, file_path, size, digest.hexdigest()
+
 
 class ValidationRequest(BaseModel):
     """验证请求模型"""
     file_path: str
 
 
+class BatchValidationRequest(BaseModel):
+    """批量验证请求模型"""
+    file_paths: List[str]
+
+
 class ConversionRequest(BaseModel):
     """转换请求模型"""
     input_path: str
     output_path: Optional[str] = None
     auto_fix: bool = True
     backup: bool = True
+    run_async: bool = False  # 为True时提交到后台队列，立即返回任务ID
 
 
 class ValidationResponse(BaseModel):
@@ -58,6 +270,84 @@ class ConversionResponse(BaseModel):
     backup_path: Optional[str] = None
 
 
+@lru_cache(maxsize=512)
+def _cached_validate(path: str, mtime_ns: int, size: int) -> ValidationResult:
+    """
+    带缓存的文件验证，以 (路径, 修改时间, 大小) 为键，文件变化后自动失效
+    返回的结果对象在多个请求间共享，调用方不得修改
+    """
+    return validate_netcdf_file(path)
+
+
+def validate_file_cached(file_path: str, st: Optional[os.stat_result] = None) -> ValidationResult:
+    """
+    验证文件，未变化的文件直接返回缓存的验证结果
+    st: 调用方已获取的文件状态，避免重复 stat
+    """
+    abs_path = os.path.abspath(file_path)
+    if st is None:
+        st = os.stat(abs_path)
+    return _cached_validate(abs_path, st.st_mtime_ns, st.st_size)
+
+
+# 上传文件的验证结果按内容摘要缓存，同一文件重复上传时无需再次解析
+_VALIDATION_CACHE_BY_DIGEST_SIZE = 512
+_validation_cache_by_digest: "OrderedDict[str, ValidationResult]" = OrderedDict()
+# 上传验证在线程池中执行，缓存的读写与淘汰需加锁
+_validation_cache_by_digest_lock = threading.Lock()
+
+
+def validate_content_cached(file_path: str, content_sha256: str) -> ValidationResult:
+    """以文件内容的SHA-256为键验证文件（LRU淘汰）"""
+    with _validation_cache_by_digest_lock:
+        result = _validation_cache_by_digest.get(content_sha256)
+        if result is not None:
+            _validation_cache_by_digest.move_to_end(content_sha256)
+            return result
+    # 验证在锁外执行，不阻塞其他上传
+    result = validate_netcdf_file(file_path)
+    with _validation_cache_by_digest_lock:
+        _validation_cache_by_digest[content_sha256] = result
+        _validation_cache_by_digest.move_to_end(content_sha256)
+        while len(_validation_cache_by_digest) > _VALIDATION_CACHE_BY_DIGEST_SIZE:
+            _validation_cache_by_digest.popitem(last=False)
+    return result
+
+
+def summarize_issues(issues) -> tuple:
+    """
+    单次遍历验证问题：按级别计数并格式化问题列表
+    返回: ({级别: 数量}, 格式化后的问题列表)
+    """
+    counts = {level: 0 for level in ValidationLevel}
+    formatted = []
+    append = formatted.append
+    for issue in issues:
+        level = issue.level
+        counts[level] += 1
+        append({
+            'level': level.value,
+            'code': issue.code,
+            'message': issue.message,
+            'location': issue.location,
+            'suggestion': issue.suggestion
+        })
+    return counts, formatted
+
+
+def validation_summary(validation_result: ValidationResult) -> Dict[str, Any]:
+    """由验证结果构造验证响应内容（字段同 ValidationResponse）"""
+    counts, issues = summarize_issues(validation_result.issues)
+    return {
+        'is_valid': validation_result.is_valid,
+        'cf_version': validation_result.cf_version,
+        'critical_issues': counts[ValidationLevel.CRITICAL],
+        'warning_issues': counts[ValidationLevel.WARNING],
+        'info_issues': counts[ValidationLevel.INFO],
+        'issues': issues
+    }
+
+
 @router.post("/validate", response_model=ValidationResponse)
 async def validate_netcdf_compliance(request: ValidationRequest):
     """
@@ -67,108 +357,138 @@ async def validate_netcdf_compliance(request: ValidationRequest):
         file_path = request.file_path
         
         # 检查文件是否存在
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
+        st = require_file(file_path)
         
         # 验证文件
-        validation_result = validate_netcdf_file(file_path)
-        
-        # 统计问题数量
-        critical_count = len([i for i in validation_result.issues if i.level == ValidationLevel.CRITICAL])
-        warning_count = len([i for i in validation_result.issues if i.level == ValidationLevel.WARNING])
-        info_count = len([i for i in validation_result.issues if i.level == ValidationLevel.INFO])
-        
-        # 格式化问题列表
-        issues = [
-            {
-                'level': issue.level.value,
-                'code': issue.code,
-                'message': issue.message,
-                'location': issue.location,
-                'suggestion': issue.suggestion
-            }
-            for issue in validation_result.issues
-        ]
-        
-        return ValidationResponse(
-            is_valid=validation_result.is_valid,
-            cf_version=validation_result.cf_version,
-            critical_issues=critical_count,
-            warning_issues=warning_count,
-            info_issues=info_count,
-            issues=issues
-        )
+        # xarray/HDF5 读取是阻塞调用，放到线程中执行，避免占用事件循环
+        validation_result = await asyncio.to_thread(validate_file_cached, file_path, st)
+        
+        # 内容已是原生类型，直接序列化，跳过响应模型对问题列表的逐项校验
+        return NumpyORJSONResponse(validation_summary(validation_result))
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"验证文件失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"验证文件失败: {str(e)}")
 
 
-@router.post("/validate-upload")
-async def validate_uploaded_file(file: UploadFile = File(...)):
+def _validate_one(file_path: str) -> Dict[str, Any]:
+    """批量验证中的单个文件：文件不存在或读取失败时记录错误，不影响其他文件"""
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return {"file_path": file_path, "error": f"文件不存在: {file_path}"}
+    try:
+        result = validation_summary(validate_file_cached(file_path, st))
+    except Exception as e:
+        logger.error(f"验证文件失败: {file_path}: {str(e)}", exc_info=True)
+        return {"file_path": file_path, "error": str(e)}
+    result["file_path"] = file_path
+    return result
+
+
+@router.post("/validate-batch")
+async def validate_netcdf_batch(request: BatchValidationRequest):
+    """
+    批量验证多个NetCDF文件的CF-1.8规范符合性
+    各文件在线程池中并发打开与验证（最多 VALIDATE_BATCH_CONCURRENCY 个），
+    替代逐个调用 /validate 的串行往返；结果顺序与请求中的路径顺序一致
+    """
+    semaphore = asyncio.Semaphore(VALIDATE_BATCH_CONCURRENCY)
+
+    async def run(file_path: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await asyncio.to_thread(_validate_one, file_path)
+
+    results = await asyncio.gather(*[run(p) for p in request.file_paths])
+    return NumpyORJSONResponse({"results": results})
+
+
+@router.post("/validate-stream")
+async def validate_netcdf_stream(request: BatchValidationRequest):
+    """
+    流式批量验证多个NetCDF文件，以 NDJSON（每行一个JSON对象）逐个返回结果
+    与 /validate-batch 相同地并发验证，但每个文件验证完成即发送，客户端无需等待整批完成；
+    结果按完成顺序返回，各行的 file_path 字段标明对应文件
+    """
+    semaphore = asyncio.Semaphore(VALIDATE_BATCH_CONCURRENCY)
+
+    async def run(file_path: str) -> Dict[str, Any]:
+        async with semaphore:
+            return await asyncio.to_thread(_validate_one, file_path)
+
+    async def generate():
+        tasks = [asyncio.ensure_future(run(p)) for p in request.file_paths]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield dumps_numpy(await next_done) + b"\n"
+        finally:
+            # 客户端断开时取消尚未开始的验证
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.delete("/validate/cache")
+async def clear_validation_cache():
+    """
+    清空验证结果缓存
+    """
+    _cached_validate.cache_clear()
+    with _validation_cache_by_digest_lock:
+        _validation_cache_by_digest.clear()
+    return {"success": True, "message": "验证缓存已清空"}
+
+
+@router.post(
+    "/validate-upload",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"],
+                    }
+                },
+                "application/octet-stream": {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def validate_uploaded_file(request: Request):
     """
     验证上传的NetCDF文件的CF-1.8规范符合性，并暂存文件
+    请求体按到达顺序直接写入uploads目录；非multipart请求需通过 ?filename= 提供文件名
     """
     try:
-        # 检查文件格式
-        if not file.filename.lower().endswith(('.nc', '.netcdf', '.nc4')):
-            raise HTTPException(status_code=400, detail="只支持NetCDF格式文件")
-        
-        logger.info(f"开始验证上传文件: {file.filename}")
-        
-        # 创建uploads目录
+        # 保存文件到uploads目录，文件名在写入数据之前检查
         uploads_dir = os.path.join(os.getcwd(), "data", "uploads")
-        os.makedirs(uploads_dir, exist_ok=True)
-        
-        # 保存文件到uploads目录
-        file_path = os.path.join(uploads_dir, file.filename)
-        content = await file.read()
-        if not content:
+        filename, file_path, size, content_sha256 = await save_request_upload(
+            request, uploads_dir, allowed=is_netcdf_file
+        )
+        logger.info(f"开始验证上传文件: {filename}")
+        if not size:
+            await asyncio.to_thread(os.unlink, file_path)
             raise HTTPException(status_code=400, detail="文件内容为空")
         
-        logger.info(f"文件大小: {len(content)} bytes")
-        
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
+        logger.info(f"文件大小: {size} bytes")
         logger.info(f"文件已暂存: {file_path}")
         
         # 验证文件
-        validation_result = validate_netcdf_file(file_path)
+        validation_result = await asyncio.to_thread(validate_content_cached, file_path, content_sha256)
         
         logger.info(f"验证完成，结果: {validation_result.is_valid}")
         
-        # 统计问题数量
-        critical_count = len([i for i in validation_result.issues if i.level == ValidationLevel.CRITICAL])
-        warning_count = len([i for i in validation_result.issues if i.level == ValidationLevel.WARNING])
-        info_count = len([i for i in validation_result.issues if i.level == ValidationLevel.INFO])
-        
-        # 格式化问题列表
-        issues = [
-            {
-                'level': issue.level.value,
-                'code': issue.code,
-                'message': issue.message,
-                'location': issue.location,
-                'suggestion': issue.suggestion
-            }
-            for issue in validation_result.issues
-        ]
-        
         # 返回验证结果和文件路径
-        response = ValidationResponse(
-            is_valid=validation_result.is_valid,
-            cf_version=validation_result.cf_version,
-            critical_issues=critical_count,
-            warning_issues=warning_count,
-            info_issues=info_count,
-            issues=issues
-        )
-        
-        # 添加文件路径到响应中
-        response_dict = response.dict()
+        response_dict = validation_summary(validation_result)
         response_dict['file_path'] = file_path
-        response_dict['file_name'] = file.filename
+        response_dict['file_name'] = filename
+        response_dict['content_sha256'] = content_sha256
         
         return response_dict
         
@@ -190,8 +510,7 @@ async def convert_netcdf_to_cf_standard(request: ConversionRequest):
         output_path = request.output_path
         
         # 检查输入文件是否存在
-        if not os.path.exists(input_path):
-            raise HTTPException(status_code=404, detail=f"输入文件不存在: {input_path}")
+        require_file(input_path, f"输入文件不存在: {input_path}")
         
         # 如果未指定输出路径，则在同目录下生成
         if not output_path:
@@ -201,8 +520,16 @@ async def convert_netcdf_to_cf_standard(request: ConversionRequest):
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
+        # 大文件转换耗时较长，提交到后台队列，通过 /cf/jobs/{job_id} 查询结果
+        if request.run_async:
+            job_id = cf_task_manager.enqueue_task(
+                convert_netcdf_to_cf, input_path, output_path, request.auto_fix, request.backup
+            )
+            return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued", "output_path": output_path})
+        
         # 转换文件
-        convert_result = convert_netcdf_to_cf(
+        convert_result = await asyncio.to_thread(
+            convert_netcdf_to_cf,
             input_path=input_path,
             output_path=output_path,
             auto_fix=request.auto_fix,
@@ -218,6 +545,8 @@ async def convert_netcdf_to_cf_standard(request: ConversionRequest):
             backup_path=convert_result.get('backup_path')
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"转换文件失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"转换文件失败: {str(e)}")
@@ -227,34 +556,38 @@ async def convert_netcdf_to_cf_standard(request: ConversionRequest):
 async def convert_uploaded_file(
     file: UploadFile = File(...),
     auto_fix: bool = Query(True, description="是否自动修复问题"),
-    data_dir: str = Query("/app/data", description="数据存储目录")
+    data_dir: str = Query("/app/data", description="数据存储目录"),
+    run_async: bool = Query(False, description="是否提交到后台队列异步转换")
 ):
     """
     转换上传的NetCDF文件为CF-1.8标准格式
     """
     try:
         # 检查文件格式
-        if not file.filename.lower().endswith(('.nc', '.netcdf', '.nc4')):
+        if not is_netcdf_file(file.filename):
             raise HTTPException(status_code=400, detail="只支持NetCDF格式文件")
         
         # 保存上传的文件
         input_dir = os.path.join(data_dir, "uploads")
-        os.makedirs(input_dir, exist_ok=True)
-        
         input_path = os.path.join(input_dir, file.filename)
-        with open(input_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        await save_upload_file(file, input_path)
         
         # 设置输出路径
         output_dir = os.path.join(data_dir, "standard")
-        os.makedirs(output_dir, exist_ok=True)
+        await asyncio.to_thread(os.makedirs, output_dir, exist_ok=True)
         
         filename_without_ext = Path(file.filename).stem
         output_path = os.path.join(output_dir, f"{filename_without_ext}_cf.nc")
         
+        if run_async:
+            job_id = cf_task_manager.enqueue_task(
+                cf_task_manager.convert_uploaded_netcdf, input_path, output_path, auto_fix
+            )
+            return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued", "output_path": output_path})
+        
         # 转换文件
-        convert_result = convert_netcdf_to_cf(
+        convert_result = await asyncio.to_thread(
+            convert_netcdf_to_cf,
             input_path=input_path,
             output_path=output_path,
             auto_fix=auto_fix,
@@ -282,28 +615,49 @@ async def convert_uploaded_file(
         raise HTTPException(status_code=500, detail=f"转换上传文件失败: {str(e)}")
 
 
+@router.get("/jobs/{job_id}", summary="查询CF转换后台任务状态与结果")
+def get_conversion_job_status(job_id: str):
+    try:
+        return cf_task_manager.get_task_status(job_id)
+    except NoSuchJobError:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    except (RedisConnectionError, RedisTimeoutError) as e:
+        logger.error(f"查询任务状态时无法连接Redis: {e}")
+        raise HTTPException(status_code=503, detail="任务队列服务不可用")
+
+
+# 监控服务未启动时的状态响应为固定内容，预先序列化
+_MONITOR_STOPPED_JSON = json.dumps(
+    {"status": "stopped", "message": "监控服务未启动"}, ensure_ascii=False, separators=(",", ":")
+).encode("utf-8")
+
+
 @router.get("/monitor/status")
-async def get_monitor_status():
+async def get_monitor_status(
+    detail: bool = Query(False, description="是否返回待处理文件列表（完整列表也可通过 /monitor/pending 获取）")
+):
     """
     获取CF规范监控服务状态
     """
     global cf_monitor_service
     
     if not cf_monitor_service:
-        return {"status": "stopped", "message": "监控服务未启动"}
+        return Response(content=_MONITOR_STOPPED_JSON, media_type="application/json")
     
     # 获取详细状态
-    detailed_status = cf_monitor_service.get_monitor_status()
+    detailed_status = cf_monitor_service.get_monitor_status(detail)
     
-    return {
+    status = {
         "status": "running" if detailed_status.get("service_running") else "stopped",
         "data_dir": detailed_status.get("data_dir"),
         "processing_results_count": detailed_status.get("processing_results_count", 0),
         "monitoring_active": detailed_status.get("monitoring_active", False),
         "observer_running": detailed_status.get("observer_running", False),
-        "pending_files_count": detailed_status.get("count", 0),
-        "pending_files": detailed_status.get("pending_files", [])
+        "pending_files_count": detailed_status.get("count", 0)
     }
+    if detail:
+        status["pending_files"] = detailed_status.get("pending_files", [])
+    return status
 
 
 @router.post("/monitor/start")
@@ -401,12 +755,13 @@ async def process_file_manually(file_path: str = Query(..., description="文件
         raise HTTPException(status_code=404, detail="监控服务未启动")
     
     try:
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
+        require_file(file_path)
         
-        result = cf_monitor_service.process_file_manually(file_path)
+        result = await asyncio.to_thread(cf_monitor_service.process_file_manually, file_path)
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"手动处理文件失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"手动处理文件失败: {str(e)}")
@@ -421,26 +776,77 @@ async def download_converted_file(file_path: str):
         # 安全检查：确保文件路径在允许的目录内
         abs_path = os.path.abspath(file_path)
         
-        if not os.path.exists(abs_path):
-            raise HTTPException(status_code=404, detail="文件不存在")
+        st = require_file(abs_path, "文件不存在")
         
         # 检查文件是否为NetCDF格式
-        if not abs_path.lower().endswith(('.nc', '.netcdf', '.nc4')):
+        if not is_netcdf_file(abs_path):
             raise HTTPException(status_code=400, detail="只能下载NetCDF格式文件")
         
         filename = os.path.basename(abs_path)
         
-        return FileResponse(
+        return LargeFileResponse(
             path=abs_path,
+            stat_result=st,
             filename=filename,
             media_type='application/octet-stream'
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"下载文件失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"下载文件失败: {str(e)}")
 
 
+def _scan_netcdf_files(root: str, rel_prefix: str = ""):
+    """
+    递归遍历目录，单次遍历中按扩展名筛选NetCDF文件
+    使用 os.scandir 的 DirEntry 缓存的类型信息，每个文件只做一次 stat
+    产出 (name, rel_path, full_path, size, mtime) 元组；相对路径由逐层传递的前缀拼接，
+    不再对每个文件调用 os.path.relpath
+    与 pathlib glob 一致：不进入指向目录的符号链接，无法读取的目录与文件直接跳过
+    """
+    try:
+        it = os.scandir(root)
+    except OSError as e:
+        logger.warning(f"无法读取目录: {e}")
+        return
+    with it:
+        for entry in it:
+            name = entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _scan_netcdf_files(entry.path, rel_prefix + name + os.sep)
+                elif entry.is_file() and is_netcdf_file(name):
+                    st = entry.stat()
+                    yield name, rel_prefix + name, entry.path, st.st_size, st.st_mtime
+            except OSError as e:
+                logger.warning(f"无法读取文件: {e}")
+
+
+def _scan_subdir(subdir_path: str) -> List[Dict[str, Any]]:
+    """扫描单个子目录，不存在时返回空列表；仅在最外层把元组转换为响应字典"""
+    if not os.path.isdir(subdir_path):
+        return []
+    return [
+        {"name": n, "path": r, "full_path": f, "size": sz, "modified": m}
+        for n, r, f, sz, m in _scan_netcdf_files(subdir_path)
+    ]
+
+
+async def scan_directory_structure(data_dir: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    扫描数据目录下 raw/processing/standard 三个子目录中的NetCDF文件
+    各子目录相互独立，分别在线程中并发扫描，网络挂载目录下可重叠 stat 延迟
+    """
+    subdirs = ["raw", "processing", "standard"]
+    results = await asyncio.gather(*[
+        asyncio.to_thread(_scan_subdir, os.path.join(data_dir, subdir))
+        for subdir in subdirs
+    ])
+    return dict(zip(subdirs, results))
+
+
 @router.get("/directory/structure")
 async def get_directory_structure(data_dir: str = Query(..., description="数据目录路径")):
     """
@@ -450,67 +856,49 @@ async def get_directory_structure(data_dir: str = Query(..., description="数据
         if not os.path.exists(data_dir):
             raise HTTPException(status_code=404, detail=f"目录不存在: {data_dir}")
         
-        data_path = Path(data_dir)
-        structure = {
-            "raw": [],
-            "processing": [],
-            "standard": []
-        }
-        
-        # 扫描各个子目录
-        for subdir in ["raw", "processing", "standard"]:
-            subdir_path = data_path / subdir
-            if subdir_path.exists():
-                for pattern in ['**/*.nc', '**/*.netcdf', '**/*.nc4']:
-                    files = list(subdir_path.glob(pattern))
-                    for file_path in files:
-                        rel_path = file_path.relative_to(subdir_path)
-                        structure[subdir].append({
-                            "name": file_path.name,
-                            "path": str(rel_path),
-                            "full_path": str(file_path),
-                            "size": file_path.stat().st_size,
-                            "modified": file_path.stat().st_mtime
-                        })
-        
-        return structure
+        return await scan_directory_structure(data_dir)
         
     except Exception as e:
         logger.error(f"获取目录结构失败: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"获取目录结构失败: {str(e)}")
 
 
+# CF标准信息为静态内容，模块加载时构造并序列化一次
+_CF_STANDARDS_INFO = {
+    "cf_version": "CF-1.8",
+    "description": "Climate and Forecast Metadata Conventions",
+    "url": "http://cfconventions.org/",
+    "required_global_attributes": [
+        "Conventions",
+        "title",
+        "institution",
+        "source",
+        "history"
+    ],
+    "standard_coordinate_names": {
+        "longitude": ["longitude", "lon", "x"],
+        "latitude": ["latitude", "lat", "y"],
+        "time": ["time", "t"],
+        "depth": ["depth", "z", "level"]
+    },
+    "common_units": {
+        "temperature": "degree_C",
+        "salinity": "psu",
+        "pressure": "dbar",
+        "longitude": "degrees_east",
+        "latitude": "degrees_north",
+        "depth": "m"
+    }
+}
+_CF_STANDARDS_INFO_JSON = json.dumps(_CF_STANDARDS_INFO, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
 @router.get("/standards/info")
 async def get_cf_standards_info():
     """
     获取CF标准信息
     """
-    return {
-        "cf_version": "CF-1.8",
-        "description": "Climate and Forecast Metadata Conventions",
-        "url": "http://cfconventions.org/",
-        "required_global_attributes": [
-            "Conventions",
-            "title",
-            "institution",
-            "source",
-            "history"
-        ],
-        "standard_coordinate_names": {
-            "longitude": ["longitude", "lon", "x"],
-            "latitude": ["latitude", "lat", "y"],
-            "time": ["time", "t"],
-            "depth": ["depth", "z", "level"]
-        },
-        "common_units": {
-            "temperature": "degree_C",
-            "salinity": "psu",
-            "pressure": "dbar",
-            "longitude": "degrees_east",
-            "latitude": "degrees_north",
-            "depth": "m"
-        }
-    }
+    return Response(content=_CF_STANDARDS_INFO_JSON, media_type="application/json")
 
 
 # 应用启动时的初始化函数
@@ -546,6 +934,8 @@ def cleanup_cf_monitor():
             logger.error(f"停止CF监控服务失败: {str(e)}", exc_info=True)
         finally:
             cf_monitor_service = None
+    
+    close_cached_datasets()
 
 
 @router.get("/monitor/pending")
@@ -575,14 +965,13 @@ async def get_pending_files():
 @router.post("/convert-and-extract")
 async def convert_file_and_extract_metadata(
     file_path: str = Query(..., description="uploads目录中的文件路径"),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """
     转换文件为CF标准格式并提取元数据保存到数据库
     """
     try:
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
+        require_file(file_path)
         
         logger.info(f"开始转换文件并提取元数据: {file_path}")
         
@@ -604,11 +993,10 @@ async def convert_file_and_extract_metadata(
         # 1. 将原始文件备份到processing目录
         # 2. 转换文件并直接保存到指定的output_path
         # 3. 提取元数据并保存到数据库
-        convert_result = convert_netcdf_to_cf(
-            input_path=file_path,
-            output_path=output_path,
-            auto_fix=True,
-            backup=True
+        # 同一文件的并发请求共享一次转换
+        convert_result = await run_deduplicated(
+            os.path.abspath(file_path),
+            convert_netcdf_to_cf, file_path, output_path, True, True
         )
         
         if not convert_result['success']:
@@ -616,34 +1004,25 @@ async def convert_file_and_extract_metadata(
         
         logger.info(f"文件已成功转换: {file_path} -> {output_path}")
         
-        # 在后台任务中删除uploads文件
-        background_tasks.add_task(delete_upload_file, file_path)
+        # 交由后台清理任务删除uploads文件
+        schedule_upload_delete(file_path)
         
-        # 查询已保存的元数据记录ID
-        from app.db.session import SessionLocal
+        # 查询已保存的元数据记录ID（仅取ID列）
         from app.db.models import NetCDFMetadata
         
-        session = SessionLocal()
-        try:
-            # 查找已保存的元数据记录
-            metadata_record = session.query(NetCDFMetadata).filter(
-                NetCDFMetadata.file_path == output_path
-            ).first()
-            
-            metadata_id = metadata_record.id if metadata_record else None
-            
-            return {
-                "success": True,
-                "message": "文件转换成功，元数据已提取并保存",
-                "output_path": output_path,
-                "backup_path": convert_result.get('backup_path'),
-                "metadata_id": metadata_id,
-                "issues_fixed": convert_result.get('issues_fixed', []),
-                "remaining_issues": convert_result.get('remaining_issues', [])
-            }
-            
-        finally:
-            session.close()
+        metadata_id = db.query(NetCDFMetadata.id).filter(
+            NetCDFMetadata.file_path == output_path
+        ).scalar()
+        
+        return {
+            "success": True,
+            "message": "文件转换成功，元数据已提取并保存",
+            "output_path": output_path,
+            "backup_path": convert_result.get('backup_path'),
+            "metadata_id": metadata_id,
+            "issues_fixed": convert_result.get('issues_fixed', []),
+            "remaining_issues": convert_result.get('remaining_issues', [])
+        }
         
     except HTTPException:
         raise
@@ -655,14 +1034,13 @@ async def convert_file_and_extract_metadata(
 @router.post("/extract-metadata")
 async def extract_metadata_only(
     file_path: str = Query(..., description="uploads目录中的文件路径"),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    db: Session = Depends(get_db)
 ):
     """
     直接从符合规范的文件中提取元数据保存到数据库
     """
     try:
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
+        require_file(file_path)
         
         logger.info(f"开始提取元数据: {file_path}")
         
@@ -673,9 +1051,8 @@ async def extract_metadata_only(
         filename = os.path.basename(file_path)
         standard_path = os.path.join(thredds_data_dir, filename)
         
-        # 复制文件到standard目录
-        import shutil
-        shutil.copy2(file_path, standard_path)
+        # 放置到standard目录（uploads中的文件随后删除，同一文件系统内直接建立硬链接）
+        link_or_copy(file_path, standard_path)
         
         # 导入元数据提取器
         from app.services.metadata_extractor import MetadataExtractor
@@ -684,35 +1061,28 @@ async def extract_metadata_only(
         extractor = MetadataExtractor()
         metadata = extractor.extract_metadata(standard_path, processing_status="standard")
         
-        # 保存到数据库
-        from app.db.session import SessionLocal
+        # 保存到数据库（使用请求级会话，由连接池复用连接）
         from app.db.models import NetCDFMetadata
         
-        # 创建数据库会话
-        session = SessionLocal()
-        
         try:
             # 创建元数据记录
             metadata_record = NetCDFMetadata(**metadata)
-            session.add(metadata_record)
-            session.commit()
+            db.add(metadata_record)
+            db.commit()
             logger.info(f"元数据已保存到数据库: {standard_path}")
-            
-            # 在后台任务中删除uploads文件
-            background_tasks.add_task(delete_upload_file, file_path)
-            
-            return {
-                "success": True,
-                "message": "元数据提取成功并已保存",
-                "file_path": standard_path,
-                "metadata_id": metadata_record.id
-            }
-            
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+        except Exception:
+            db.rollback()
+            raise
+        
+        # 交由后台清理任务删除uploads文件
+        schedule_upload_delete(file_path)
+        
+        return {
+            "success": True,
+            "message": "元数据提取成功并已保存",
+            "file_path": standard_path,
+            "metadata_id": metadata_record.id
+        }
         
     except HTTPException:
         raise
@@ -751,3 +1121,51 @@ def delete_upload_file(file_path: str):
             logger.info(f"后台任务已删除文件: {file_path}")
     except Exception as e:
         logger.error(f"后台删除文件失败: {file_path}, 错误: {str(e)}")
+
+
+# uploads文件后台清理：单个常驻任务从队列批量取出路径并删除，代替每个请求各自调度一次后台任务
+UPLOAD_DELETE_BATCH_SIZE = 64
+_upload_delete_queue: Optional[asyncio.Queue] = None
+_upload_delete_task: Optional[asyncio.Task] = None
+
+
+def _delete_upload_files(file_paths: List[str]):
+    """批量删除uploads文件"""
+    for file_path in file_paths:
+        delete_upload_file(file_path)
+
+
+async def _upload_delete_worker(queue: asyncio.Queue):
+    """后台清理任务：等待删除请求，每次最多取出 UPLOAD_DELETE_BATCH_SIZE 个路径在线程中删除"""
+    while True:
+        file_paths = [await queue.get()]
+        while len(file_paths) < UPLOAD_DELETE_BATCH_SIZE and not queue.empty():
+            file_paths.append(queue.get_nowait())
+        await asyncio.to_thread(_delete_upload_files, file_paths)
+
+
+def schedule_upload_delete(file_path: str):
+    """
+    将uploads文件加入后台删除队列
+    清理任务在首次使用时于当前事件循环中启动
+    """
+    global _upload_delete_queue, _upload_delete_task
+    if _upload_delete_task is None or _upload_delete_task.done() or _upload_delete_task.get_loop() is not asyncio.get_running_loop():
+        _upload_delete_queue = asyncio.Queue()
+        _upload_delete_task = asyncio.create_task(_upload_delete_worker(_upload_delete_queue))
+    _upload_delete_queue.put_nowait(file_path)
+
+
+async def stop_upload_sweeper():
+    """停止后台清理任务，队列中剩余的文件在停止前删除"""
+    global _upload_delete_queue, _upload_delete_task
+    if _upload_delete_task is None:
+        return
+    _upload_delete_task.cancel()
+    remaining = []
+    while not _upload_delete_queue.empty():
+        remaining.append(_upload_delete_queue.get_nowait())
+    if remaining:
+        await asyncio.to_thread(_delete_upload_files, remaining)
+    _upload_delete_queue = None
+    _upload_delete_task = None
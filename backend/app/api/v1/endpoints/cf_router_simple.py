@@ -7,11 +7,17 @@ from fastapi import APIRouter, HTTPException, UploadFile, File, Query
 from fastapi.responses import FileResponse
 from typing import List, Dict, Any, Optional
 import os
+import io
+import asyncio
 import tempfile
 import logging
+import importlib.util
+import aiofiles
 from pathlib import Path
 from pydantic import BaseModel
 
+from app.core.fileops import is_netcdf_file
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/cf", tags=["CF Compliance"])
@@ -19,6 +25,102 @@ router = APIRouter(prefix="/cf", tags=["CF Compliance"])
 # 全局CF监控服务实例 - 先设为None，后续实现
 cf_monitor_service: Optional[Any] = None
 
+# 上传文件分块读取大小
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# 不超过该大小的上传文件在内存中验证，不落盘
+IN_MEMORY_UPLOAD_MAX_SIZE = 32 << 20
+
+
+# 推荐的全局属性及其缺失时的问题条目，模块加载时构造一次
+_RECOMMENDED_GLOBAL_ATTRS = ('title', 'institution', 'source')
+_MISSING_ATTR_ISSUES = {
+    attr: {
+        'level': 'warning',
+        'code': f'MISSING_{attr.upper()}',
+        'message': f'缺少推荐的全局属性: {attr}',
+        'location': 'global',
+        'suggestion': f'添加 {attr} 属性'
+    }
+    for attr in _RECOMMENDED_GLOBAL_ATTRS
+}
+
+
+# h5netcdf 直接读取HDF5属性，开销低于 netCDF4-C 库；未安装时使用xarray默认引擎
+_H5NETCDF_AVAILABLE = importlib.util.find_spec("h5netcdf") is not None
+
+
+def _open_attrs_dataset(file_path: str):
+    """
+    以仅读取元信息的方式打开NetCDF文件：关闭CF解码、坐标解码与掩码缩放，
+    验证只检查全局属性，不需要构造解码后的坐标变量
+    h5netcdf 无法读取NetCDF3（非HDF5）文件，此时退回默认引擎
+    """
+    import xarray as xr
+    options = dict(decode_cf=False, decode_times=False, decode_coords=False, mask_and_scale=False)
+    if _H5NETCDF_AVAILABLE:
+        try:
+            return xr.open_dataset(file_path, engine="h5netcdf", **options)
+        except Exception:
+            pass
+    return xr.open_dataset(file_path, **options)
+
+
+def _decode_attr(value):
+    """HDF5属性值转换为Python类型：单元素数组取标量，numpy标量转为内置类型，字节串解码"""
+    import numpy as np
+    if isinstance(value, np.ndarray):
+        value = value.reshape(-1)[0] if value.size == 1 else value.tolist()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    return value
+
+
+def _read_global_attrs(file_path: str) -> Dict[str, Any]:
+    """
+    直接读取NetCDF全局属性，不经过xarray的维度、坐标与CF解码流程
+    NetCDF4（HDF5）文件优先用h5py读取根组属性；h5py不可用或文件不是HDF5格式（NetCDF3）时
+    用netCDF4库读取；两者均不可用时退回xarray
+    """
+    try:
+        import h5py
+        with h5py.File(file_path, "r") as f:
+            return {name: _decode_attr(value) for name, value in f.attrs.items()}
+    except (ImportError, OSError):
+        pass
+    try:
+        import netCDF4
+    except ImportError:
+        with _open_attrs_dataset(file_path) as ds:
+            return dict(ds.attrs)
+    with netCDF4.Dataset(file_path, "r") as nc:
+        return {name: nc.getncattr(name) for name in nc.ncattrs()}
+
+
+def _read_global_attrs_from_memory(data: bytes) -> Dict[str, Any]:
+    """
+    从内存中的文件内容读取NetCDF全局属性
+    HDF5格式用h5py读取文件对象；否则用netCDF4的内存数据集（同时支持NetCDF3与NetCDF4）；
+    两者均不可用时由xarray读取文件对象
+    """
+    try:
+        import h5py
+        with h5py.File(io.BytesIO(data), "r") as f:
+            return {name: _decode_attr(value) for name, value in f.attrs.items()}
+    except (ImportError, OSError):
+        pass
+    try:
+        import netCDF4
+    except ImportError:
+        import xarray as xr
+        with xr.open_dataset(io.BytesIO(data), decode_cf=False, decode_times=False,
+                             decode_coords=False, mask_and_scale=False) as ds:
+            return dict(ds.attrs)
+    with netCDF4.Dataset("inmemory.nc", "r", memory=data) as nc:
+        return {name: nc.getncattr(name) for name in nc.ncattrs()}
+
 
 class ValidationRequest(BaseModel):
     """验证请求模型"""
@@ -35,6 +137,51 @@ class ValidationResponse(BaseModel):
     issues: List[Dict[str, Any]] = []
 
 
+def _attrs_validation_response(attrs: Dict[str, Any]) -> ValidationResponse:
+    """根据全局属性生成基础验证结果"""
+    issues = []
+    critical_count = 0
+    warning_count = 0
+    
+    # 检查Conventions属性
+    conventions = attrs.get('Conventions', '')
+    if not conventions:
+        issues.append({
+            'level': 'critical',
+            'code': 'MISSING_CONVENTIONS',
+            'message': '缺少Conventions属性',
+            'location': 'global',
+            'suggestion': "添加 Conventions = 'CF-1.8'"
+        })
+        critical_count += 1
+    elif 'CF' not in str(conventions):
+        issues.append({
+            'level': 'warning',
+            'code': 'INVALID_CONVENTIONS',
+            'message': f'Conventions属性可能无效: {conventions}',
+            'location': 'global',
+            'suggestion': "建议设置 Conventions = 'CF-1.8'"
+        })
+        warning_count += 1
+    
+    # 检查基本全局属性：属性名集合只构造一次，问题条目使用预先构造的模板
+    attrs_keys = frozenset(attrs)
+    missing = [attr for attr in _RECOMMENDED_GLOBAL_ATTRS if attr not in attrs_keys]
+    issues.extend(_MISSING_ATTR_ISSUES[attr] for attr in missing)
+    warning_count += len(missing)
+    
+    is_valid = critical_count == 0
+    cf_version = conventions if 'CF' in str(conventions) else None
+    
+    return ValidationResponse(
+        is_valid=is_valid,
+        cf_version=cf_version,
+        critical_issues=critical_count,
+        warning_issues=warning_count,
+        issues=issues
+    )
+
+
 @router.get("/standards/info")
 async def get_cf_standards_info():
     """
@@ -95,7 +242,7 @@ async def validate_netcdf_compliance(request: ValidationRequest):
             raise HTTPException(status_code=404, detail=f"文件不存在: {file_path}")
         
         # 基础验证 - 检查文件是否为NetCDF格式
-        if not file_path.lower().endswith(('.nc', '.netcdf', '.nc4')):
+        if not is_netcdf_file(file_path):
             return ValidationResponse(
                 is_valid=False,
                 critical_issues=1,
@@ -110,57 +257,9 @@ async def validate_netcdf_compliance(request: ValidationRequest):
         
         # 尝试打开文件进行基础验证
         try:
-            import xarray as xr
-            with xr.open_dataset(file_path, decode_times=False) as ds:
-                issues = []
-                critical_count = 0
-                warning_count = 0
-                
-                # 检查Conventions属性
-                conventions = ds.attrs.get('Conventions', '')
-                if not conventions:
-                    issues.append({
-                        'level': 'critical',
-                        'code': 'MISSING_CONVENTIONS',
-                        'message': '缺少Conventions属性',
-                        'location': 'global',
-                        'suggestion': "添加 Conventions = 'CF-1.8'"
-                    })
-                    critical_count += 1
-                elif 'CF' not in str(conventions):
-                    issues.append({
-                        'level': 'warning',
-                        'code': 'INVALID_CONVENTIONS',
-                        'message': f'Conventions属性可能无效: {conventions}',
-                        'location': 'global',
-                        'suggestion': "建议设置 Conventions = 'CF-1.8'"
-                    })
-                    warning_count += 1
-                
-                # 检查基本全局属性
-                recommended_attrs = ['title', 'institution', 'source']
-                for attr in recommended_attrs:
-                    if attr not in ds.attrs:
-                        issues.append({
-                            'level': 'warning',
-                            'code': f'MISSING_{attr.upper()}',
-                            'message': f'缺少推荐的全局属性: {attr}',
-                            'location': 'global',
-                            'suggestion': f'添加 {attr} 属性'
-                        })
-                        warning_count += 1
-                
-                is_valid = critical_count == 0
-                cf_version = conventions if 'CF' in str(conventions) else None
-                
-                return ValidationResponse(
-                    is_valid=is_valid,
-                    cf_version=cf_version,
-                    critical_issues=critical_count,
-                    warning_issues=warning_count,
-                    issues=issues
-                )
-                
+            attrs = _read_global_attrs(file_path)
+            return _attrs_validation_response(attrs)
+            
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"无法读取NetCDF文件: {str(e)}")
             
@@ -176,16 +275,28 @@ async def validate_uploaded_file(file: UploadFile = File(...)):
     """
     try:
         # 检查文件格式
-        if not file.filename.lower().endswith(('.nc', '.netcdf', '.nc4')):
+        if not is_netcdf_file(file.filename):
             raise HTTPException(status_code=400, detail="只支持NetCDF格式文件")
         
-        # 保存临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.nc') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
+        # 小文件直接在内存中读取全局属性，不写临时文件
+        buffer = bytearray()
+        while len(buffer) <= IN_MEMORY_UPLOAD_MAX_SIZE:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                attrs = await asyncio.to_thread(_read_global_attrs_from_memory, bytes(buffer))
+                return _attrs_validation_response(attrs)
+            buffer.extend(chunk)
         
+        # 超过阈值时保存临时文件：已读取的部分先写入，其余分块异步写入，复制期间不阻塞事件循环
+        fd, temp_path = tempfile.mkstemp(suffix='.nc')
+        os.close(fd)
         try:
+            async with aiofiles.open(temp_path, 'wb') as temp_file:
+                await temp_file.write(bytes(buffer))
+                del buffer
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    await temp_file.write(chunk)
+            
             # 调用验证接口
             result = await validate_netcdf_compliance(ValidationRequest(file_path=temp_path))
             return result
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from app.services.data_converter import DataConverter
 import os
-import shutil
+import asyncio
+import aiofiles
+from functools import lru_cache
 from pathlib import Path
 
 router = APIRouter(
@@ -10,45 +12,60 @@ router = APIRouter(
 )
 
 # 获取基础目录
-BASE_DATA_DIR = os.path.join("backend", "docker", "thredds", "data", "oceanenv")
-RAW_DIR = os.path.join(BASE_DATA_DIR, "raw")
-STANDARD_DIR = os.path.join(BASE_DATA_DIR, "standard") 
-PROCESSING_DIR = os.path.join(BASE_DATA_DIR, "processing")
+BASE_DATA_DIR = Path("backend", "docker", "thredds", "data", "oceanenv")
+RAW_DIR = BASE_DATA_DIR / "raw"
+STANDARD_DIR = BASE_DATA_DIR / "standard"
+PROCESSING_DIR = BASE_DATA_DIR / "processing"
 
-# 确保目录存在
-os.makedirs(RAW_DIR, exist_ok=True)
-os.makedirs(STANDARD_DIR, exist_ok=True)
-os.makedirs(PROCESSING_DIR, exist_ok=True)
+# 上传文件分块写入大小
+UPLOAD_CHUNK_SIZE = 1 << 20
 
-converter = DataConverter(PROCESSING_DIR)  # 使用processing作为临时工作目录
+# 无需转换、直接移入standard目录的文件类型
+NETCDF_FILE_TYPES = frozenset({"netcdf", "nc"})
+
+@lru_cache(maxsize=1)
+def ensure_data_dirs() -> None:
+    """确保raw/standard/processing目录存在；仅在应用启动或首次使用时执行一次，导入模块时不访问文件系统"""
+    for directory in (RAW_DIR, STANDARD_DIR, PROCESSING_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+
+@lru_cache(maxsize=1)
+def get_converter() -> DataConverter:
+    """转换器依赖：首次使用时创建，之后各请求复用同一实例；使用processing作为临时工作目录"""
+    ensure_data_dirs()
+    return DataConverter(str(PROCESSING_DIR))
 
 @router.post("", summary="数据文件格式转换为NetCDF")
 async def convert_data_file(
     file: UploadFile = File(...),
-    file_type: str = Form(...)
+    file_type: str = Form(...),
+    converter: DataConverter = Depends(get_converter)
 ):
     try:
         # 1. 保存上传文件到raw目录
-        raw_file_path = os.path.join(RAW_DIR, file.filename)
-        with open(raw_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        raw_file_path = RAW_DIR / file.filename
+        # 分块异步写入，复制期间不阻塞事件循环，内存占用与文件大小无关
+        async with aiofiles.open(raw_file_path, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await out.write(chunk)
         
         # 2. 转换文件，指定输出到standard目录
         output_filename = Path(file.filename).stem + ".nc"
-        standard_file_path = os.path.join(STANDARD_DIR, output_filename)
-        
-        # 使用自定义转换逻辑
-        nc_path = converter.convert_to_path(raw_file_path, standard_file_path, file_type)
-        
-        # 3. 转换成功后删除raw目录中的原文件
-        if os.path.exists(nc_path) and os.path.exists(raw_file_path):
-            os.remove(raw_file_path)
+        standard_file_path = STANDARD_DIR / output_filename
         
-        # 返回相对于standard目录的路径
-        relative_path = os.path.relpath(nc_path, STANDARD_DIR)
+        if file_type.lower() in NETCDF_FILE_TYPES:
+            # 已是NetCDF，无需转换：raw与standard位于同一文件系统，直接重命名移动，不复制数据
+            await asyncio.to_thread(os.replace, raw_file_path, standard_file_path)
+        else:
+            # 使用自定义转换逻辑
+            await asyncio.to_thread(converter.convert_to_path, str(raw_file_path), str(standard_file_path), file_type)
+            
+            # 3. 转换成功后删除raw目录中的原文件
+            raw_file_path.unlink(missing_ok=True)
         
         return {
-            "netcdf_path": f"standard/{relative_path}",
+            # 返回相对于standard目录的路径
+            "netcdf_path": f"standard/{output_filename}",
             "message": "转换成功，文件已保存到standard目录"
         }
         
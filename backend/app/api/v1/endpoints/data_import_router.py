@@ -6,6 +6,7 @@
 from fastapi import APIRouter, HTTPException, Query, Path, Depends
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
+import time
 import logging
 
 from app.db.session import get_db
@@ -189,6 +190,19 @@ def create_dataset_template(
     try:
         from app.db.models import DatasetTemplate as DatasetTemplateModel
         
+        if db.get_bind().dialect.insert_returning:
+            # 支持 INSERT ... RETURNING 的数据库一次往返取得含服务端默认值的完整行；
+            # 提交前转换为响应模型，避免提交后对象过期再次查询
+            from sqlalchemy import insert
+            template = db.scalars(
+                insert(DatasetTemplateModel).returning(DatasetTemplateModel),
+                [template_data.dict()]
+            ).one()
+            result = DatasetTemplate.model_validate(template)
+            db.commit()
+            return result
+        
+        # MySQL 不支持 RETURNING，提交后重新读取服务端生成的字段
         template = DatasetTemplateModel(**template_data.dict())
         db.add(template)
         db.commit()
@@ -252,6 +266,10 @@ def list_cf_standard_names(
         logger.error(f"获取CF标准名称列表失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"获取CF标准名称列表失败: {str(e)}")
 
+# MySQL ngram 全文解析器的分词长度（ngram_token_size，默认2）
+CF_SEARCH_NGRAM_SIZE = 2
+
+
 @router.get("/cf-standards/search/{variable_name}", response_model=List[CFStandardName], summary="搜索CF标准名称")
 def search_cf_standard_names(
     variable_name: str = Path(..., description="变量名称"),
@@ -261,13 +279,44 @@ def search_cf_standard_names(
     根据变量名称搜索相关的CF标准名称
     """
     try:
+        from sqlalchemy import select, text
         from app.db.models import CFStandardName as CFStandardNameModel
         
-        # 搜索标准名称、别名和描述
+        term = variable_name.lower()
+        if db.get_bind().dialect.name != "mysql":
+            # ngram 全文索引与多值索引仅在 MySQL 上创建，其他数据库使用可移植的查询
+            cf_names = db.query(CFStandardNameModel).filter(
+                CFStandardNameModel.standard_name.contains(term) |
+                CFStandardNameModel.aliases.contains([term]) |
+                CFStandardNameModel.description.contains(term)
+            ).order_by(CFStandardNameModel.usage_count.desc()).limit(10).all()
+            return cf_names
+        
+        # 别名精确匹配，由 aliases 上的多值索引支持
+        by_alias = select(CFStandardNameModel.id).where(
+            text("(:alias MEMBER OF (cf_standard_names.aliases))").bindparams(alias=term)
+        )
+        
+        # 标准名称和描述的子串匹配：布尔模式下的短语检索在 ngram 索引中即为子串查找，
+        # 比短于 ngram 长度（默认2）的词无法走全文索引，退回 LIKE
+        phrase = term.replace('"', "")
+        if len(phrase) >= CF_SEARCH_NGRAM_SIZE:
+            by_text = select(CFStandardNameModel.id).where(
+                text(
+                    "MATCH (cf_standard_names.standard_name, cf_standard_names.description) "
+                    "AGAINST (:phrase IN BOOLEAN MODE)"
+                ).bindparams(phrase=f'"{phrase}"')
+            )
+        else:
+            by_text = select(CFStandardNameModel.id).where(
+                CFStandardNameModel.standard_name.contains(term) |
+                CFStandardNameModel.description.contains(term)
+            )
+        
+        # 两个分支各自走索引，只合并主键，再按使用次数取前10条，一次往返完成
+        matched_ids = by_text.union(by_alias).subquery()
         cf_names = db.query(CFStandardNameModel).filter(
-            CFStandardNameModel.standard_name.contains(variable_name.lower()) |
-            CFStandardNameModel.aliases.contains([variable_name.lower()]) |
-            CFStandardNameModel.description.contains(variable_name.lower())
+            CFStandardNameModel.id.in_(select(matched_ids.c.id))
         ).order_by(CFStandardNameModel.usage_count.desc()).limit(10).all()
         
         return cf_names
@@ -446,41 +495,68 @@ def cleanup_old_records(
         logger.error(f"清理旧记录失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"清理旧记录失败: {str(e)}")
 
+# 统计结果缓存有效期（秒），仪表盘轮询时避免重复查询数据库
+STATISTICS_CACHE_TTL = 60
+_statistics_cache: Dict[str, Any] = {"expires": 0.0, "value": None}
+
+
+def _query_system_statistics(db: Session) -> Dict[str, Any]:
+    """
+    两次查询完成全部统计：
+    导入记录按 (文件类型, 状态) 分组计数，总数与两个分布均由分组结果汇总得到；
+    CF标准名称总数、模板总数与启用模板数通过标量子查询在同一条语句中取得
+    """
+    from sqlalchemy import select, func, case
+    from app.db.models import DataImportRecord, CFStandardName, DatasetTemplate
+
+    grouped = db.execute(
+        select(
+            DataImportRecord.file_type,
+            DataImportRecord.import_status,
+            func.count(DataImportRecord.id)
+        ).group_by(DataImportRecord.file_type, DataImportRecord.import_status)
+    ).all()
+
+    total_cf_names, total_templates, active_templates = db.execute(
+        select(
+            select(func.count(CFStandardName.id)).scalar_subquery(),
+            select(func.count(DatasetTemplate.id)).scalar_subquery(),
+            select(
+                func.count(case((DatasetTemplate.is_active == True, 1)))
+            ).scalar_subquery()
+        )
+    ).one()
+
+    total_imports = 0
+    file_type_counts: Dict[Any, int] = {}
+    status_counts: Dict[Any, int] = {}
+    for file_type, import_status, count in grouped:
+        total_imports += count
+        file_type_counts[file_type] = file_type_counts.get(file_type, 0) + count
+        status_counts[import_status] = status_counts.get(import_status, 0) + count
+
+    return {
+        "total_imports": total_imports,
+        "total_cf_standard_names": total_cf_names,
+        "total_templates": total_templates,
+        "active_templates": active_templates or 0,
+        "file_type_distribution": [{"type": t, "count": c} for t, c in file_type_counts.items()],
+        "status_distribution": [{"status": st, "count": c} for st, c in status_counts.items()]
+    }
+
+
 @router.get("/statistics", summary="获取系统统计信息")
 def get_system_statistics(db: Session = Depends(get_db)):
     """
     获取数据导入系统的整体统计信息
+    结果缓存 STATISTICS_CACHE_TTL 秒
     """
     try:
-        from app.db.models import DataImportRecord, CFStandardName, DatasetTemplate
-        
-        # 基础统计
-        total_imports = db.query(DataImportRecord).count()
-        total_cf_names = db.query(CFStandardName).count()
-        total_templates = db.query(DatasetTemplate).count()
-        active_templates = db.query(DatasetTemplate).filter(DatasetTemplate.is_active == True).count()
-        
-        # 文件类型统计
-        from sqlalchemy import func
-        file_type_stats = db.query(
-            DataImportRecord.file_type,
-            func.count(DataImportRecord.id).label('count')
-        ).group_by(DataImportRecord.file_type).all()
-        
-        # 状态统计
-        status_stats = db.query(
-            DataImportRecord.import_status,
-            func.count(DataImportRecord.id).label('count')
-        ).group_by(DataImportRecord.import_status).all()
-        
-        return {
-            "total_imports": total_imports,
-            "total_cf_standard_names": total_cf_names,
-            "total_templates": total_templates,
-            "active_templates": active_templates,
-            "file_type_distribution": [{"type": stat[0], "count": stat[1]} for stat in file_type_stats],
-            "status_distribution": [{"status": stat[0], "count": stat[1]} for stat in status_stats]
-        }
+        now = time.monotonic()
+        if _statistics_cache["value"] is None or now >= _statistics_cache["expires"]:
+            _statistics_cache["value"] = _query_system_statistics(db)
+            _statistics_cache["expires"] = now + STATISTICS_CACHE_TTL
+        return _statistics_cache["value"]
     except Exception as e:
         logger.error(f"获取系统统计失败: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"获取系统统计失败: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"获取系统统计失败: {str(e)}") 
@@ -1,20 +1,31 @@
 from fastapi import APIRouter, HTTPException, Query, Path, Depends, UploadFile, File, Form
 from typing import List, Dict, Optional, Any
 import os
-from fastapi.responses import FileResponse, JSONResponse
+import stat
+from fastapi.responses import JSONResponse, Response
 from enum import Enum
 import httpx
+import asyncio
 import xml.etree.ElementTree as ET
+try:
+    from lxml import etree as LET
+except ImportError:  # lxml 为可选依赖，缺失时使用标准库 ElementTree 的增量解析器
+    LET = None
 import urllib.parse
+import re
 import time
 import logging
-from pathlib import Path as PathlibPath
 from datetime import datetime
 import uuid
+import functools
+import threading
 import aiofiles
 import shutil
+from collections import OrderedDict, defaultdict
 
-from app.core.json import custom_jsonable_encoder  # 导入我们的JSON编码器
+from app.core.json import dumps_numpy, NumpyORJSONResponse  # 导入我们的JSON编码器
+from app.core.responses import LargeFileResponse
+from app.core.http import get_http_client
 from app.schemas.dataset import (
     FileUploadResponse, DataPreview, MetadataConfig, ValidationResult, 
     ConversionResult, FileType, ParseStatus
@@ -42,12 +53,180 @@ THREDDS_CATALOG_PATH = "/thredds/catalog/catalog.xml"
 THREDDS_OPENDAP_PATH = "/thredds/dodsC"
 THREDDS_HTTP_PATH = "/thredds/fileServer"
 
+# 数据集访问地址前缀
+THREDDS_OPENDAP_PREFIX = f"{THREDDS_SERVER_URL}{THREDDS_OPENDAP_PATH}/"
+THREDDS_HTTP_PREFIX = f"{THREDDS_SERVER_URL}{THREDDS_HTTP_PATH}/"
+
+# 按urlPath（小写）中的关键词推断数据来源，按顺序匹配第一条：(关键词, source_type)
+_THREDDS_SOURCE_RULES = (
+    (("model",), "MODEL"),
+    (("satellite",), "SATELLITE"),
+    (("buoy",), "BUOY"),
+    (("survey", "ctd"), "SURVEY"),
+)
+# 模型数据按关键词进一步区分数据类型
+_THREDDS_MODEL_DATA_TYPES = (("forecast", "FORECAST"), ("reanalysis", "REANALYSIS"))
+
+
+def _classify_thredds_path(path_lower: str) -> tuple:
+    """根据小写的urlPath推断 (source_type, data_type)，默认为模型来源的观测数据"""
+    for keywords, source_type in _THREDDS_SOURCE_RULES:
+        if any(keyword in path_lower for keyword in keywords):
+            if source_type == "MODEL":
+                for keyword, data_type in _THREDDS_MODEL_DATA_TYPES:
+                    if keyword in path_lower:
+                        return source_type, data_type
+            return source_type, "OBSERVATIONS"
+    return "MODEL", "OBSERVATIONS"
+
+
+# URL规范化：合并协议分隔符以外的连续斜杠
+_DOUBLE_SLASH = re.compile(r'(?<!:)/{2,}')
+_THREDDS_CATALOG_SEGMENT = 'thredds/catalog'
+
+
+def _collapse_dup_thredds_catalog(url: str) -> str:
+    """重复出现的thredds/catalog只保留一个：删除第一次与最后一次出现之间的部分"""
+    first = url.find(_THREDDS_CATALOG_SEGMENT)
+    last = url.rfind(_THREDDS_CATALOG_SEGMENT)
+    return url[:first] + url[last:] if last > first else url
+
+# 递归解析Catalog时同时向THREDDS发出的最大请求数
+THREDDS_CATALOG_CONCURRENCY = 16
+
+# 不小于该大小（字节）的数据块在线程中解析，避免大Catalog的XML解析阻塞事件循环；小块直接解析，省去线程切换开销
+THREDDS_CATALOG_THREAD_PARSE_MIN = 64 * 1024
+
+# Catalog解析结果缓存时间（秒）：{(catalog_url, recursive, depth): (过期时间, 数据集列表)}
+THREDDS_CATALOG_CACHE_TTL = 60.0
+# 缓存条目上限（每个子Catalog各占一条）；超过时先清除过期条目，仍超出则淘汰最早写入的条目
+THREDDS_CATALOG_CACHE_MAXSIZE = 1024
+_catalog_cache: Dict[tuple, tuple] = {}
+_catalog_cache_locks: Dict[tuple, asyncio.Lock] = defaultdict(asyncio.Lock)
+# 根Catalog格式化后按ID建立的索引，与Catalog缓存同时过期：(过期时间, {数据集ID: 数据集})
+_dataset_index_cache: Optional[tuple] = None
+
 # XML命名空间
 XML_NAMESPACES = {
     'thredds': 'http://www.unidata.ucar.edu/namespaces/thredds/InvCatalog/v1.0',
     'xlink': 'http://www.w3.org/1999/xlink'
 }
 
+# Catalog 流式解析使用的完整标签名；不带命名空间的标签仅在文档中没有带命名空间的同名元素时使用
+THREDDS_DATASET_TAG = f"{{{XML_NAMESPACES['thredds']}}}dataset"
+THREDDS_CATALOG_REF_TAG = f"{{{XML_NAMESPACES['thredds']}}}catalogRef"
+THREDDS_DOCUMENTATION_TAG = f"{{{XML_NAMESPACES['thredds']}}}documentation"
+XLINK_HREF_ATTR = f"{{{XML_NAMESPACES['xlink']}}}href"
+XML_PARSE_ERRORS = (ET.ParseError,) + ((LET.XMLSyntaxError,) if LET is not None else ())
+
+
+class _ThreddsCatalogParser:
+    """
+    THREDDS Catalog 增量解析器
+    随 HTTP 响应分块喂入 XML，在元素结束时提取 dataset 与 catalogRef 信息并立即清空元素，
+    一次遍历完成两类元素的收集，不构建完整文档树；lxml 可用时使用 lxml，否则使用标准库
+    """
+
+    def __init__(self):
+        if LET is not None:
+            self._parser = LET.XMLPullParser(events=("start", "end"), huge_tree=False)
+        else:
+            self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._order = 0
+        # 当前打开的 dataset：(文档顺序, 是否带 urlPath)；带 urlPath 的 dataset 结束前需保留其子元素以收集说明文档
+        self._open_datasets: List[tuple] = []
+        # 标准库元素没有 getparent，自行记录当前打开的元素链，用于从父节点移除已处理的元素
+        self._open_elements: List = []
+        self._datasets = {True: [], False: []}
+        self._catalog_refs = {True: [], False: []}
+        self._taken_refs = 0
+        self._closed = False
+
+    def feed(self, data: bytes) -> None:
+        self._parser.feed(data)
+        self._drain()
+
+    def close(self) -> None:
+        self._parser.close()
+        self._drain()
+        self._closed = True
+
+    def _drain(self) -> None:
+        track_parents = LET is None
+        for event, elem in self._parser.read_events():
+            if track_parents:
+                if event == "start":
+                    self._open_elements.append(elem)
+                else:
+                    self._open_elements.pop()
+            tag = elem.tag
+            if not isinstance(tag, str):  # lxml 的注释与处理指令
+                continue
+            if event == "start":
+                if tag == THREDDS_DATASET_TAG or tag == "dataset":
+                    # 记录开始顺序，使结果保持文档顺序（与 findall 一致）
+                    self._open_datasets.append((self._order, elem.get("urlPath") is not None))
+                    self._order += 1
+                continue
+
+            if tag == THREDDS_DATASET_TAG or tag == "dataset":
+                order, _ = self._open_datasets.pop()
+                self._add_dataset(elem, order, namespaced=tag == THREDDS_DATASET_TAG)
+            elif tag == THREDDS_CATALOG_REF_TAG or tag == "catalogRef":
+                href = elem.get(XLINK_HREF_ATTR) or elem.get("href")
+                self._catalog_refs[tag == THREDDS_CATALOG_REF_TAG].append(href)
+            else:
+                continue
+            if not any(has_url_path for _, has_url_path in self._open_datasets):
+                self._release(elem)
+
+    def _add_dataset(self, elem, order: int, namespaced: bool) -> None:
+        url_path = elem.get("urlPath")
+        if not url_path:
+            return
+        dataset_info = {"id": elem.get("ID"), "name": elem.get("name"), "urlPath": url_path}
+        documentation_elements = list(elem.iter(THREDDS_DOCUMENTATION_TAG))
+        if not documentation_elements:
+            documentation_elements = list(elem.iter("documentation"))
+        if documentation_elements:
+            dataset_info["description"] = ' '.join(doc.text or '' for doc in documentation_elements)
+        self._datasets[namespaced].append((order, dataset_info))
+
+    def _release(self, elem) -> None:
+        """
+        清空已处理的元素并将其从文档树中移除，释放内存：
+        lxml 下删除父节点中已处理的前序兄弟元素，标准库下直接从父节点移除该元素
+        """
+        elem.clear()
+        if LET is not None:
+            parent = elem.getparent()
+            while elem.getprevious() is not None:
+                del parent[0]
+        elif self._open_elements:
+            self._open_elements[-1].remove(elem)
+
+    @property
+    def datasets(self) -> List[Dict]:
+        found = self._datasets[True] or self._datasets[False]
+        return [info for _, info in sorted(found, key=lambda item: item[0])]
+
+    @property
+    def catalog_refs(self) -> List[Optional[str]]:
+        return self._catalog_refs[True] or self._catalog_refs[False]
+
+    def take_new_catalog_refs(self) -> List[Optional[str]]:
+        """
+        返回自上次调用以来新解析出的catalogRef href，供解析过程中提前启动子Catalog请求
+        不带命名空间的catalogRef仅在文档解析完成且没有带命名空间的catalogRef时返回
+        """
+        if self._closed and not self._catalog_refs[True]:
+            refs = self._catalog_refs[False]
+        else:
+            refs = self._catalog_refs[True]
+        new_refs = refs[self._taken_refs:]
+        self._taken_refs = len(refs)
+        return new_refs
+
 # 检查路径正确性
 if not os.path.exists(PROCESSED_DATA_PATH):
     print(f"警告: 处理数据目录不存在: {PROCESSED_DATA_PATH}")
@@ -64,10 +243,38 @@ class DataLocation(str, Enum):
     PROCESSED = "processed"  # 处理过的原始数据
     THREDDS = "thredds"     # Thredds格式化数据
 
+# 各数据位置的根目录（绝对路径）
+_DATA_LOCATION_ROOTS = {
+    DataLocation.PROCESSED: os.path.abspath(PROCESSED_DATA_PATH),
+    DataLocation.THREDDS: os.path.abspath(THREDDS_DATA_PATH),
+}
+
+
+# 下载文件扩展名（小写）对应的媒体类型，其余类型按 application/octet-stream 下载
+_DOWNLOAD_MEDIA_TYPES = {
+    ".nc": "application/x-netcdf",
+    ".csv": "text/csv",
+    ".json": "application/json",
+}
+
+
+def _resolve_data_path(location: DataLocation, relpath: str) -> str:
+    """
+    将数据位置下的相对路径解析为绝对路径
+    相对路径经规范化后必须仍位于该位置的根目录内，包含 ../ 或绝对路径等越界情况返回400；
+    按路径字面判断，不解析符号链接，数据目录中指向其他位置的链接仍可访问
+    """
+    root = _DATA_LOCATION_ROOTS.get(location)
+    if root is None:
+        raise HTTPException(status_code=400, detail=f"不支持的数据位置: {location}")
+    file_path = os.path.normpath(os.path.join(root, relpath))
+    if not file_path.startswith(root + os.sep):
+        raise HTTPException(status_code=400, detail=f"无效的文件路径: {relpath}")
+    return file_path
+
 @router.get("/debug/catalog-path", summary="测试不同的catalog路径")
-def test_different_catalog_paths():
-    """测试不同的catalog路径"""
-    import requests
+async def test_different_catalog_paths():
+    """测试不同的catalog路径（并发请求各路径）"""
     paths = [
         "http://localhost:8080/thredds/catalog.xml",
         "http://localhost:8080/thredds/catalog/catalog.xml",
@@ -75,27 +282,31 @@ def test_different_catalog_paths():
         "http://localhost:8080/thredds/catalog/catalog/catalog.xml"
     ]
     
+    client = get_http_client()
+    responses = await asyncio.gather(
+        *[client.get(path, timeout=5.0) for path in paths],
+        return_exceptions=True
+    )
+    
     results = []
-    for path in paths:
-        try:
-            print(f"Testing path: {path}")
-            response = requests.get(path, timeout=5.0)
-            result = {
-                "path": path,
-                "status": response.status_code,
-                "success": response.status_code == 200
-            }
-            if response.status_code == 200:
-                result["content_type"] = response.headers.get("content-type")
-                result["length"] = len(response.text)
-                result["preview"] = response.text[:100]
-            results.append(result)
-        except Exception as e:
+    for path, response in zip(paths, responses):
+        if isinstance(response, Exception):
             results.append({
                 "path": path,
-                "error": str(e),
+                "error": str(response),
                 "success": False
             })
+            continue
+        result = {
+            "path": path,
+            "status": response.status_code,
+            "success": response.status_code == 200
+        }
+        if response.status_code == 200:
+            result["content_type"] = response.headers.get("content-type")
+            result["length"] = len(response.text)
+            result["preview"] = response.text[:100]
+        results.append(result)
     
     return results
     
@@ -146,16 +357,10 @@ def test_url_building():
             sub_url = f"{base_url}/{clean_href}"
         
         # 修复重复的thredds/catalog
-        fixed_url = sub_url
-        if sub_url.count('thredds/catalog') > 1:
-            parts = sub_url.split('thredds/catalog')
-            fixed_url = f"{server_url}/thredds/catalog{parts[-1]}"
+        fixed_url = _collapse_dup_thredds_catalog(sub_url)
         
         # 规范化URL中的双斜杠
-        normalized_url = fixed_url.replace('://', '$$PROTO$$')
-        while '//' in normalized_url:
-            normalized_url = normalized_url.replace('//', '/')
-        normalized_url = normalized_url.replace('$$PROTO$$', '://')
+        normalized_url = _DOUBLE_SLASH.sub('/', fixed_url)
         
         results.append({
             "input": {"catalog_url": catalog_url, "href": href},
@@ -169,15 +374,14 @@ def test_url_building():
     
     return results
 
-@router.get("/debug/requests", summary="使用requests测试访问Catalog")
-def test_requests_catalog_access():
-    """使用requests测试访问Catalog XML"""
-    import requests
+@router.get("/debug/requests", summary="使用共享HTTP客户端测试访问Catalog")
+async def test_requests_catalog_access():
+    """使用共享HTTP客户端测试访问Catalog XML"""
     try:
         catalog_url = "http://localhost:8080/thredds/catalog/catalog.xml"
-        print(f"Testing catalog access with requests: {catalog_url}")
+        logger.info(f"使用共享HTTP客户端测试访问Catalog: {catalog_url}")
         
-        response = requests.get(catalog_url, timeout=10.0)
+        response = await get_http_client().get(catalog_url, timeout=10.0)
             
         if response.status_code != 200:
             return {"error": f"Failed to access catalog: {response.status_code}"}
@@ -192,15 +396,26 @@ def test_requests_catalog_access():
     except Exception as e:
         return {"error": f"Exception: {str(e)}"}
 
+@router.post("/debug/cache/clear", summary="清空THREDDS Catalog缓存")
+async def clear_catalog_cache():
+    """清空THREDDS Catalog解析结果缓存与OPeNDAP增强元数据缓存，下次请求重新获取"""
+    global _dataset_index_cache
+    count = len(_catalog_cache)
+    _catalog_cache.clear()
+    _catalog_cache_locks.clear()
+    _dataset_index_cache = None
+    with _enhanced_metadata_cache_lock:
+        _enhanced_metadata_cache.clear()
+    return {"success": True, "cleared": count}
+
 @router.get("/debug/catalog", summary="测试直接访问Catalog")
 async def test_catalog_access():
     """测试直接访问Catalog XML"""
     try:
         catalog_url = "http://localhost:8080/thredds/catalog/catalog.xml"
-        print(f"Testing catalog access: {catalog_url}")
+        logger.info(f"测试访问Catalog: {catalog_url}")
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(catalog_url, timeout=10.0)
+        response = await get_http_client().get(catalog_url, timeout=10.0)
             
         if response.status_code != 200:
             return {"error": f"Failed to access catalog: {response.status_code}"}
@@ -223,7 +438,7 @@ async def list_all_datasets(ext: str = "nc") -> List[str]:
     """
     try:
         # 获取Thredds数据集
-        datasets = await get_thredds_datasets()
+        datasets = await get_thredds_datasets(catalog_path="catalog.xml", recursive=True)
         
         # 根据扩展名过滤并返回文件路径
         if ext:
@@ -240,6 +455,99 @@ async def list_all_datasets(ext: str = "nc") -> List[str]:
         print(f"获取数据文件列表失败: {str(e)}")
         return []
 
+def _iter_files_with_ext(root: str, ext: str):
+    """
+    递归遍历目录，产出扩展名为 ext（不区分大小写）的文件 os.DirEntry
+    使用 os.scandir 单次遍历目录树，目录项类型来自 getdents，无需逐项 stat 判断
+    与 Path.glob('**/*') 一致，不进入指向目录的符号链接，避免符号链接环导致重复与无限递归；
+    与原先的 is_file() 过滤一致，跳过套接字、FIFO 与失效的符号链接
+    """
+    suffix = "." + ext.lower()
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(suffix) and entry.is_file():
+                        yield entry
+        except OSError as e:
+            logger.warning(f"无法读取目录: {e}")
+
+@functools.lru_cache(maxsize=4096)
+def _iso_timestamp(ts: float) -> str:
+    """时间戳转为本地时间ISO字符串；同一目录中的文件时间戳大量重复，缓存格式化结果"""
+    return datetime.fromtimestamp(ts).isoformat()
+
+
+def _scan_standard_dir(standard_dir: str, target_ext: str) -> List[Dict]:
+    """扫描standard目录，为扩展名为 target_ext 的每个文件构建数据集信息"""
+    # 递归查找符合条件的文件：单次遍历目录树，扩展名不区分大小写
+    datasets = []
+    prefix_len = len(standard_dir) + 1
+    file_format = target_ext.upper()
+    
+    for entry in _iter_files_with_ext(standard_dir, target_ext):
+        try:
+            # 获取文件信息
+            stat_info = entry.stat()
+            rel_path = entry.path[prefix_len:]
+            
+            # 构建数据集信息
+            file_name = entry.name
+            dataset_id = rel_path.replace(os.sep, '_').replace('.', '_')
+            
+            dataset_info = {
+                "id": dataset_id,
+                "datasetId": dataset_id,
+                "name": file_name,
+                "title": file_name.replace('.nc', '').replace('_', ' ').title(),
+                "description": f"CF-1.8规范转换后的数据文件: {file_name}",
+                "urlPath": f"oceanenv/standard/{rel_path}",
+                "opendapUrl": f"{THREDDS_SERVER_URL}{THREDDS_OPENDAP_PATH}/oceanenv/standard/{rel_path}",
+                "httpUrl": f"{THREDDS_SERVER_URL}{THREDDS_HTTP_PATH}/oceanenv/standard/{rel_path}",
+                "fileFormat": file_format,
+                "file_format": file_format,
+                "file_location": rel_path,
+                "filePath": rel_path,
+                "source_type": "CF_CONVERTED",
+                "data_type": "STANDARD",
+                "variables": [],
+                "created_at": _iso_timestamp(stat_info.st_ctime),
+                "updated_at": _iso_timestamp(stat_info.st_mtime),
+                "file_size": stat_info.st_size,
+                "threddsId": dataset_id
+            }
+            
+            # 根据文件路径推断数据类型
+            path_lower = rel_path.lower()
+            if "model" in path_lower:
+                dataset_info["source_type"] = "MODEL"
+                if "forecast" in path_lower:
+                    dataset_info["data_type"] = "FORECAST"
+                elif "reanalysis" in path_lower:
+                    dataset_info["data_type"] = "REANALYSIS"
+                else:
+                    dataset_info["data_type"] = "MODEL_OUTPUT"
+            elif "satellite" in path_lower:
+                dataset_info["source_type"] = "SATELLITE"
+                dataset_info["data_type"] = "SATELLITE_DATA"
+            elif "buoy" in path_lower:
+                dataset_info["source_type"] = "BUOY"
+                dataset_info["data_type"] = "OBSERVATIONS"
+            elif "survey" in path_lower or "ctd" in path_lower:
+                dataset_info["source_type"] = "SURVEY"
+                dataset_info["data_type"] = "OBSERVATIONS"
+            
+            datasets.append(dataset_info)
+            
+        except Exception as e:
+            logger.warning("处理文件时出错 %s: %s", entry.path, e)
+            continue
+    
+    return datasets
+
 @router.get("/list/standard", summary="获取standard目录中已转换的数据文件列表", response_model=List[Dict])
 async def list_standard_datasets(
     ext: Optional[str] = Query(None, description="文件扩展名过滤(不含点号，默认nc)")
@@ -257,90 +565,21 @@ async def list_standard_datasets(
         project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))))
         standard_dir = os.path.join(project_root, "backend", "docker", "thredds", "data", "oceanenv", "standard")
         
-        logger.info(f"正在查找standard目录: {standard_dir}")
-        logger.info(f"目录是否存在: {os.path.exists(standard_dir)}")
-        
         if not os.path.exists(standard_dir):
-            logger.warning(f"Standard目录不存在: {standard_dir}")
+            logger.warning("Standard目录不存在: %s", standard_dir)
             return []
         
         # 设置文件扩展名过滤
         target_ext = ext if ext else "nc"
-        logger.info(f"查找文件扩展名: {target_ext}")
         
-        # 递归查找符合条件的文件
-        datasets = []
-        standard_path = PathlibPath(standard_dir)
-        
-        # 查找所有NetCDF文件
-        for pattern in [f"**/*.{target_ext}", f"**/*.{target_ext.upper()}"]:
-            logger.info(f"使用模式查找文件: {pattern}")
-            files_found = list(standard_path.glob(pattern))
-            logger.info(f"模式 {pattern} 找到 {len(files_found)} 个文件")
-            
-            for file_path in files_found:
-                logger.info(f"处理文件: {file_path}")
-                try:
-                    # 获取文件信息
-                    stat_info = file_path.stat()
-                    rel_path = file_path.relative_to(standard_path)
-                    
-                    # 构建数据集信息
-                    file_name = file_path.name
-                    dataset_id = str(rel_path).replace(os.sep, '_').replace('.', '_')
-                    
-                    dataset_info = {
-                        "id": dataset_id,
-                        "datasetId": dataset_id,
-                        "name": file_name,
-                        "title": file_name.replace('.nc', '').replace('_', ' ').title(),
-                        "description": f"CF-1.8规范转换后的数据文件: {file_name}",
-                        "urlPath": f"oceanenv/standard/{rel_path}",
-                        "opendapUrl": f"{THREDDS_SERVER_URL}{THREDDS_OPENDAP_PATH}/oceanenv/standard/{rel_path}",
-                        "httpUrl": f"{THREDDS_SERVER_URL}{THREDDS_HTTP_PATH}/oceanenv/standard/{rel_path}",
-                        "fileFormat": target_ext.upper(),
-                        "file_format": target_ext.upper(),
-                        "file_location": str(rel_path),
-                        "filePath": str(rel_path),
-                        "source_type": "CF_CONVERTED",
-                        "data_type": "STANDARD",
-                        "variables": [],
-                        "created_at": datetime.fromtimestamp(stat_info.st_ctime).isoformat(),
-                        "updated_at": datetime.fromtimestamp(stat_info.st_mtime).isoformat(),
-                        "file_size": stat_info.st_size,
-                        "threddsId": dataset_id
-                    }
-                    
-                    # 根据文件路径推断数据类型
-                    path_lower = str(rel_path).lower()
-                    if "model" in path_lower:
-                        dataset_info["source_type"] = "MODEL"
-                        if "forecast" in path_lower:
-                            dataset_info["data_type"] = "FORECAST"
-                        elif "reanalysis" in path_lower:
-                            dataset_info["data_type"] = "REANALYSIS"
-                        else:
-                            dataset_info["data_type"] = "MODEL_OUTPUT"
-                    elif "satellite" in path_lower:
-                        dataset_info["source_type"] = "SATELLITE"
-                        dataset_info["data_type"] = "SATELLITE_DATA"
-                    elif "buoy" in path_lower:
-                        dataset_info["source_type"] = "BUOY"
-                        dataset_info["data_type"] = "OBSERVATIONS"
-                    elif "survey" in path_lower or "ctd" in path_lower:
-                        dataset_info["source_type"] = "SURVEY"
-                        dataset_info["data_type"] = "OBSERVATIONS"
-                    
-                    datasets.append(dataset_info)
-                    
-                except Exception as e:
-                    logger.warning(f"处理文件时出错 {file_path}: {e}")
-                    continue
+        # 目录遍历与文件stat为阻塞IO，在线程中执行，避免阻塞事件循环
+        datasets = await asyncio.to_thread(_scan_standard_dir, standard_dir, target_ext)
         
         # 按修改时间排序（最新的在前面）
         datasets.sort(key=lambda x: x.get("updated_at", ""), reverse=True)
         
-        logger.info(f"在standard目录中找到 {len(datasets)} 个已转换的数据文件")
+        # 扫描结束后只输出一条汇总日志，不逐个文件记录
+        logger.info("在standard目录 %s 中找到 %d 个已转换的数据文件(*.%s)", standard_dir, len(datasets), target_ext)
         return datasets
         
     except Exception as e:
@@ -364,6 +603,14 @@ def list_datasets(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@functools.lru_cache(maxsize=512)
+def _read_metadata(file_path: str, st_dev: int, st_ino: int, mtime_ns: int, size: int) -> bytes:
+    """
+    读取文件元数据并序列化为JSON
+    设备号、inode、修改时间与大小仅作为缓存键：文件被替换或修改后键随之改变，旧条目自然失效
+    """
+    return dumps_numpy(DataService.get_file_metadata(file_path))
+
 @router.get("/metadata/{location}", summary="获取指定数据文件的元数据")
 def get_metadata(
     location: DataLocation,
@@ -376,20 +623,18 @@ def get_metadata(
     - **relpath**: 数据文件相对路径 
     """
     try:
-        if location == DataLocation.PROCESSED:
-            file_path = os.path.join(PROCESSED_DATA_PATH, relpath)
-        elif location == DataLocation.THREDDS:
-            file_path = os.path.join(THREDDS_DATA_PATH, relpath)
-        else:
-            raise HTTPException(status_code=400, detail=f"不支持的数据位置: {location}")
+        file_path = _resolve_data_path(location, relpath)
             
-        if not os.path.exists(file_path):
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail=f"文件不存在: {relpath}")
             
-        # 获取元数据并确保所有NumPy类型都被正确处理
-        metadata = DataService.get_file_metadata(file_path)
-        serialized_metadata = custom_jsonable_encoder(metadata)
-        return serialized_metadata
+        # 元数据直接由 orjson 序列化（NumPy 类型在C层处理）；文件未变化时直接返回缓存的JSON
+        return Response(
+            content=_read_metadata(file_path, st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size),
+            media_type="application/json"
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -407,10 +652,9 @@ def get_thredds_metadata(
     返回数据集的详细元数据，包括变量、维度、坐标系和属性等信息。
     """
     try:
-        # 获取元数据并确保使用自定义编码器转换NumPy类型
+        # 获取元数据，直接由 orjson 序列化NumPy类型，不再逐层预先转换
         metadata = DataService.get_thredds_metadata(url)
-        serialized_metadata = custom_jsonable_encoder(metadata)
-        return serialized_metadata
+        return NumpyORJSONResponse(metadata)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取Thredds元数据失败: {str(e)}")
 
@@ -426,11 +670,8 @@ async def get_thredds_metadata_by_id(
     返回数据集的详细元数据，包括变量、维度、坐标系和属性等信息。
     """
     try:
-        # 获取所有数据集列表
-        datasets = await get_thredds_datasets()
-        
-        # 查找匹配的数据集
-        dataset = next((d for d in datasets if d["id"] == dataset_id), None)
+        # 按ID索引查找匹配的数据集
+        dataset = (await _get_thredds_dataset_index()).get(dataset_id)
         
         if not dataset:
             raise HTTPException(status_code=404, detail=f"未找到ID为{dataset_id}的数据集")
@@ -460,9 +701,8 @@ async def get_thredds_metadata_by_id(
                 "dataset": dataset
             }
             
-        # 使用我们的自定义JSON编码器处理NumPy类型
-        serialized_result = custom_jsonable_encoder(result)
-        return serialized_result
+        # 直接由 orjson 序列化NumPy类型
+        return NumpyORJSONResponse(result)
     except HTTPException:
         raise
     except Exception as e:
@@ -480,38 +720,51 @@ def download_dataset(
     - **relpath**: 数据文件相对路径
     """
     try:
-        if location == DataLocation.PROCESSED:
-            file_path = os.path.join(PROCESSED_DATA_PATH, relpath)
-        elif location == DataLocation.THREDDS:
-            file_path = os.path.join(THREDDS_DATA_PATH, relpath)
-        else:
-            raise HTTPException(status_code=400, detail=f"不支持的数据位置: {location}")
+        file_path = _resolve_data_path(location, relpath)
             
-        if not os.path.exists(file_path):
+        # 一次 stat 同时完成存在性检查并提供给响应，FileResponse 不再重复 stat
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"文件不存在: {relpath}")
+        if not stat.S_ISREG(st.st_mode):
             raise HTTPException(status_code=404, detail=f"文件不存在: {relpath}")
             
         filename = os.path.basename(file_path)
-        media_type = "application/octet-stream"
         
         # 根据文件扩展名设置适当的媒体类型
-        ext = os.path.splitext(filename)[1].lower()
-        if ext == ".nc":  
-            media_type = "application/x-netcdf"
-        elif ext == ".csv":
-            media_type = "text/csv"
-        elif ext == ".json":
-            media_type = "application/json"
+        media_type = _DOWNLOAD_MEDIA_TYPES.get(os.path.splitext(filename)[1].lower(), "application/octet-stream")
             
-        return FileResponse(
+        return LargeFileResponse(
             file_path, 
             filename=filename, 
-            media_type=media_type
+            media_type=media_type,
+            stat_result=st
         )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"下载文件失败: {str(e)}")
 
+def _build_catalog_url(catalog_path: str) -> str:
+    """
+    将相对于THREDDS服务器根目录的Catalog路径转换为Catalog XML的完整URL
+    路径统一补全为 thredds/catalog/<路径>，指向目录时补上 catalog.xml
+    """
+    path = catalog_path.strip()
+    if path.startswith('/'):
+        path = path[1:]
+    if not path.startswith('thredds/'):
+        path = 'thredds/catalog/' + path
+    elif 'thredds/catalog/' not in path and path != 'thredds/catalog':
+        # thredds/<路径> 省略了catalog段
+        path = 'thredds/catalog/' + path[len('thredds/'):]
+    if not path.endswith('.xml'):
+        path += 'catalog.xml' if path.endswith('/') else '/catalog.xml'
+    base_url = _collapse_dup_thredds_catalog(f"{THREDDS_SERVER_URL}/{path}")
+    return _DOUBLE_SLASH.sub('/', base_url)
+
+
 @router.get("/thredds/datasets", summary="获取Thredds服务器上的所有数据集")
 async def get_thredds_datasets(
     catalog_path: str = Query("catalog.xml", description="Catalog路径，相对于Thredds服务器根目录"),
@@ -522,43 +775,7 @@ async def get_thredds_datasets(
     try:
         logger.info(f"[get_thredds_datasets] Processing catalog_path: {catalog_path}")
         
-        clean_path = catalog_path.strip()
-        if clean_path.startswith('/'):
-            clean_path = clean_path[1:]
-            
-        has_thredds_prefix = clean_path.startswith('thredds/')
-        has_catalog_prefix = has_thredds_prefix and ('thredds/catalog/' in clean_path or clean_path == 'thredds/catalog')
-        
-        if clean_path == "catalog.xml":
-            base_url = f"{THREDDS_SERVER_URL}/thredds/catalog/catalog.xml"
-        elif has_catalog_prefix:
-            base_url = f"{THREDDS_SERVER_URL}/{clean_path}"
-            if not base_url.endswith(".xml"):
-                if not base_url.endswith("/"): base_url += "/"
-                base_url += "catalog.xml"
-        elif has_thredds_prefix:
-            parts = clean_path.split('/', 1)
-            if len(parts) > 1:
-                base_url = f"{THREDDS_SERVER_URL}/{parts[0]}/catalog/{parts[1]}"
-                if not base_url.endswith(".xml"):
-                    if not base_url.endswith("/"): base_url += "/"
-                    base_url += "catalog.xml"
-            else:
-                base_url = f"{THREDDS_SERVER_URL}/thredds/catalog/catalog.xml"
-        else:
-            base_url = f"{THREDDS_SERVER_URL}/thredds/catalog/{clean_path}"
-            if not base_url.endswith(".xml"):
-                if not base_url.endswith("/"): base_url += "/"
-                base_url += "catalog.xml"
-        
-        if base_url.count('thredds/catalog') > 1:
-            parts = base_url.split('thredds/catalog')
-            base_url = f"{THREDDS_SERVER_URL}/thredds/catalog{parts[-1]}"
-            
-        normalized_url = base_url.replace('://', '$$PROTO$$')
-        while '//' in normalized_url:
-            normalized_url = normalized_url.replace('//', '/')
-        normalized_url = normalized_url.replace('$$PROTO$$', '://')
+        normalized_url = _build_catalog_url(catalog_path)
         
         url_options = [normalized_url] 
         logger.info(f"[get_thredds_datasets] Constructed Catalog URL to parse: {url_options[0]}")
@@ -589,37 +806,32 @@ async def get_thredds_datasets(
         
         formatting_start_time = time.perf_counter()
         formatted_datasets = []
+        generate_dataset_id = DataService.generate_dataset_id
         for ds_raw in datasets_from_parse:
+            has_url_path = "urlPath" in ds_raw
+            url_path = ds_raw.get("urlPath", "")
+            name = ds_raw.get("name", "Unknown Dataset")
+            description = ds_raw.get("description")
+            if description is None:
+                description = f"Thredds数据集: {ds_raw.get('name', 'Unknown')}"
             file_name = os.path.basename(ds_raw.get("urlPath", "unknown"))
             file_ext = os.path.splitext(file_name)[1].upper().lstrip('.') or "NC"
-            # Ensure DataService is available or mock this part if DataService is complex to set up for this test
-            dataset_id = ds_raw.get("urlPath", ds_raw.get("name", "")) # Simplified ID for now
-            if 'DataService' in globals() and hasattr(DataService, 'generate_dataset_id'):
-                dataset_id = DataService.generate_dataset_id(ds_raw.get("urlPath", ds_raw.get("name", "")))
-
+            dataset_id = generate_dataset_id(ds_raw["urlPath"] if has_url_path else ds_raw.get("name", ""))
+            source_type, data_type = _classify_thredds_path(url_path.lower())
             
-            formatted_ds = {
+            formatted_datasets.append({
                 "id": dataset_id, "datasetId": dataset_id,
-                "name": ds_raw.get("name", "Unknown Dataset"), "title": ds_raw.get("name", "Unknown Dataset"),
-                "description": ds_raw.get("description", f"Thredds数据集: {ds_raw.get('name', 'Unknown')}"),
-                "urlPath": ds_raw.get("urlPath", ""),
-                "opendapUrl": f"{THREDDS_SERVER_URL}{THREDDS_OPENDAP_PATH}/{ds_raw.get('urlPath', '')}" if "urlPath" in ds_raw else None,
-                "httpUrl": f"{THREDDS_SERVER_URL}{THREDDS_HTTP_PATH}/{ds_raw.get('urlPath', '')}" if "urlPath" in ds_raw else None,
+                "name": name, "title": name,
+                "description": description,
+                "urlPath": url_path,
+                "opendapUrl": THREDDS_OPENDAP_PREFIX + url_path if has_url_path else None,
+                "httpUrl": THREDDS_HTTP_PREFIX + url_path if has_url_path else None,
                 "fileFormat": file_ext, "file_format": file_ext,
-                "file_location": ds_raw.get("urlPath", ""), "filePath": ds_raw.get("urlPath", ""),
-                "source_type": "MODEL", "data_type": "OBSERVATIONS", 
+                "file_location": url_path, "filePath": url_path,
+                "source_type": source_type, "data_type": data_type,
                 "variables": [], "created_at": "", "updated_at": "",
                 "threddsId": ds_raw.get("id", "")
-            }
-            url_path_lower = ds_raw.get("urlPath", "").lower()
-            if "model" in url_path_lower:
-                formatted_ds["source_type"] = "MODEL"
-                if "forecast" in url_path_lower: formatted_ds["data_type"] = "FORECAST"
-                elif "reanalysis" in url_path_lower: formatted_ds["data_type"] = "REANALYSIS"
-            elif "satellite" in url_path_lower: formatted_ds["source_type"] = "SATELLITE"
-            elif "buoy" in url_path_lower: formatted_ds["source_type"] = "BUOY"
-            elif "survey" in url_path_lower or "ctd" in url_path_lower: formatted_ds["source_type"] = "SURVEY"
-            formatted_datasets.append(formatted_ds)
+            })
         
         formatting_duration = time.perf_counter() - formatting_start_time
         logger.info(f"[get_thredds_datasets] Dataset formatting took {formatting_duration:.4f}s. Number of formatted datasets: {len(formatted_datasets)}")
@@ -636,8 +848,122 @@ async def get_thredds_datasets(
 async def parse_thredds_catalog(
     catalog_url: str, 
     recursive: bool = True, 
-    depth: int = 3 
+    depth: int = 3,
+    client: Optional[httpx.AsyncClient] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    memo: Optional[Dict[tuple, asyncio.Task]] = None
 ) -> List[Dict]:
+    """
+    解析THREDDS Catalog，返回带urlPath的数据集列表；recursive为True时并发解析子Catalog
+    semaphore 在整个递归中共享，限制同时向THREDDS发出的请求数（默认 THREDDS_CATALOG_CONCURRENCY）
+    memo 在整个递归中共享，多个Catalog引用同一子Catalog时只获取、解析一次（包括失败或为空的子Catalog）
+    结果（含各级子Catalog）缓存 THREDDS_CATALOG_CACHE_TTL 秒；同一Catalog并发未命中时只请求一次
+    """
+    key = (catalog_url, recursive, depth)
+    hit = _catalog_cache.get(key)
+    if hit is not None and time.monotonic() < hit[0]:
+        return hit[1]
+    async with _catalog_cache_locks[key]:
+        # 等待锁期间可能已由其他请求填充
+        hit = _catalog_cache.get(key)
+        if hit is not None and time.monotonic() < hit[0]:
+            return hit[1]
+        results = await _fetch_thredds_catalog(catalog_url, recursive, depth, client, semaphore, memo)
+        # 请求或解析失败时返回空列表，不缓存，下次请求重试
+        if results:
+            _store_catalog_cache(key, results)
+        return results
+
+
+def _store_catalog_cache(key: tuple, results: List[Dict]) -> None:
+    """写入Catalog缓存，条目数达到 THREDDS_CATALOG_CACHE_MAXSIZE 时清理过期与最早的条目"""
+    now = time.monotonic()
+    _catalog_cache.pop(key, None)
+    if len(_catalog_cache) >= THREDDS_CATALOG_CACHE_MAXSIZE:
+        for expired_key in [k for k, (expires, _) in _catalog_cache.items() if expires <= now]:
+            del _catalog_cache[expired_key]
+        while len(_catalog_cache) >= THREDDS_CATALOG_CACHE_MAXSIZE:
+            del _catalog_cache[next(iter(_catalog_cache))]
+        # 同时丢弃已无缓存条目且未被占用的锁
+        for lock_key in [k for k, lock in _catalog_cache_locks.items() if k not in _catalog_cache and not lock.locked()]:
+            del _catalog_cache_locks[lock_key]
+    _catalog_cache[key] = (now + THREDDS_CATALOG_CACHE_TTL, results)
+
+
+async def _get_thredds_dataset_index() -> Dict[str, Dict]:
+    """获取根Catalog全部数据集的ID索引，缓存 THREDDS_CATALOG_CACHE_TTL 秒"""
+    global _dataset_index_cache
+    hit = _dataset_index_cache
+    if hit is not None and time.monotonic() < hit[0]:
+        return hit[1]
+    datasets = await get_thredds_datasets(catalog_path="catalog.xml", recursive=True)
+    # ID重复时保留第一个，与逐个查找的结果一致
+    index = {d["id"]: d for d in reversed(datasets)}
+    # 与Catalog缓存一致，空结果不缓存
+    if index:
+        _dataset_index_cache = (time.monotonic() + THREDDS_CATALOG_CACHE_TTL, index)
+    return index
+
+
+# Catalog缓存预热：应用启动后在后台定期解析根Catalog，首个用户请求即可命中缓存
+_catalog_prefetch_task: Optional[asyncio.Task] = None
+
+
+async def _warm_catalog_cache():
+    """后台预热任务：递归解析根Catalog填充缓存，每次缓存过期后立即重新解析"""
+    while True:
+        start_time = time.perf_counter()
+        try:
+            datasets = await get_thredds_datasets(catalog_path="catalog.xml", recursive=True)
+            logger.info(f"[prefetch] Catalog cache warmed in {time.perf_counter() - start_time:.4f}s, {len(datasets)} datasets")
+        except Exception as e:
+            logger.warning(f"[prefetch] Failed to warm catalog cache: {e}")
+        # 本轮写入的缓存项均在 TTL 后过期，届时重新解析；期间到达的请求由缓存锁与预热共享同一次请求
+        await asyncio.sleep(THREDDS_CATALOG_CACHE_TTL)
+
+
+def start_catalog_prefetch():
+    """启动Catalog缓存预热任务，在应用启动时调用"""
+    global _catalog_prefetch_task
+    if _catalog_prefetch_task is None or _catalog_prefetch_task.done():
+        _catalog_prefetch_task = asyncio.create_task(_warm_catalog_cache())
+
+
+async def stop_catalog_prefetch():
+    """停止Catalog缓存预热任务，在应用关闭时调用"""
+    global _catalog_prefetch_task
+    if _catalog_prefetch_task is None:
+        return
+    _catalog_prefetch_task.cancel()
+    try:
+        await _catalog_prefetch_task
+    except asyncio.CancelledError:
+        pass
+    _catalog_prefetch_task = None
+
+
+@functools.lru_cache(maxsize=4096)
+def _resolve_sub_catalog_url(catalog_url: str, href: str) -> str:
+    """
+    根据catalogRef的href构建子Catalog的完整URL：绝对地址直接使用，相对地址相对当前Catalog解析
+    Catalog结构在多次刷新之间基本不变，缓存解析结果，避免对每个catalogRef重复执行 urljoin
+    """
+    # urljoin 按 RFC 3986 解析：绝对地址原样返回，相对地址（含 ../ 与 //host 形式）相对当前Catalog解析
+    return _DOUBLE_SLASH.sub('/', urllib.parse.urljoin(catalog_url, href))
+
+
+async def _fetch_thredds_catalog(
+    catalog_url: str,
+    recursive: bool,
+    depth: int,
+    client: Optional[httpx.AsyncClient],
+    semaphore: Optional[asyncio.Semaphore],
+    memo: Optional[Dict[tuple, asyncio.Task]]
+) -> List[Dict]:
+    """
+    请求并解析THREDDS Catalog（不经过缓存），子Catalog通过 parse_thredds_catalog 递归解析
+    解析过程中每发现一个catalogRef即启动对应子Catalog的获取任务，子Catalog的网络请求与当前Catalog剩余部分的下载、解析重叠
+    """
     func_start_time = time.perf_counter()
     logger.info(f"[parse_thredds_catalog depth={depth}] Parsing catalog: {catalog_url}")
 
@@ -645,150 +971,82 @@ async def parse_thredds_catalog(
         logger.warning(f"[parse_thredds_catalog depth={depth}] Max recursion depth reached for {catalog_url}. Returning empty list.")
         return []
         
+    # 已启动的子Catalog任务，按catalogRef在文档中的顺序排列：(子Catalog URL, 任务)
+    child_tasks: List[tuple] = []
+    # 由当前Catalog创建的任务；其他Catalog引用的同一子Catalog复用memo中已有的任务
+    owned_tasks: List[tuple] = []
+    if memo is None:
+        memo = {}
+
+    def start_child_tasks(hrefs: List[Optional[str]]) -> None:
+        for href in hrefs:
+            if href:
+                sub_catalog_url = _resolve_sub_catalog_url(catalog_url, href)
+                # 以规范化后的完整URL为键，同一子Catalog在同一深度只请求一次
+                key = (sub_catalog_url, depth - 1)
+                task = memo.get(key)
+                if task is None:
+                    logger.info(f"[parse_thredds_catalog depth={depth}] Recursing into (href='{href}', final='{sub_catalog_url}')")
+                    task = asyncio.create_task(
+                        parse_thredds_catalog(sub_catalog_url, recursive, depth - 1, client, semaphore, memo)
+                    )
+                    memo[key] = task
+                    owned_tasks.append((key, task))
+                child_tasks.append((sub_catalog_url, task))
+
     try:
         http_request_start_time = time.perf_counter()
-        async with httpx.AsyncClient() as client:
-            response = await client.get(catalog_url, timeout=20.0) # Increased timeout
+        catalog_parser = _ThreddsCatalogParser()
+        if client is None:
+            client = get_http_client()
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(THREDDS_CATALOG_CONCURRENCY)
+        # 只在请求与解析期间占用并发名额，等待子Catalog时不占用，避免递归层级间相互等待
+        async with semaphore, client.stream("GET", catalog_url) as response: # 使用共享客户端的默认超时
+            if response.status_code != 200:
+                http_request_duration = time.perf_counter() - http_request_start_time
+                logger.error(f"[parse_thredds_catalog depth={depth}] Failed to fetch catalog: {catalog_url}, status: {response.status_code}, took: {http_request_duration:.4f}s")
+                return []
+
+            # 边接收边解析，XML 解析与网络传输重叠
+            content_preview = b""
+            try:
+                async for chunk in response.aiter_bytes():
+                    if not content_preview:
+                        content_preview = chunk[:200]
+                    if len(chunk) >= THREDDS_CATALOG_THREAD_PARSE_MIN:
+                        await asyncio.to_thread(catalog_parser.feed, chunk)
+                    else:
+                        catalog_parser.feed(chunk)
+                    if recursive:
+                        start_child_tasks(catalog_parser.take_new_catalog_refs())
+                catalog_parser.close()
+                if recursive:
+                    start_child_tasks(catalog_parser.take_new_catalog_refs())
+            except XML_PARSE_ERRORS as xml_error:
+                http_request_duration = time.perf_counter() - http_request_start_time
+                logger.error(f"[parse_thredds_catalog depth={depth}] XML parsing error for {catalog_url} after {http_request_duration:.4f}s: {xml_error}. Content preview: {content_preview!r}", exc_info=True)
+                return []
         http_request_duration = time.perf_counter() - http_request_start_time
-        
-        if response.status_code != 200:
-            logger.error(f"[parse_thredds_catalog depth={depth}] Failed to fetch catalog: {catalog_url}, status: {response.status_code}, took: {http_request_duration:.4f}s")
-            return []
-        
-        logger.info(f"[parse_thredds_catalog depth={depth}] Successfully fetched {catalog_url}, status: {response.status_code}, took: {http_request_duration:.4f}s")
-        xml_content = response.text
-        
-        xml_parse_start_time = time.perf_counter()
-        try:
-            root = ET.fromstring(xml_content)
-            xml_parse_duration = time.perf_counter() - xml_parse_start_time
-            logger.info(f"[parse_thredds_catalog depth={depth}] XML parsed for {catalog_url} in {xml_parse_duration:.4f}s. Root tag: {root.tag}")
-        except Exception as xml_error:
-            xml_parse_duration = time.perf_counter() - xml_parse_start_time
-            logger.error(f"[parse_thredds_catalog depth={depth}] XML parsing error for {catalog_url} in {xml_parse_duration:.4f}s: {xml_error}. Content preview: {xml_content[:200]}", exc_info=True)
-            return []
-            
-        results: List[Dict] = []
-        
-        datasets_found_xml = root.findall('.//thredds:dataset', XML_NAMESPACES)
-        if not datasets_found_xml:
-            datasets_found_xml = root.findall('.//dataset')
-        
-        logger.info(f"[parse_thredds_catalog depth={depth}] Found {len(datasets_found_xml)} <dataset> elements in {catalog_url}")
-        
-        for dataset_element in datasets_found_xml:
-            url_path = dataset_element.get('urlPath')
-            if url_path: 
-                dataset_info = {
-                    "id": dataset_element.get('ID'), "name": dataset_element.get('name'), "urlPath": url_path
-                }
-                documentation_elements = dataset_element.findall('.//thredds:documentation', XML_NAMESPACES)
-                if not documentation_elements:
-                    documentation_elements = dataset_element.findall('.//documentation')
-                if documentation_elements:
-                    dataset_info["description"] = ' '.join(doc.text or '' for doc in documentation_elements)
-                results.append(dataset_info)
+        logger.info(f"[parse_thredds_catalog depth={depth}] Successfully fetched and parsed {catalog_url}, status: {response.status_code}, took: {http_request_duration:.4f}s")
+
+        results: List[Dict] = catalog_parser.datasets
         
         logger.info(f"[parse_thredds_catalog depth={depth}] Found {len(results)} direct datasets in {catalog_url}")
         
         if recursive:
-            logger.info(f"[parse_thredds_catalog depth={depth}] Processing catalogRefs for {catalog_url}...")
-            catalog_ref_elements = root.findall('.//thredds:catalogRef', XML_NAMESPACES)
-            if not catalog_ref_elements:
-                catalog_ref_elements = root.findall('.//catalogRef')
-            
-            logger.info(f"[parse_thredds_catalog depth={depth}] Found {len(catalog_ref_elements)} <catalogRef> elements in {catalog_url}")
+            logger.info(f"[parse_thredds_catalog depth={depth}] Found {len(catalog_parser.catalog_refs)} <catalogRef> elements in {catalog_url}")
 
-            for catalog_ref_element in catalog_ref_elements:
-                href = catalog_ref_element.get('{http://www.w3.org/1999/xlink}href')
-                if not href: href = catalog_ref_element.get('href')
-                
-                if href:
-                    from urllib.parse import urljoin, urlparse, urlunparse # Local import for safety
-                    
-                    sub_catalog_url_raw = urljoin(catalog_url, href)
-                    parsed_main_server = urlparse(THREDDS_SERVER_URL)
-                    final_sub_path = sub_catalog_url_raw # Default to joined, then try to refine
-                    
-                    # Refined logic to handle various href and catalog_url structures more robustly
-                    # Goal: Construct a URL that is absolute, starting with THREDDS_SERVER_URL,
-                    # and correctly points to the sub-catalog.
-                    
-                    current_catalog_parsed = urlparse(catalog_url)
-                    href_parsed = urlparse(href)
-
-                    if href_parsed.scheme and href_parsed.netloc: # href is already an absolute URL
-                        sub_catalog_url = href
-                    else: # href is relative
-                        sub_catalog_url = urljoin(f"{current_catalog_parsed.scheme}://{current_catalog_parsed.netloc}{current_catalog_parsed.path}", href)
-
-                    # Ensure the path الجزء is correct relative to THREDDS_SERVER_URL's structure
-                    # This part is tricky because 'thredds/catalog' might be part of THREDDS_SERVER_URL or part of the path
-                    
-                    # Attempt to normalize: Ensure it starts with THREDDS_SERVER_URL and contains /thredds/catalog/ once correctly.
-                    # This is a simplified normalization. A more robust one would analyze THREDDS_SERVER_URL structure.
-                    if THREDDS_SERVER_URL.endswith('/thredds/catalog') or THREDDS_SERVER_URL.endswith('/thredds/catalog/'):
-                        server_base_for_join = THREDDS_SERVER_URL
-                    elif THREDDS_SERVER_URL.endswith('/thredds') or THREDDS_SERVER_URL.endswith('/thredds/'):
-                        server_base_for_join = f"{THREDDS_SERVER_URL.rstrip('/')}/catalog/"
-                    else: # Assuming THREDDS_SERVER_URL is just scheme+host
-                        server_base_for_join = f"{THREDDS_SERVER_URL.rstrip('/')}/thredds/catalog/"
-
-                    path_part_of_sub = urlparse(sub_catalog_url).path
-                    
-                    # Remove server_base_for_join prefix if it's accidentally duplicated by urljoin
-                    # This logic needs to be very careful not to break valid paths.
-                    # For now, we'll rely on urljoin and a simple path cleanup.
-
-                    temp_url = urlparse(sub_catalog_url)
-                    clean_path = os.path.normpath(temp_url.path).replace("\\\\", "/") # Normalize .. and . and slashes
-                    if clean_path.startswith('/') and len(clean_path) > 1: # Avoid making it "//"
-                        clean_path = clean_path[1:]
-                    
-                    # Reconstruct with the main server and cleaned path.
-                    # This assumes sub-catalog is always under the same THREDDS_SERVER_URL domain.
-                    # And tries to ensure the /thredds/catalog/ part is correctly formed.
-                    
-                    # If href was absolute (e.g. "thredds/catalog/foo/catalog.xml") it might already be fine.
-                    # If href was relative (e.g. "foo/catalog.xml"), urljoin handles it.
-                    # The main challenge is ensuring no duplicate /thredds/catalog/ or missing it.
-
-                    # Let's try to ensure the path starts with a single "thredds/catalog/" after the server base.
-                    path_segments = clean_path.split('/')
-                    if "thredds" in path_segments and "catalog" in path_segments:
-                        try:
-                            thredds_idx = path_segments.index("thredds")
-                            catalog_idx = path_segments.index("catalog", thredds_idx)
-                            if catalog_idx == thredds_idx + 1:
-                                clean_path = "/".join(path_segments[thredds_idx:])
-                            else: # thredds and catalog are separated, unusual
-                               pass # Keep clean_path as is, might be an issue
-                        except ValueError: # one of them not found after split, though 'in' check passed
-                            pass
-                    else: # if "thredds/catalog" is not in the path, prepend it (assuming it's missing)
-                        # This might be too aggressive if THREDDS_SERVER_URL already has it.
-                        # A better way is to rely on urljoin and then ensure the full URL is what we expect.
-                        # For now, stick to the simpler urljoin result for sub_catalog_url
-                        pass
-
-
-                    # Final URL reconstruction with urljoin's result, then normalize slashes
-                    final_sub_catalog_url = sub_catalog_url # Use urljoin's direct result mostly
-                    
-                    # Normalize slashes after protocol
-                    proto_marker = "$$PROTO$$"
-                    final_sub_catalog_url = final_sub_catalog_url.replace("://", proto_marker)
-                    while '//' in final_sub_catalog_url:
-                        final_sub_catalog_url = final_sub_catalog_url.replace('//', '/')
-                    final_sub_catalog_url = final_sub_catalog_url.replace(proto_marker, '://')
-
-                    logger.info(f"[parse_thredds_catalog depth={depth}] Recursing into (href='{href}', joined='{sub_catalog_url_raw}', final='{final_sub_catalog_url}')")
-                    
-                    recursion_call_start_time = time.perf_counter()
-                    sub_results = await parse_thredds_catalog(final_sub_catalog_url, recursive, depth - 1)
-                    recursion_call_duration = time.perf_counter() - recursion_call_start_time
-                    logger.info(f"[parse_thredds_catalog depth={depth}] Recursive call to {final_sub_catalog_url} (depth {depth-1}) took {recursion_call_duration:.4f}s, found {len(sub_results)} items.")
-                    results.extend(sub_results)
+            # 等待各子Catalog（已在解析过程中并发启动）；结果按catalogRef顺序合并
+            recursion_call_start_time = time.perf_counter()
+            child_results = await asyncio.gather(*[task for _, task in child_tasks], return_exceptions=True)
+            recursion_call_duration = time.perf_counter() - recursion_call_start_time
+            for (child_url, _), sub_results in zip(child_tasks, child_results):
+                if isinstance(sub_results, BaseException):
+                    logger.error(f"[parse_thredds_catalog depth={depth}] Recursive call to {child_url} failed: {sub_results}")
+                    continue
+                results.extend(sub_results)
+            logger.info(f"[parse_thredds_catalog depth={depth}] {len(child_tasks)} recursive calls (depth {depth-1}) waited {recursion_call_duration:.4f}s after parsing, total datasets: {len(results)}.")
         
         func_duration = time.perf_counter() - func_start_time
         logger.info(f"[parse_thredds_catalog depth={depth}] Finished parsing {catalog_url} in {func_duration:.4f}s. Total direct+recursive datasets: {len(results)}")
@@ -802,6 +1060,13 @@ async def parse_thredds_catalog(
         func_duration = time.perf_counter() - func_start_time
         logger.error(f"[parse_thredds_catalog depth={depth}] Failed parsing {catalog_url} in {func_duration:.4f}s: {e_generic}", exc_info=True)
         return []
+    finally:
+        # 当前Catalog获取或解析失败时，取消已启动但不再需要的子Catalog任务；
+        # 从memo中移除未完成的任务，之后引用同一子Catalog的Catalog重新请求
+        for key, task in owned_tasks:
+            if not task.done():
+                task.cancel()
+                memo.pop(key, None)
 
 @router.get("/list/thredds/formatted", summary="获取Thredds数据集格式化列表", response_model=List[Dict])
 async def list_thredds_formatted_datasets(
@@ -823,7 +1088,9 @@ async def list_thredds_formatted_datasets(
         
         if ext:
             filter_start_time = time.perf_counter()
-            final_datasets = [ds for ds in all_datasets_raw if ds.get("fileFormat", "").lower() == ext.lower()]
+            # 格式化时 fileFormat 已统一为大写，直接与大写的扩展名比较，无需逐个转换大小写
+            ext_upper = ext.upper()
+            final_datasets = [ds for ds in all_datasets_raw if ds.get("fileFormat") == ext_upper]
             filter_duration = time.perf_counter() - filter_start_time
             logger.info(f"[list_thredds_formatted_datasets] Filtering by ext '{ext}' took {filter_duration:.4f}s. Filtered down to {len(final_datasets)} datasets.")
         else:
@@ -856,31 +1123,8 @@ async def test_model_url():
     # 1. 使用旧逻辑构建URL（模拟问题）
     old_url = f"{THREDDS_SERVER_URL}/thredds/catalog/thredds/catalog/{problematic_path}"
     
-    # 2. 使用新逻辑构建URL
-    # 清理路径
-    clean_path = problematic_path.strip()
-    if clean_path.startswith('/'):
-        clean_path = clean_path[1:]
-        
-    # 构建基本URL
-    base_url = f"{THREDDS_SERVER_URL}/thredds/catalog/{clean_path}"
-    if not base_url.endswith(".xml"):
-        if not base_url.endswith("/"):
-            base_url += "/"
-        base_url += "catalog.xml"
-    
-    # 修复重复的thredds/catalog
-    if base_url.count('thredds/catalog') > 1:
-        parts = base_url.split('thredds/catalog')
-        base_url = f"{THREDDS_SERVER_URL}/thredds/catalog{parts[-1]}"
-        
-    # 修复URL中的双斜杠
-    normalized_url = base_url.replace('://', '$$PROTO$$')
-    while '//' in normalized_url:
-        normalized_url = normalized_url.replace('//', '/')
-    normalized_url = normalized_url.replace('$$PROTO$$', '://')
-    
-    new_url = normalized_url
+    # 2. 使用新逻辑构建URL（与 get_thredds_datasets 相同的构建函数，一次正则替换完成规范化）
+    new_url = _build_catalog_url(problematic_path)
     
     # 3. 创建比较结果
     comparison = {
@@ -896,30 +1140,54 @@ async def test_model_url():
     error = None
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(new_url, timeout=5.0)
-            success = response.status_code == 200
-            if success:
-                comparison["test_result"] = "成功访问URL"
-            else:
-                comparison["test_result"] = f"访问失败: HTTP {response.status_code}"
+        response = await get_http_client().get(new_url, timeout=5.0)
+        success = response.status_code == 200
+        if success:
+            comparison["test_result"] = "成功访问URL"
+        else:
+            comparison["test_result"] = f"访问失败: HTTP {response.status_code}"
     except Exception as e:
         error = str(e)
         comparison["test_result"] = f"访问出错: {error}"
     
     return comparison
 
+# OPeNDAP增强元数据缓存：{url: (过期时间, 元数据)}；远程数据集可能更新，使用有效期而非永久缓存
+ENHANCED_METADATA_CACHE_TTL = 300.0
+ENHANCED_METADATA_CACHE_MAXSIZE = 512
+# 同步接口在多个线程池线程中并发执行，缓存读写需加锁
+_enhanced_metadata_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_enhanced_metadata_cache_lock = threading.Lock()
+
 @router.get("/thredds/enhanced_metadata", summary="通过OPeNDAP链接获取Thredds数据集丰富元数据（xarray）")
 def get_thredds_enhanced_metadata(
     url: str = Query(..., description="Thredds数据集OPeNDAP URL，如http://localhost:8080/thredds/dodsC/path/to/dataset.nc")
 ):
     """
     使用xarray通过OPeNDAP链接读取数据，返回丰富的元数据信息（标题、时间范围、空间范围、变量、生产者等）。
+    同步接口由FastAPI在线程池中执行，打开远程数据集不阻塞事件循环；
+    成功结果缓存 ENHANCED_METADATA_CACHE_TTL 秒，重复请求无需再次打开远程数据集
     """
     try:
+        now = time.monotonic()
+        with _enhanced_metadata_cache_lock:
+            hit = _enhanced_metadata_cache.get(url)
+        if hit is not None and now < hit[0]:
+            return hit[1]
+        
         # 提取元数据并确保NumPy数据类型转换
-        metadata = DataService.extract_enhanced_metadata(url)
-        return DataService._convert_numpy_types(metadata)
+        metadata = DataService._convert_numpy_types(DataService.extract_enhanced_metadata(url))
+        # 出错时返回的是错误信息（可能是暂时的网络问题），不缓存
+        if "error" not in metadata:
+            with _enhanced_metadata_cache_lock:
+                _enhanced_metadata_cache.pop(url, None)
+                if len(_enhanced_metadata_cache) >= ENHANCED_METADATA_CACHE_MAXSIZE:
+                    for expired_url in [k for k, (expires, _) in _enhanced_metadata_cache.items() if expires <= now]:
+                        del _enhanced_metadata_cache[expired_url]
+                    while len(_enhanced_metadata_cache) >= ENHANCED_METADATA_CACHE_MAXSIZE:
+                        _enhanced_metadata_cache.popitem(last=False)
+                _enhanced_metadata_cache[url] = (now + ENHANCED_METADATA_CACHE_TTL, metadata)
+        return metadata
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取Thredds增强元数据失败: {str(e)}")
 
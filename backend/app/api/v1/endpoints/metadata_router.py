@@ -13,6 +13,7 @@ import logging
 from app.db.session import get_db
 from app.db.models import NetCDFMetadata
 from app.services.metadata_extractor import extract_and_save_metadata
+from app.core.fileops import find_netcdf_files
 from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
@@ -414,9 +415,7 @@ async def batch_extract_metadata(
             raise HTTPException(status_code=404, detail=f"扫描目录不存在: {scan_dir}")
         
         # 查找所有NetCDF文件
-        netcdf_files = []
-        for pattern in ['**/*.nc', '**/*.netcdf', '**/*.nc4']:
-            netcdf_files.extend(scan_path.glob(pattern))
+        netcdf_files = find_netcdf_files(scan_path)
         
         results["total_files"] = len(netcdf_files)
         
@@ -550,9 +549,7 @@ async def scan_standard_files(
         }
         
         # 查找所有标准目录下的NetCDF文件
-        netcdf_files = []
-        for pattern in ['**/*.nc', '**/*.netcdf', '**/*.nc4']:
-            netcdf_files.extend(standard_dir.glob(pattern))
+        netcdf_files = find_netcdf_files(standard_dir)
         
         results["scanned_files"] = len(netcdf_files)
         
@@ -649,9 +646,7 @@ async def process_raw_files(
         }
         
         # 查找所有raw目录下的NetCDF文件
-        netcdf_files = []
-        for pattern in ['**/*.nc', '**/*.netcdf', '**/*.nc4']:
-            netcdf_files.extend(raw_dir.glob(pattern))
+        netcdf_files = find_netcdf_files(raw_dir)
         
         results["total_files"] = len(netcdf_files)
         logger.info(f"在raw目录发现 {len(netcdf_files)} 个NetCDF文件")
@@ -976,9 +971,7 @@ async def get_processing_status(
         for dir_name, dir_info in status["directories"].items():
             if dir_info["exists"]:
                 dir_path = Path(dir_info["path"])
-                netcdf_files = []
-                for pattern in ['**/*.nc', '**/*.netcdf', '**/*.nc4']:
-                    netcdf_files.extend(dir_path.glob(pattern))
+                netcdf_files = find_netcdf_files(dir_path)
                 dir_info["file_count"] = len(netcdf_files)
         
         # 统计数据库中的元数据记录
@@ -0,0 +1,77 @@
+"""
+大文件复制工具
+NetCDF 文件可达数GB，尽量避免在用户态逐字节复制
+"""
+
+import os
+import shutil
+import logging
+from pathlib import Path
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# NetCDF 文件扩展名（小写）
+NETCDF_EXTENSIONS = frozenset({".nc", ".netcdf", ".nc4"})
+
+
+def is_netcdf_file(name: str) -> bool:
+    """按扩展名判断是否为NetCDF文件（不区分大小写）"""
+    return os.path.splitext(name)[1].lower() in NETCDF_EXTENSIONS
+
+
+def find_netcdf_files(root) -> List[Path]:
+    """
+    递归查找目录下的所有NetCDF文件
+    单次遍历目录树并按扩展名筛选，代替按每种扩展名分别执行的递归 glob
+    与 glob 一致，不进入指向目录的符号链接，避免符号链接环导致同一文件被重复处理
+    """
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if is_netcdf_file(name):
+                files.append(Path(dirpath) / name)
+    return files
+
+
+def fast_copy(src: str, dst: str) -> None:
+    """
+    复制文件，语义同 shutil.copy2（保留修改时间等元数据）
+    Linux 上使用 copy_file_range 在内核中完成复制，XFS/Btrfs 等文件系统可直接共享数据块（reflink）
+    不支持时回退到 shutil.copy2
+    """
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is not None:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                shutil.copystat(src, dst)
+                return
+        except OSError as e:
+            logger.debug(f"copy_file_range 不可用，回退到普通复制: {e}")
+    shutil.copy2(src, dst)
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """
+    将 src 放置到 dst（覆盖已存在的 dst），用于随后会删除 src 的“移动”场景
+    同一文件系统内建立硬链接，只写目录项、不复制数据；跨文件系统时回退到 fast_copy
+    注意：硬链接与 src 共享数据，不适用于之后仍会原地修改 src 的场景（如备份）
+    """
+    tmp = f"{dst}.link-{os.getpid()}"
+    try:
+        os.link(src, tmp)
+        os.replace(tmp, dst)
+        return
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+    fast_copy(src, dst)
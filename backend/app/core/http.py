@@ -0,0 +1,44 @@
+"""
+共享 HTTP 客户端
+访问 THREDDS 等外部服务时复用同一个 httpx.AsyncClient 的连接池，
+避免每次请求重新建立连接池并重复 TCP/TLS 握手；递归遍历 Catalog 时各子 Catalog 请求可复用 keep-alive 连接
+"""
+
+import importlib.util
+import logging
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# 默认超时（秒），调用方可按请求单独指定；建立连接单独使用较短超时，THREDDS不可达时尽快失败
+HTTP_TIMEOUT = 20.0
+HTTP_CONNECT_TIMEOUT = 10.0
+# 多个Catalog遍历（每个最多 THREDDS_CATALOG_CONCURRENCY 个请求）与元数据请求可能同时进行，连接池按并发峰值设置
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=50, max_connections=200)
+
+# HTTP/2 需要可选依赖 h2，缺失时使用 HTTP/1.1
+_H2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取共享的 AsyncClient，首次使用时创建"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=HTTP_LIMITS,
+            http2=_H2_AVAILABLE,
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """关闭共享的 AsyncClient，在应用关闭时调用"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
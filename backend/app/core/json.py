@@ -2,7 +2,17 @@ import json
 import numpy as np
 import pandas as pd
 import datetime
+from typing import Sequence, Type
+from fastapi import HTTPException, Request
 from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时使用标准库 json
+    orjson = None
 
 class NumpyEncoder(json.JSONEncoder):
     """自定义 JSON 编码器，处理 NumPy 数据类型"""
@@ -49,4 +59,80 @@ def custom_jsonable_encoder(obj, **kwargs):
         return jsonable_encoder(obj, **kwargs)
     except Exception:
         # 如果 jsonable_encoder 失败，尝试使用 NumpyEncoder
-        return json.loads(json.dumps(obj, cls=NumpyEncoder))
\ No newline at end of file
+        return json.loads(json.dumps(obj, cls=NumpyEncoder))
+
+
+# orjson 不直接支持的类型（pd.Timestamp、字符串/对象数组等）按 NumpyEncoder 的规则逐个转换
+_numpy_encoder = NumpyEncoder()
+
+
+def dumps_numpy(content) -> bytes:
+    """
+    将内容序列化为 JSON 字节串，NumPy 数组在 C 层直接序列化
+    orjson 原生不支持的值交给 NumpyEncoder.default 转换；orjson 不可用或仍无法序列化时退回 NumpyEncoder
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                content,
+                default=_numpy_encoder.default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+            )
+        except TypeError:
+            pass
+    return json.dumps(
+        content,
+        cls=NumpyEncoder,
+        ensure_ascii=False,
+        allow_nan=True,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class NumpyORJSONResponse(JSONResponse):
+    """
+    直接序列化 NumPy 数组的 JSON 响应
+    使用 orjson 在 C 层序列化数组，不经过嵌套 Python 列表和 Pydantic 的二次校验；
+    orjson 不可用或遇到其不支持的类型时退回 NumpyEncoder
+    """
+    def render(self, content) -> bytes:
+        return dumps_numpy(content)
+
+
+def ndarray_body(model: Type[BaseModel], array_fields: Sequence[str], dtype_fields: Sequence[str] = ()):
+    """
+    生成请求体解析依赖：用 orjson 解析JSON，并将数组字段直接转换为 NumPy 数组
+    数组字段跳过 Pydantic 的逐元素校验，其余字段仍按 model 校验；
+    dtype_fields 中的字段按请求的 dtype 字段（float32/float64）解析，其余数组字段为 float64；
+    返回的 model 实例中数组字段为 np.ndarray
+    """
+    async def dependency(request: Request):
+        body = await request.body()
+        try:
+            payload = orjson.loads(body) if orjson is not None else json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="请求体不是合法的JSON")
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=422, detail="请求体必须是JSON对象")
+        for name in array_fields:
+            if name not in payload:
+                raise HTTPException(status_code=422, detail=f"缺少字段: {name}")
+
+        # 数组字段以空列表占位，仅校验其余字段
+        try:
+            params = model.model_validate({**payload, **{name: [] for name in array_fields}})
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+
+        # 直接解析为目标精度，不产生 float64 中间数组
+        requested = getattr(params, "dtype", "float64")
+        arrays = {}
+        for name in array_fields:
+            dtype = requested if name in dtype_fields else np.float64
+            try:
+                arrays[name] = np.asarray(payload[name], dtype=dtype)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=422, detail=f"字段 {name} 不是数值数组")
+        return params.model_copy(update=arrays)
+
+    return dependency
@@ -3,6 +3,7 @@
 创建表结构并插入初始数据
 """
 
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from app.db.session import engine, Base
 from app.db.models import DatasetTemplate, CFStandardName, UserPreference
@@ -128,22 +129,26 @@ def init_cf_standard_names(db: Session):
         }
     ]
     
-    for cf_data in cf_standards:
-        # 检查是否已存在
-        existing = db.query(CFStandardName).filter(
-            CFStandardName.standard_name == cf_data["standard_name"]
-        ).first()
-        
-        if not existing:
-            cf_record = CFStandardName(
-                standard_name=cf_data["standard_name"],
-                canonical_units=cf_data["canonical_units"],
-                description=cf_data["description"],
-                category=cf_data["category"],
-                aliases=cf_data["aliases"],
-                cf_version="CF-1.8"
-            )
-            db.add(cf_record)
+    # 一次查询取得已存在的名称，缺失的记录以单条多行 INSERT 批量写入
+    existing = set(db.scalars(
+        select(CFStandardName.standard_name).where(
+            CFStandardName.standard_name.in_([cf["standard_name"] for cf in cf_standards])
+        )
+    ))
+    new_records = [
+        {
+            "standard_name": cf_data["standard_name"],
+            "canonical_units": cf_data["canonical_units"],
+            "description": cf_data["description"],
+            "category": cf_data["category"],
+            "aliases": cf_data["aliases"],
+            "cf_version": "CF-1.8"
+        }
+        for cf_data in cf_standards
+        if cf_data["standard_name"] not in existing
+    ]
+    if new_records:
+        db.execute(insert(CFStandardName), new_records)
     
     db.commit()
     print(f"CF标准名称库初始化完成，共添加 {len(cf_standards)} 个标准名称")
@@ -282,28 +287,29 @@ def init_dataset_templates(db: Session):
     
     templates = [oceanographic_template, satellite_template, model_template]
     
-    for template_data in templates:
-        # 检查是否已存在
-        existing = db.query(DatasetTemplate).filter(
-            DatasetTemplate.name == template_data["name"]
-        ).first()
-        
-        if not existing:
-            template = DatasetTemplate(
-                name=template_data["name"],
-                description=template_data["description"],
-                category=template_data["category"],
-                file_types=template_data["file_types"],
-                data_patterns=template_data["data_patterns"],
-                global_attributes_template=template_data["global_attributes_template"],
-                variable_mapping_rules=template_data["variable_mapping_rules"],
-                coordinate_detection_rules=template_data["coordinate_detection_rules"],
-                validation_rules=template_data["validation_rules"],
-                required_attributes=template_data["required_attributes"],
-                is_builtin=template_data["is_builtin"],
-                created_by="system"
-            )
-            db.add(template)
+    existing = set(db.scalars(
+        select(DatasetTemplate.name).where(DatasetTemplate.name.in_([t["name"] for t in templates]))
+    ))
+    new_templates = [
+        {
+            "name": template_data["name"],
+            "description": template_data["description"],
+            "category": template_data["category"],
+            "file_types": template_data["file_types"],
+            "data_patterns": template_data["data_patterns"],
+            "global_attributes_template": template_data["global_attributes_template"],
+            "variable_mapping_rules": template_data["variable_mapping_rules"],
+            "coordinate_detection_rules": template_data["coordinate_detection_rules"],
+            "validation_rules": template_data["validation_rules"],
+            "required_attributes": template_data["required_attributes"],
+            "is_builtin": template_data["is_builtin"],
+            "created_by": "system"
+        }
+        for template_data in templates
+        if template_data["name"] not in existing
+    ]
+    if new_templates:
+        db.execute(insert(DatasetTemplate), new_templates)
     
     db.commit()
     print(f"数据集模板初始化完成，共添加 {len(templates)} 个模板")
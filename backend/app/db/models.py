@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, JSON, ForeignKey, Enum as SQLAEnum
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, JSON, ForeignKey, Index, Enum as SQLAEnum
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from app.db.session import Base
 import enum
@@ -162,6 +162,11 @@ class DataImportRecord(Base):
     validation_issues = relationship("ValidationIssue", back_populates="import_record", cascade="all, delete-orphan")
     file_operations = relationship("FileOperation", back_populates="import_record", cascade="all, delete-orphan")
     
+    # 导入记录列表按用户、状态筛选并按创建时间倒序分页，复合索引同时满足过滤与排序
+    __table_args__ = (
+        Index("ix_import_records_user_status_created", "user_id", "import_status", created_at.desc()),
+    )
+    
     def __repr__(self):
         return f"<DataImportRecord(id={self.id}, temp_id='{self.temp_id}', status='{self.import_status}')>"
 
@@ -308,6 +313,17 @@ class CFStandardName(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="更新时间")
     
+    # 名称/描述的子串搜索使用 ngram 全文索引，别名匹配使用 JSON 多值索引（均为 MySQL 8.0 特性）
+    __table_args__ = (
+        Index(
+            "ix_cf_standard_names_ngram", "standard_name", "description",
+            mysql_prefix="FULLTEXT", mysql_with_parser="ngram"
+        ).ddl_if(dialect="mysql"),
+        Index(
+            "ix_cf_standard_names_aliases", text("(CAST(aliases AS CHAR(255) ARRAY))")
+        ).ddl_if(dialect="mysql"),
+    )
+    
     def __repr__(self):
         return f"<CFStandardName(id={self.id}, name='{self.standard_name}', units='{self.canonical_units}')>"
 
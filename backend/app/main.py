@@ -1,14 +1,14 @@
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.json import NumpyEncoder
-import json
+from app.core.json import NumpyORJSONResponse
 from app.core.config import settings
 
+# 默认响应类：orjson 序列化（支持 NumPy 类型），不可用时退回 NumpyEncoder
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=NumpyORJSONResponse
 )
 
 # 添加CORS中间件
@@ -27,32 +27,23 @@ app.add_middleware(NumpySerializationMiddleware)
 
 # 添加GZip压缩，减少网络传输大小
 # 必须在NumPy序列化之后添加，确保先序列化后压缩
+# NetCDF等二进制文件下载不压缩：压缩收益低，且会去掉Content-Length、阻止服务器直接发送文件
 from fastapi.middleware.gzip import GZipMiddleware
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=1000,
+    exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + ("application/octet-stream", "application/x-netcdf")
+)
 
 # 设置全局JSON编码器
-from app.core.json import custom_jsonable_encoder, NumpyEncoder
+from app.core.json import custom_jsonable_encoder
 from fastapi.encoders import jsonable_encoder as original_jsonable_encoder
 
 # 替换FastAPI的jsonable_encoder
 from fastapi import encoders
 encoders.jsonable_encoder = custom_jsonable_encoder
 
-# 自定义JSON响应类
-class NumpyJSONResponse(JSONResponse):
-    def render(self, content) -> bytes:
-        return json.dumps(
-            content,
-            cls=NumpyEncoder,
-            ensure_ascii=False,
-            allow_nan=True,
-            indent=None,
-            separators=(",", ":"),
-        ).encode("utf-8")
-
-# 设置默认响应类
-app.json_response_class = NumpyJSONResponse
-
 @app.get("/")
 def root():
     return {
@@ -74,7 +65,8 @@ from app.algorithms.fusion import optimal_interpolation, kalman_filter
 from app.algorithms.diagnostics import thermocline, eddy, front
 
 # CF规范监控服务
-from app.api.v1.endpoints.cf_router import initialize_cf_monitor, cleanup_cf_monitor
+from app.api.v1.endpoints.cf_router import initialize_cf_monitor, cleanup_cf_monitor, stop_upload_sweeper
+from app.core.http import close_http_client
 import os
 
 # 应用启动事件
@@ -97,6 +89,12 @@ async def startup_event():
     except Exception as e:
         print(f"数据导入系统初始化失败: {e}")
     
+    # 创建数据转换所需的目录
+    data_convert_router.ensure_data_dirs()
+    
+    # 后台预热THREDDS Catalog缓存
+    data_router.start_catalog_prefetch()
+    
     # 初始化CF监控服务
     data_dir = os.environ.get("DATA_DIR", os.path.join(os.getcwd(), "docker", "thredds", "data", "oceanenv"))
     initialize_cf_monitor(data_dir)
@@ -106,6 +104,15 @@ async def startup_event():
 async def shutdown_event():
     # 清理CF监控服务
     cleanup_cf_monitor()
+    
+    # 停止uploads文件后台清理任务
+    await stop_upload_sweeper()
+    
+    # 停止THREDDS Catalog缓存预热任务
+    await data_router.stop_catalog_prefetch()
+    
+    # 关闭共享的HTTP客户端连接池
+    await close_http_client()
 
 app.include_router(data_router.router, prefix=settings.API_V1_STR, tags=["data"])
 app.include_router(data_import_router.router, prefix=settings.API_V1_STR, tags=["data-import-management"])
@@ -5,13 +5,13 @@ CF-1.8规范转换服务
 
 import os
 import logging
-import shutil
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import xarray as xr
 import numpy as np
 import pandas as pd
-from .cf_validator import CFValidator, ValidationResult, ValidationLevel
+from .cf_validator import CFValidator, ValidationResult, ValidationLevel, cached_dataset, release_cached_dataset
+from app.core.fileops import fast_copy
 
 logger = logging.getLogger(__name__)
 
@@ -139,8 +139,7 @@ class CFConverter:
             if validation_result.is_valid:
                 # 文件已经符合CF标准，直接复制
                 if input_path != output_path:
-                    import shutil
-                    shutil.copy2(input_path, output_path)
+                    fast_copy(input_path, output_path)
                 result['success'] = True
                 result['message'] = '文件已符合CF-1.8标准'
                 
@@ -164,9 +163,8 @@ class CFConverter:
                 backup_filename = f"backup_{input_filename}"
                 backup_path = os.path.join(processing_dir, backup_filename)
                 
-                import shutil
                 if not os.path.exists(backup_path):  # 避免重复备份
-                    shutil.copy2(input_path, backup_path)
+                    fast_copy(input_path, backup_path)
                     result['backup_path'] = backup_path
                     logger.info(f"已备份原文件至: {backup_path}")
                 else:
@@ -179,8 +177,8 @@ class CFConverter:
             
             # 使用安全的方式加载数据集，避免编码冲突
             try:
-                # 先尝试不解码时间的方式加载
-                with xr.open_dataset(input_path, decode_times=False, engine='netcdf4') as ds:
+                # 先尝试不解码时间的方式加载（复用验证阶段已打开的句柄，_convert_dataset 在副本上修改）
+                with cached_dataset(input_path) as ds:
                     # 创建转换后的数据集
                     converted_ds = self._convert_dataset(ds, validation_result, auto_fix)
             except Exception as e:
@@ -235,6 +233,8 @@ class CFConverter:
             result['message'] = f'转换失败: {str(e)}'
             logger.error(f"文件转换失败: {str(e)}", exc_info=True)
         finally:
+            # 输入文件已处理完毕，关闭其缓存句柄（raw文件随后可能被删除，避免句柄占用磁盘空间）
+            release_cached_dataset(input_path)
             # 释放文件锁
             if lock_file:
                 try:
@@ -512,6 +512,9 @@ class CFConverter:
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
+        # 覆盖已有文件前释放其缓存的只读句柄
+        release_cached_dataset(output_path)
+        
         # 创建数据集副本以避免修改原始数据
         ds_copy = ds.copy(deep=True)
         
@@ -13,8 +13,9 @@ from datetime import datetime
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent, FileMovedEvent
 import threading
-from .cf_validator import validate_netcdf_file, ValidationResult
+from .cf_validator import validate_netcdf_file, ValidationResult, release_cached_dataset
 from .cf_converter import convert_netcdf_to_cf
+from app.core.fileops import fast_copy, link_or_copy, is_netcdf_file, find_netcdf_files
 
 logger = logging.getLogger(__name__)
 
@@ -208,7 +209,7 @@ class NetCDFFileHandler(FileSystemEventHandler):
     
     def _is_netcdf_file(self, file_path: str) -> bool:
         """检查是否为NetCDF文件"""
-        return file_path.lower().endswith(('.nc', '.netcdf', '.nc4'))
+        return is_netcdf_file(file_path)
     
     def _should_skip_file(self, file_path: str) -> bool:
         """检查是否应该跳过此文件"""
@@ -323,8 +324,7 @@ class FileProcessor:
                 rel_path = Path('raw') / file_path.name
                 raw_target = self.raw_dir / file_path.name
                 raw_target.parent.mkdir(parents=True, exist_ok=True)
-                import shutil
-                shutil.copy2(file_path, raw_target)
+                fast_copy(str(file_path), str(raw_target))
                 file_path = raw_target
                 rel_path = file_path.relative_to(self.data_dir)
             
@@ -352,6 +352,9 @@ class FileProcessor:
                 
         except Exception as e:
             logger.error(f"处理文件失败 {file_path}: {str(e)}", exc_info=True)
+        finally:
+            # 验证与转换已完成，关闭该文件的缓存句柄；raw文件删除后不再占用磁盘空间
+            release_cached_dataset(str(file_path))
     
     def _move_to_standard(self, file_path: Path, rel_path: Path):
         """移动符合CF标准的文件到standard目录"""
@@ -365,9 +368,8 @@ class FileProcessor:
                 standard_path.unlink()
                 logger.info(f"删除已存在的standard文件: {standard_path}")
             
-            # 复制文件到standard目录
-            import shutil
-            shutil.copy2(file_path, standard_path)
+            # 放置到standard目录（raw中的原文件随后删除，同一文件系统内直接建立硬链接）
+            link_or_copy(str(file_path), str(standard_path))
             logger.info(f"文件已移动到standard目录: {standard_path}")
             
             # 提取并保存元数据到数据库
@@ -399,9 +401,8 @@ class FileProcessor:
             processing_path = self.processing_dir / rel_path.name
             processing_path.parent.mkdir(parents=True, exist_ok=True)
             
-            import shutil
             if str(file_path) != str(processing_path):
-                shutil.copy2(file_path, processing_path)
+                fast_copy(str(file_path), str(processing_path))
                 logger.info(f"文件复制到processing目录: {processing_path}")
             
             # 转换文件，保存到standard目录
@@ -448,7 +449,7 @@ class FileProcessor:
     
     def _is_netcdf_file(self, file_path: str) -> bool:
         """检查是否为NetCDF文件"""
-        return file_path.lower().endswith(('.nc', '.netcdf', '.nc4'))
+        return is_netcdf_file(file_path)
     
     def _should_skip_file_path(self, file_path: Path) -> bool:
         """检查是否应该跳过此文件（Path对象版本）"""
@@ -515,11 +516,8 @@ class DataDirectoryMonitor:
             raw_path.mkdir(parents=True, exist_ok=True)
             logger.info(f"创建raw目录: {raw_path}")
         
-        netcdf_files = []
-        
         # 递归查找raw目录中的NetCDF文件
-        for pattern in ['**/*.nc', '**/*.netcdf', '**/*.nc4']:
-            netcdf_files.extend(raw_path.glob(pattern))
+        netcdf_files = find_netcdf_files(raw_path)
         
         # 过滤文件
         filtered_files = []
@@ -586,27 +584,31 @@ class CFMonitorService:
         """获取处理结果"""
         return self.processing_results[-limit:]
     
-    def get_pending_files_status(self) -> Dict[str, Any]:
-        """获取待处理文件状态"""
+    def _find_pending_event_handler(self):
+        """查找记录待处理文件的事件处理器"""
         if not self.monitor or not hasattr(self.monitor.processor, 'event_handler'):
-            return {"pending_files": [], "count": 0}
-        
+            return None
+        for handler in getattr(self.monitor.observer, '_handlers', {}).values():
+            for h in handler:
+                if hasattr(h, 'pending_files'):
+                    return h
+        return None
+    
+    def get_pending_files_status(self, detail: bool = True) -> Dict[str, Any]:
+        """
+        获取待处理文件状态
+        detail: 为False时只返回数量，不构造待处理文件列表
+        """
         try:
-            # 尝试从事件处理器获取待处理文件
-            event_handler = None
-            for handler in getattr(self.monitor.observer, '_handlers', {}).values():
-                for h in handler:
-                    if hasattr(h, 'pending_files'):
-                        event_handler = h
-                        break
-                if event_handler:
-                    break
-            
-            if event_handler and hasattr(event_handler, 'pending_files'):
+            event_handler = self._find_pending_event_handler()
+            if event_handler is not None:
+                if not detail:
+                    return {"count": len(event_handler.pending_files)}
+                
                 pending_files = []
                 current_time = time.time()
                 
-                for file_path, info in event_handler.pending_files.items():
+                for file_path, info in list(event_handler.pending_files.items()):
                     pending_files.append({
                         "file_path": file_path,
                         "event_type": info.get('event_type', 'unknown'),
@@ -621,10 +623,13 @@ class CFMonitorService:
         except Exception as e:
             logger.warning(f"获取待处理文件状态失败: {str(e)}")
         
-        return {"pending_files": [], "count": 0}
+        return {"pending_files": [], "count": 0} if detail else {"count": 0}
     
-    def get_monitor_status(self) -> Dict[str, Any]:
-        """获取详细的监控状态"""
+    def get_monitor_status(self, detail: bool = True) -> Dict[str, Any]:
+        """
+        获取详细的监控状态
+        detail: 是否包含待处理文件列表
+        """
         base_status = {
             "service_running": self.monitor is not None,
             "data_dir": self.data_dir,
@@ -638,7 +643,7 @@ class CFMonitorService:
             })
             
             # 添加待处理文件信息
-            pending_status = self.get_pending_files_status()
+            pending_status = self.get_pending_files_status(detail)
             base_status.update(pending_status)
         
         return base_status
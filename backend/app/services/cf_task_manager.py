@@ -0,0 +1,43 @@
+import os
+import redis
+from rq import Queue
+from rq.job import Job
+from typing import Callable, Dict, Any
+
+from app.core.config import settings
+from app.services.cf_converter import convert_netcdf_to_cf
+
+REDIS_URL = f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
+redis_conn = redis.Redis.from_url(REDIS_URL)
+queue = Queue("cf", connection=redis_conn)
+
+# 大文件转换可能耗时数分钟，放宽RQ默认的180秒超时
+CONVERT_JOB_TIMEOUT = 60 * 60
+
+def convert_uploaded_netcdf(input_path: str, output_path: str, auto_fix: bool = True) -> Dict[str, Any]:
+    """转换上传的文件，成功后删除上传的临时文件"""
+    result = convert_netcdf_to_cf(
+        input_path=input_path,
+        output_path=output_path,
+        auto_fix=auto_fix,
+        backup=True
+    )
+    if result['success']:
+        try:
+            os.unlink(input_path)
+        except OSError:
+            pass
+    return result
+
+def enqueue_task(func: Callable, *args, **kwargs) -> str:
+    job = queue.enqueue(func, *args, job_timeout=CONVERT_JOB_TIMEOUT, **kwargs)
+    return job.get_id()
+
+def get_task_status(task_id: str) -> dict:
+    job = Job.fetch(task_id, connection=redis_conn)
+    return {
+        "id": job.id,
+        "status": job.get_status(),
+        "result": job.result,
+        "exc_info": job.exc_info
+    }
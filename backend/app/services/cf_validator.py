@@ -12,9 +12,110 @@ import xarray as xr
 import numpy as np
 from datetime import datetime
 import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+# 只读数据集句柄缓存：同一文件先验证再转换时无需重新打开并解析HDF5元数据
+DATASET_CACHE_SIZE = 16
+_dataset_cache: "OrderedDict[tuple, _CachedDataset]" = OrderedDict()
+_dataset_cache_lock = threading.Lock()
+
+
+class _CachedDataset:
+    """缓存的数据集句柄；pins 为正在使用该句柄的调用方数量，stale 表示已移出缓存、最后一个使用者释放时关闭"""
+    __slots__ = ("ds", "pins", "stale")
+
+    def __init__(self, ds: xr.Dataset):
+        self.ds = ds
+        self.pins = 0
+        self.stale = False
+
+
+def _detach(entry: "_CachedDataset", to_close: List[xr.Dataset]) -> None:
+    """将已移出缓存的句柄标记为过期；无人使用时加入待关闭列表（调用方持有锁）"""
+    entry.stale = True
+    if entry.pins == 0:
+        to_close.append(entry.ds)
+
+
+def _close_all(datasets: List[xr.Dataset]) -> None:
+    for ds in datasets:
+        try:
+            ds.close()
+        except Exception as e:
+            logger.warning(f"关闭数据集失败: {e}")
+
+
+@contextmanager
+def cached_dataset(file_path: str):
+    """
+    以 decode_times=False 打开数据集并缓存句柄，按 (路径, 修改时间, 大小) 区分文件版本
+    with 块内句柄被占用，不会因淘汰或 release_cached_dataset 被关闭；数据集在调用方之间共享，
+    只能读取，需要修改时先 copy，调用方不要关闭它
+    被淘汰、文件已更新（旧版本）或被释放的句柄在最后一个使用者退出时关闭
+    """
+    st = os.stat(file_path)
+    abs_path = os.path.abspath(file_path)
+    key = (abs_path, st.st_mtime_ns, st.st_size)
+    to_close: List[xr.Dataset] = []
+    with _dataset_cache_lock:
+        entry = _dataset_cache.get(key)
+        if entry is not None:
+            _dataset_cache.move_to_end(key)
+            entry.pins += 1
+
+    if entry is None:
+        ds = xr.open_dataset(file_path, decode_times=False)
+        with _dataset_cache_lock:
+            entry = _dataset_cache.get(key)
+            if entry is not None:
+                to_close.append(ds)
+            else:
+                entry = _CachedDataset(ds)
+                # 同一路径的旧版本句柄不会再被命中，移出缓存
+                for old_key in [k for k in _dataset_cache if k[0] == abs_path]:
+                    _detach(_dataset_cache.pop(old_key), to_close)
+                _dataset_cache[key] = entry
+                while len(_dataset_cache) > DATASET_CACHE_SIZE:
+                    _detach(_dataset_cache.popitem(last=False)[1], to_close)
+            entry.pins += 1
+    _close_all(to_close)
+
+    try:
+        yield entry.ds
+    finally:
+        with _dataset_cache_lock:
+            entry.pins -= 1
+            close_now = entry.stale and entry.pins == 0
+        if close_now:
+            _close_all([entry.ds])
+
+
+def release_cached_dataset(file_path: str):
+    """
+    移除某个文件的所有缓存句柄，无人使用的句柄立即关闭，正在使用的在使用结束时关闭
+    写入（覆盖）该文件之前，以及文件处理完成（如raw文件即将删除）后调用
+    """
+    abs_path = os.path.abspath(file_path)
+    to_close: List[xr.Dataset] = []
+    with _dataset_cache_lock:
+        for key in [key for key in _dataset_cache if key[0] == abs_path]:
+            _detach(_dataset_cache.pop(key), to_close)
+    _close_all(to_close)
+
+
+def close_cached_datasets():
+    """清空缓存，关闭所有无人使用的数据集句柄（正在使用的在使用结束时关闭）"""
+    to_close: List[xr.Dataset] = []
+    with _dataset_cache_lock:
+        for entry in _dataset_cache.values():
+            _detach(entry, to_close)
+        _dataset_cache.clear()
+    _close_all(to_close)
+
 
 class ValidationLevel(Enum):
     """验证级别"""
@@ -87,27 +188,28 @@ class CFValidator:
         self.issues = []
         
         try:
-            with xr.open_dataset(file_path, decode_times=False) as ds:
+            # 检查期间占用缓存句柄，防止被并发的淘汰或释放关闭
+            with cached_dataset(file_path) as ds:
                 logger.info(f"开始验证文件: {file_path}")
-                
+            
                 # 检查全局属性
                 self._check_global_attributes(ds)
-                
+            
                 # 检查坐标变量
                 self._check_coordinate_variables(ds)
-                
+            
                 # 检查数据变量
                 self._check_data_variables(ds)
-                
+            
                 # 检查时间变量
                 self._check_time_variables(ds)
-                
+            
                 # 检查单位
                 self._check_units(ds)
-                
+            
                 # 检查缺失值
                 self._check_missing_values(ds)
-                
+            
                 # 检查维度
                 self._check_dimensions(ds)
                 
@@ -1,4 +1,9 @@
 import os
+import stat
+import asyncio
+import time
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import glob
 import hashlib
 from typing import List, Dict, Optional, Any, Union
@@ -7,7 +12,7 @@ import pandas as pd
 import json
 import pathlib
 import datetime
-import httpx
+from app.core.http import get_http_client
 import xml.etree.ElementTree as ET
 import urllib.parse
 import numpy as np
@@ -32,6 +37,11 @@ XML_NAMESPACES = {
     'xlink': 'http://www.w3.org/1999/xlink'
 }
 
+# 预先拼接的完整标签名与属性名，直接用 Element.iter 遍历，不经过 XPath 解析与命名空间映射
+THREDDS_DATASET_TAG = f"{{{XML_NAMESPACES['thredds']}}}dataset"
+THREDDS_CATALOG_REF_TAG = f"{{{XML_NAMESPACES['thredds']}}}catalogRef"
+XLINK_HREF_ATTR = f"{{{XML_NAMESPACES['xlink']}}}href"
+
 # 确保路径存在
 if not os.path.exists(PROCESSED_DATA_ROOT):
     print(f"警告: 处理数据目录不存在: {PROCESSED_DATA_ROOT}")
@@ -41,6 +51,71 @@ if not os.path.exists(THREDDS_DATA_ROOT):
 
 logger = logging.getLogger(__name__) # Or use a specific name like logger_dataservice
 
+# 文件列表缓存有效期（秒）
+LIST_FILES_CACHE_TTL = 10
+
+
+# 并行扫描顶层子目录的线程数
+LIST_FILES_SCAN_WORKERS = 8
+
+# 递归解析Catalog时同时向THREDDS发出的最大请求数
+THREDDS_CATALOG_CONCURRENCY = 16
+
+
+def _scan_one_dir(directory: str, prefix_len: int, suffix: Optional[str]):
+    """
+    扫描单个目录，DirEntry 自带文件类型，无需逐个 stat
+    返回 (匹配文件的相对路径列表, 子目录路径列表)；相对路径为去掉前 prefix_len 个字符（根目录前缀）的路径
+    """
+    files, subdirs = [], []
+    try:
+        it = os.scandir(directory)
+    except OSError:
+        return files, subdirs
+    with it:
+        for entry in it:
+            name = entry.name
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            # 跳过隐藏文件
+            elif not name.startswith('.') and entry.is_file() and (not suffix or name.lower().endswith(suffix)):
+                files.append(entry.path[prefix_len:])
+    return files, subdirs
+
+
+def _scan_tree(directory: str, prefix_len: int, suffix: Optional[str]) -> List[str]:
+    """以显式栈递归遍历目录树"""
+    result = []
+    stack = [directory]
+    while stack:
+        files, subdirs = _scan_one_dir(stack.pop(), prefix_len, suffix)
+        result.extend(files)
+        stack.extend(subdirs)
+    return result
+
+
+@functools.lru_cache(maxsize=8)
+def _scan_files_cached(directory: str, extension: Optional[str], recursive: bool,
+                       mtime_ns: int, ttl_bucket: int) -> tuple:
+    """
+    列出目录下的文件；mtime_ns/ttl_bucket 仅作为缓存键
+    递归时各顶层子目录相互独立，在线程池中并行遍历（scandir/stat 释放GIL），
+    网络文件系统上可重叠每次系统调用的延迟
+    """
+    suffix = f".{extension.lower()}" if extension else None
+    prefix_len = len(os.path.join(directory, ""))
+    result, subdirs = _scan_one_dir(directory, prefix_len, suffix)
+    if recursive:
+        if len(subdirs) > 1:
+            with ThreadPoolExecutor(max_workers=min(LIST_FILES_SCAN_WORKERS, len(subdirs))) as pool:
+                for files in pool.map(lambda d: _scan_tree(d, prefix_len, suffix), subdirs):
+                    result.extend(files)
+        else:
+            for d in subdirs:
+                result.extend(_scan_tree(d, prefix_len, suffix))
+    result.sort()
+    return tuple(result)
+
 class DataService:
     # 静态变量
     THREDDS_SERVER_URL = THREDDS_SERVER_URL
@@ -84,32 +159,18 @@ class DataService:
         Returns:
             文件路径的列表(相对于指定目录)
         """
-        result = []
-        
-        if not os.path.exists(directory) or not os.path.isdir(directory):
+        try:
+            st = os.stat(directory)
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISDIR(st.st_mode):
             print(f"警告: 目录不存在或不是目录: {directory}")
-            return result
+            return []
         
-        # 使用 os.walk 递归遍历所有子目录
-        for root, _, files in os.walk(directory):
-            # 如果不需要递归且不是目标目录，则跳过
-            if not recursive and root != directory:
-                continue
-                
-            for file in files:
-                # 跳过隐藏文件
-                if file.startswith('.'):
-                    continue
-                    
-                # 如果指定了扩展名，过滤匹配的文件
-                if extension and not file.lower().endswith(f'.{extension}'):
-                    continue
-                    
-                filepath = os.path.join(root, file)
-                rel_path = os.path.relpath(filepath, directory)
-                result.append(rel_path)
-                
-        return sorted(result)
+        # 结果按 (根目录mtime, 时间片) 缓存：根目录增删文件立即失效，
+        # 子目录内的变化最迟在 LIST_FILES_CACHE_TTL 秒后可见
+        ttl_bucket = int(time.monotonic() // LIST_FILES_CACHE_TTL)
+        return list(_scan_files_cached(directory, extension, recursive, st.st_mtime_ns, ttl_bucket))
     
     @staticmethod
     def get_netcdf_metadata(file_path: str) -> Dict:
@@ -340,9 +401,11 @@ class DataService:
         return os.path.isfile(file_path)
     
     @staticmethod
+    @functools.lru_cache(maxsize=8192)
     def generate_dataset_id(file_path: str) -> str:
         """
         根据文件路径生成唯一的datasetId
+        同一路径在多次Catalog刷新与ID查找中反复出现，缓存哈希结果
         
         Args:
             file_path: 文件路径
@@ -623,13 +686,15 @@ class DataService:
             raise ValueError(f"无效的数据源类型: {source_type}")
     
     @staticmethod
-    async def get_thredds_catalog_datasets(catalog_url: str = None, depth: int = 2) -> List[Dict]:
+    async def get_thredds_catalog_datasets(catalog_url: str = None, depth: int = 2,
+                                           semaphore: Optional[asyncio.Semaphore] = None) -> List[Dict]:
         """
-        解析THREDDS Catalog XML文件获取数据集信息
+        解析THREDDS Catalog XML文件获取数据集信息，同级子Catalog并发获取
         
         Args:
             catalog_url: Catalog URL，默认使用THREDDS_CATALOG_URL
             depth: 递归深度，防止无限递归
+            semaphore: 在整个递归中共享，限制同时向THREDDS发出的请求数（默认 THREDDS_CATALOG_CONCURRENCY）
             
         Returns:
             数据集列表，包含ID和URL
@@ -641,24 +706,33 @@ class DataService:
             return []
             
         try:
-            # 下载Catalog XML
-            async with httpx.AsyncClient() as client:
-                response = await client.get(catalog_url, timeout=10.0)
+            # 边接收边解析，不将整个Catalog解码为字符串；元素在开始事件时即可读取属性
+            parser = ET.XMLPullParser(events=("start", "end"))
+            dataset_elements = {THREDDS_DATASET_TAG: [], 'dataset': []}
+            catalog_refs = []
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(THREDDS_CATALOG_CONCURRENCY)
+            # 只在请求与解析期间占用并发名额，等待子Catalog时不占用，避免递归层级间相互等待
+            async with semaphore, get_http_client().stream("GET", catalog_url, timeout=10.0) as response:
                 response.raise_for_status()
-                xml_content = response.text
-            
-            # 解析XML
-            root = ET.fromstring(xml_content)
+                async for chunk in response.aiter_bytes():
+                    parser.feed(chunk)
+                    for event, elem in parser.read_events():
+                        if event == "start":
+                            if elem.tag in dataset_elements:
+                                dataset_elements[elem.tag].append((elem.get('ID'), elem.get('name'), elem.get('urlPath')))
+                            elif elem.tag == THREDDS_CATALOG_REF_TAG:
+                                catalog_refs.append(elem.get(XLINK_HREF_ATTR))
+                        elif elem.tag in dataset_elements or elem.tag == THREDDS_CATALOG_REF_TAG:
+                            # 属性已读取，释放子树以保持内存占用平稳
+                            elem.clear()
+            parser.close()
             
             results = []
             
-            # 查找数据集元素
-            datasets = root.findall('.//thredds:dataset', XML_NAMESPACES)
-            for dataset in datasets:
-                dataset_id = dataset.get('ID')
-                dataset_name = dataset.get('name')
-                url_path = dataset.get('urlPath')
-                
+            # 文档中没有带命名空间的dataset时再按不带命名空间的标签查找
+            datasets = dataset_elements[THREDDS_DATASET_TAG] or dataset_elements['dataset']
+            for dataset_id, dataset_name, url_path in datasets:
                 # 只处理有ID和urlPath的数据集
                 if dataset_id and url_path:
                     # 构建完整URL
@@ -680,18 +754,17 @@ class DataService:
                     })
             
             # 处理子Catalog引用
-            catalog_refs = root.findall('.//thredds:catalogRef', XML_NAMESPACES)
-            for catalog_ref in catalog_refs:
-                if depth > 1:  # 控制递归深度
-                    href = catalog_ref.get('{http://www.w3.org/1999/xlink}href')
-                    if href:
-                        # 构建完整的子Catalog URL
-                        base_url = '/'.join(catalog_url.split('/')[:-1])
-                        sub_catalog_url = f"{base_url}/{href}"
-                        
-                        # 递归处理子Catalog
-                        sub_results = await DataService.get_thredds_catalog_datasets(sub_catalog_url, depth - 1)
-                        results.extend(sub_results)
+            if depth > 1:  # 控制递归深度
+                # 构建完整的子Catalog URL
+                base_url = catalog_url.rsplit('/', 1)[0]
+                
+                # 并发递归处理子Catalog，结果按catalogRef顺序合并；子Catalog失败时返回空列表
+                sub_results_list = await asyncio.gather(*[
+                    DataService.get_thredds_catalog_datasets(f"{base_url}/{href}", depth - 1, semaphore)
+                    for href in catalog_refs if href
+                ])
+                for sub_results in sub_results_list:
+                    results.extend(sub_results)
             
             return DataService._convert_numpy_types(results) # 递归转换 NumPy 类型
         except Exception as e:
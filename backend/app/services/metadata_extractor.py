@@ -14,6 +14,7 @@ import pandas as pd
 from sqlalchemy.orm import Session
 from app.db.models import NetCDFMetadata
 from app.db.session import get_db
+from app.core.fileops import is_netcdf_file
 
 logger = logging.getLogger(__name__)
 
@@ -50,7 +51,7 @@ class MetadataExtractor:
                 if not metadata.get('title'):
                     file_name = metadata.get('file_name', os.path.basename(file_path))
                     # 去掉文件扩展名
-                    if file_name.endswith(('.nc', '.netcdf', '.nc4')):
+                    if is_netcdf_file(file_name):
                         file_name = os.path.splitext(file_name)[0]
                     metadata['title'] = f"Ocean Environmental Data-{file_name}"
                 
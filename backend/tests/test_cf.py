@@ -0,0 +1,213 @@
+import os
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+def test_download_range(tmp_path):
+    path = tmp_path / "sample.nc"
+    content = os.urandom(4096)
+    path.write_bytes(content)
+    url = f"/api/v1/cf/download/{path}"
+
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert resp.headers["accept-ranges"] == "bytes"
+    assert resp.headers["content-length"] == "4096"
+    assert resp.content == content
+
+    # 断点续传：只返回请求的字节区间
+    resp = client.get(url, headers={"Range": "bytes=1000-1999"})
+    assert resp.status_code == 206
+    assert resp.headers["content-range"] == "bytes 1000-1999/4096"
+    assert resp.content == content[1000:2000]
+
+    resp = client.get(url, headers={"Range": "bytes=4000-"})
+    assert resp.status_code == 206
+    assert resp.content == content[4000:]
+
+    resp = client.get(url, headers={"Range": "bytes=5000-6000"})
+    assert resp.status_code == 416
+
+def test_download_conditional(tmp_path):
+    path = tmp_path / "sample.nc"
+    path.write_bytes(os.urandom(1024))
+    url = f"/api/v1/cf/download/{path}"
+
+    resp = client.get(url)
+    etag = resp.headers["etag"]
+    last_modified = resp.headers["last-modified"]
+
+    # 客户端缓存仍有效时不重复传输文件
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+
+    resp = client.get(url, headers={"If-Modified-Since": last_modified})
+    assert resp.status_code == 304
+
+    resp = client.get(url, headers={"If-None-Match": '"other"'})
+    assert resp.status_code == 200
+    assert len(resp.content) == 1024
+
+def test_download_missing_file(tmp_path):
+    resp = client.get(f"/api/v1/cf/download/{tmp_path / 'missing.nc'}")
+    assert resp.status_code == 404
+    resp = client.post("/api/v1/cf/validate", json={"file_path": str(tmp_path / "missing.nc")})
+    assert resp.status_code == 404
+
+def test_data_download_rejects_traversal():
+    for relpath in ["../../../etc/passwd", "/etc/passwd", "a/../../x"]:
+        resp = client.get("/api/v1/data/download/processed", params={"relpath": relpath})
+        assert resp.status_code == 400
+        resp = client.get("/api/v1/data/metadata/processed", params={"relpath": relpath})
+        assert resp.status_code == 400
+    resp = client.get("/api/v1/data/download/processed", params={"relpath": "missing.nc"})
+    assert resp.status_code == 404
+
+def test_validate_upload_streaming(tmp_path, monkeypatch):
+    import hashlib
+    monkeypatch.chdir(tmp_path)
+    content = b"CDF\x01" + os.urandom(3 * 1024 * 1024)
+    sha = hashlib.sha256(content).hexdigest()
+
+    resp = client.post(
+        "/api/v1/cf/validate-upload",
+        data={"note": "x"},
+        files={"file": ("sample.nc", content, "application/x-netcdf")},
+    )
+    assert resp.status_code == 200
+    saved = tmp_path / "data" / "uploads" / "sample.nc"
+    assert resp.json()["file_name"] == "sample.nc"
+    assert resp.json()["content_sha256"] == sha
+    assert saved.read_bytes() == content
+
+    # 非multipart请求：请求体即文件内容
+    resp = client.post(
+        "/api/v1/cf/validate-upload?filename=raw.nc",
+        content=content,
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert resp.status_code == 200
+    assert (tmp_path / "data" / "uploads" / "raw.nc").read_bytes() == content
+
+    resp = client.post("/api/v1/cf/validate-upload", files={"file": ("a.txt", b"abc", "text/plain")})
+    assert resp.status_code == 400
+    assert not (tmp_path / "data" / "uploads" / "a.txt").exists()
+
+def test_validate_batch(tmp_path):
+    import numpy as np
+    import xarray as xr
+    paths = []
+    for i, attrs in enumerate([{"Conventions": "CF-1.8", "title": "t"}, {}]):
+        path = tmp_path / f"f{i}.nc"
+        xr.Dataset({"temp": (("lat",), np.arange(3.0))}, coords={"lat": [1.0, 2.0, 3.0]}, attrs=attrs).to_netcdf(path)
+        paths.append(str(path))
+    paths.append(str(tmp_path / "missing.nc"))
+
+    resp = client.post("/api/v1/cf/validate-batch", json={"file_paths": paths})
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["file_path"] for r in results] == paths
+    assert results[0]["cf_version"] == "CF-1.8"
+    assert not results[1]["is_valid"]
+    assert "error" in results[2]
+
+def test_validate_stream(tmp_path):
+    import json
+    import numpy as np
+    import xarray as xr
+    path = tmp_path / "f.nc"
+    xr.Dataset({"temp": (("lat",), np.arange(3.0))}, coords={"lat": [1.0, 2.0, 3.0]},
+               attrs={"Conventions": "CF-1.8"}).to_netcdf(path)
+    paths = [str(path), str(tmp_path / "missing.nc")]
+
+    resp = client.post("/api/v1/cf/validate-stream", json={"file_paths": paths})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    results = {r["file_path"]: r for r in map(json.loads, resp.text.splitlines())}
+    assert set(results) == set(paths)
+    assert results[paths[0]]["cf_version"] == "CF-1.8"
+    assert "error" in results[paths[1]]
+
+def test_directory_structure_skips_dir_symlinks(tmp_path):
+    raw = tmp_path / "raw" / "sub"
+    raw.mkdir(parents=True)
+    (raw / "a.nc").write_bytes(b"CDF\x01")
+    (raw / "loop").symlink_to("..")
+
+    resp = client.get("/api/v1/cf/directory/structure", params={"data_dir": str(tmp_path)})
+    assert resp.status_code == 200
+    assert [f["path"] for f in resp.json()["raw"]] == [os.path.join("sub", "a.nc")]
+
+def test_job_status_errors(monkeypatch):
+    from redis.exceptions import ConnectionError as RedisConnectionError
+    from rq.exceptions import NoSuchJobError
+    from app.services import cf_task_manager
+
+    def missing(job_id):
+        raise NoSuchJobError(job_id)
+
+    def unreachable(job_id):
+        raise RedisConnectionError("connection refused")
+
+    monkeypatch.setattr(cf_task_manager, "get_task_status", missing)
+    assert client.get("/api/v1/cf/jobs/abc").status_code == 404
+
+    # Redis 不可用时不能误报为任务不存在
+    monkeypatch.setattr(cf_task_manager, "get_task_status", unreachable)
+    assert client.get("/api/v1/cf/jobs/abc").status_code == 503
+
+def test_validate_content_cached_concurrent(monkeypatch):
+    import threading
+    import time
+    from collections import OrderedDict
+    from concurrent.futures import ThreadPoolExecutor
+    from app.api.v1.endpoints import cf_router
+
+    class YieldingDict(OrderedDict):
+        # 读取后主动让出GIL，放大 get 与 move_to_end 之间的竞争窗口
+        def get(self, key, default=None):
+            value = super().get(key, default)
+            time.sleep(0)
+            return value
+
+    monkeypatch.setattr(cf_router, "_validation_cache_by_digest", YieldingDict())
+    monkeypatch.setattr(cf_router, "_VALIDATION_CACHE_BY_DIGEST_SIZE", 4)
+    monkeypatch.setattr(cf_router, "validate_netcdf_file", lambda path: path)
+    stop = threading.Event()
+
+    def clear_loop():
+        while not stop.is_set():
+            client.delete("/api/v1/cf/validate/cache")
+
+    def work(i):
+        for j in range(500):
+            digest = str((i + j) % 8)
+            assert cf_router.validate_content_cached(digest, digest) == digest
+
+    clearer = threading.Thread(target=clear_loop)
+    clearer.start()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(work, range(8)))
+    finally:
+        stop.set()
+        clearer.join()
+    assert len(cf_router._validation_cache_by_digest) <= 4
+
+def test_iter_files_with_ext_skips_special_entries(tmp_path):
+    from app.api.v1.endpoints.data_router import _iter_files_with_ext
+
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.nc").write_bytes(b"x")
+    (tmp_path / "sub" / "b.NC").write_bytes(b"x")
+    (tmp_path / "c.txt").write_bytes(b"x")
+    os.symlink(tmp_path / "a.nc", tmp_path / "link.nc")
+    os.symlink(tmp_path / "missing.nc", tmp_path / "dangling.nc")
+    os.mkfifo(tmp_path / "pipe.nc")
+    os.symlink(tmp_path, tmp_path / "sub" / "loop")
+
+    names = sorted(entry.name for entry in _iter_files_with_ext(str(tmp_path), "nc"))
+    assert names == ["a.nc", "b.NC", "link.nc"]
@@ -14,3 +14,57 @@ def test_thermocline():
     resp = client.post("/api/v1/diagnostics/cline/detect", json=data)
     assert resp.status_code == 200
     assert "cline_depth" in resp.json()
+
+def test_eddy():
+    data = {
+        "ssh": [[0.0, 0.3], [-0.2, 0.05]],
+        "lat": [10, 11],
+        "lon": [120, 121],
+        "threshold": 0.1
+    }
+    resp = client.post("/api/v1/diagnostics/eddy/detect", json=data)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["indices"] == [[0, 1], [1, 0]]
+    assert body["centers"] == [{"lat": 10.0, "lon": 121.0}, {"lat": 11.0, "lon": 120.0}]
+
+def test_eddy_stream():
+    import json
+    import numpy as np
+    data = {
+        "ssh": [[0.0, 0.3], [-0.2, 0.05]],
+        "lat": [10, 11],
+        "lon": [120, 121],
+        "threshold": 0.1
+    }
+    resp = client.post("/api/v1/diagnostics/eddy/detect_stream", json=data)
+    assert resp.status_code == 200
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+    assert lines == [{"lat": 10.0, "lon": 121.0, "row": 0, "col": 1}, {"lat": 11.0, "lon": 120.0, "row": 1, "col": 0}]
+
+    resp = client.post("/api/v1/diagnostics/eddy/detect_binary", json=data)
+    assert resp.headers["X-Array-Shape"] == "2,2"
+    assert np.frombuffer(resp.content, dtype="<i4").reshape(2, 2).tolist() == [[0, 1], [1, 0]]
+
+def test_front_compact():
+    data = {
+        "sst": [[20.0, 20.0, 20.0], [20.0, 20.0, 20.0], [20.0, 25.0, 30.0]],
+        "lat": [0, 1, 2],
+        "lon": [0, 1, 2],
+        "gradient_threshold": 1.0
+    }
+    full = client.post("/api/v1/diagnostics/front/detect", json=data).json()
+    compact = client.post("/api/v1/diagnostics/front/detect", json={**data, "compact": True}).json()
+    assert full["indices"] == [[r, c] for r, c in zip(compact["rows"], compact["cols"])]
+    assert [d["lat"] for d in full["centers"]] == compact["lats"]
+    assert "centers" not in compact
+
+def test_diagnostics_float32():
+    eddy = {"ssh": [[0.0, 0.3], [-0.2, 0.05]], "lat": [10.1, 11.1], "lon": [120, 121], "threshold": 0.1}
+    expected = client.post("/api/v1/diagnostics/eddy/detect", json=eddy).json()
+    assert client.post("/api/v1/diagnostics/eddy/detect", json={**eddy, "dtype": "float32"}).json() == expected
+
+    front = {"sst": [[20.0, 20.0, 20.0], [20.0, 20.0, 20.0], [20.0, 25.0, 30.0]], "lat": [0, 1, 2], "lon": [0, 1, 2], "gradient_threshold": 1.0}
+    expected = client.post("/api/v1/diagnostics/front/detect", json=front).json()
+    assert client.post("/api/v1/diagnostics/front/detect", json={**front, "dtype": "float32"}).json() == expected
+    assert client.post("/api/v1/diagnostics/front/detect", json={**front, "dtype": "float16"}).status_code == 422
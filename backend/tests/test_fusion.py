@@ -16,3 +16,118 @@ def test_oi_fusion():
     resp = client.post("/api/v1/fusion/oi/run", json=data)
     assert resp.status_code == 200
     assert "interp_values" in resp.json()
+
+def test_kf_fusion():
+    data = {
+        "observations": [[1.0], [1.2], [0.9], [1.1]],
+        "initial_state": [0.0],
+        "initial_cov": [[1.0]],
+        "transition_matrix": [[1.0]],
+        "observation_matrix": [[1.0]],
+        "process_noise": [[0.01]],
+        "observation_noise": [[0.1]]
+    }
+    resp = client.post("/api/v1/fusion/kalman/run", json=data)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert len(body["state_estimates"]) == 4
+    assert len(body["covariances"]) == 4
+    # 首步增益 K = P_pred / (P_pred + R) = 1.01 / 1.11
+    assert abs(body["state_estimates"][0][0] - 1.01 / 1.11) < 1e-9
+
+def test_kf_batch_fusion():
+    data = {
+        "observations": [[[1.0], [1.2]], [[-1.0], [-0.8]]],
+        "initial_state": [[0.0], [0.0]],
+        "initial_cov": [[[1.0]], [[1.0]]],
+        "transition_matrix": [[1.0]],
+        "observation_matrix": [[1.0]],
+        "process_noise": [[0.01]],
+        "observation_noise": [[0.1]]
+    }
+    resp = client.post("/api/v1/fusion/kalman/run_batch", json=data)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert len(body["state_estimates"]) == 2
+    assert abs(body["state_estimates"][0][0][0] + body["state_estimates"][1][0][0]) < 1e-9
+
+def test_kf_parallel_matches_sequential(monkeypatch):
+    import numpy as np
+    from app.algorithms.fusion import kalman_filter as kf
+
+    rng = np.random.default_rng(0)
+    F = np.array([[0.9, 0.1], [0.0, 0.95]])
+    H = np.array([[1.0, 0.0]])
+    # 覆盖长度为2的幂与非2的幂（需补齐单位元）的情形
+    for T in (1, 16, 25):
+        args = (rng.standard_normal((T, 1)), np.zeros(2), np.eye(2), F, H, np.eye(2) * 0.1, np.eye(1) * 0.3)
+        xs, Ps = kf.kalman_filter(*args)
+        xs_p, Ps_p = kf.kalman_filter_parallel(*args)
+        assert np.allclose(xs, xs_p)
+        assert np.allclose(Ps, Ps_p)
+
+    # 满足阈值时 kalman_filter 切换到并行扫描
+    monkeypatch.setattr(kf, "KF_PARALLEL_MIN_T", 16)
+    monkeypatch.setattr(kf, "KF_PARALLEL_MIN_THREADS", 0)
+    calls = []
+    parallel = kf.kalman_filter_parallel
+    monkeypatch.setattr(kf, "kalman_filter_parallel", lambda *a: calls.append(a) or parallel(*a))
+    assert np.allclose(kf.kalman_filter(*args)[0], xs)
+    assert len(calls) == 1
+
+def test_oi_local_fusion():
+    data = {
+        "obs_coords": [[0,0],[1,0],[0,1]],
+        "obs_values": [1.0, 2.0, 1.5],
+        "interp_coords": [[0.5,0.5],[1,1]],
+        "sigma2": 1.0,
+        "L": 1.0,
+        "noise": 1e-6
+    }
+    full = client.post("/api/v1/fusion/oi/run", json=data).json()
+    local = client.post("/api/v1/fusion/oi/run", json={**data, "k_neighbors": 3, "cutoff": 10.0}).json()
+    for a, b in zip(full["interp_values"], local["interp_values"]):
+        assert abs(a - b) < 1e-9
+
+def test_oi_float32_fusion():
+    data = {
+        "obs_coords": [[0,0],[1,0],[0,1]],
+        "obs_values": [1.0, 2.0, 1.5],
+        "interp_coords": [[0.5,0.5],[1,1]],
+        "sigma2": 1.0,
+        "L": 1.0,
+        "noise": 1e-3
+    }
+    full = client.post("/api/v1/fusion/oi/run", json=data).json()
+    single = client.post("/api/v1/fusion/oi/run", json={**data, "dtype": "float32"}).json()
+    for a, b in zip(full["interp_values"], single["interp_values"]):
+        assert abs(a - b) < 1e-4
+
+def test_oi_local_rejects_invalid_params():
+    data = {
+        "obs_coords": [[0,0],[1,0],[0,1]],
+        "obs_values": [1.0, 2.0, 1.5],
+        "interp_coords": [[0.5,0.5]]
+    }
+    for extra in [{"k_neighbors": 0}, {"k_neighbors": -3}, {"k_neighbors": 1000}, {"k_neighbors": 3, "cutoff": None}]:
+        resp = client.post("/api/v1/fusion/oi/run", json={**data, **extra})
+        assert resp.status_code == 422
+
+def test_oi_factor_cache_byte_budget(monkeypatch):
+    import numpy as np
+    from collections import OrderedDict
+    from app.algorithms.fusion import optimal_interpolation as oi
+
+    monkeypatch.setattr(oi, "_factor_cache", OrderedDict())
+    monkeypatch.setattr(oi, "_factor_cache_bytes", 0)
+    # 预算只够容纳两个 N=200 的分解
+    monkeypatch.setattr(oi, "OI_FACTOR_CACHE_BYTES", 2 * (200 * 200 * 8 + 200 * 2 * 8))
+    rng = np.random.default_rng(0)
+    for _ in range(4):
+        oi.optimal_interpolation(rng.random((200, 2)), rng.random(200), rng.random((5, 2)))
+    assert len(oi._factor_cache) == 2
+    assert oi._factor_cache_bytes <= oi.OI_FACTOR_CACHE_BYTES
+
+    # 超过预算的单个分解不进入缓存
+    oi.optimal_interpolation(rng.random((400, 2)), rng.random(400), rng.random((5, 2)))
+    assert len(oi._factor_cache) == 2